@@ -12,7 +12,8 @@ def create_basic_generator(
     template_dir=None,
     has_dependencies=True,
     camel_case_filename=False,
-    ignore_cache=False
+    ignore_cache=False,
+    methods_to_call_on_model_obj=[]
 ):
     """
     Special helper function which allows you to dynamically create a basic generator at
@@ -34,7 +35,8 @@ def create_basic_generator(
             template_dir=template_dir,
             has_dependencies=has_dependencies,
             camel_case_filename=camel_case_filename,
-            ignore_cache=ignore_cache
+            ignore_cache=ignore_cache,
+            methods_to_call_on_model_obj=methods_to_call_on_model_obj
         )
 
     cls_name = (
@@ -67,7 +69,8 @@ def add_basic_generator_to_module(
     template_dir=None,
     has_dependencies=True,
     camel_case_filename=False,
-    ignore_cache=False
+    ignore_cache=False,
+    methods_to_call_on_model_obj=[]
 ):
     """
     Add a basic generator to a specific module:
@@ -80,7 +83,8 @@ def add_basic_generator_to_module(
         template_dir=template_dir,
         has_dependencies=has_dependencies,
         camel_case_filename=camel_case_filename,
-        ignore_cache=ignore_cache
+        ignore_cache=ignore_cache,
+        methods_to_call_on_model_obj=methods_to_call_on_model_obj
     )
     add_class_to_module(cls, module)
 
@@ -92,7 +96,8 @@ def add_basic_generators_to_module(
     template_dir=None,
     has_dependencies=True,
     camel_case_filename=False,
-    ignore_cache=False
+    ignore_cache=False,
+    methods_to_call_on_model_obj=[]
 ):
     """
     Add a list of basic generators to specific module, where each generator has a different output template.
@@ -105,7 +110,8 @@ def add_basic_generators_to_module(
             template_dir=template_dir,
             has_dependencies=has_dependencies,
             camel_case_filename=camel_case_filename,
-            ignore_cache=ignore_cache
+            ignore_cache=ignore_cache,
+            methods_to_call_on_model_obj=methods_to_call_on_model_obj
         )
 
 
@@ -154,7 +160,8 @@ class basic_generator(object):
         template_dir=None,
         has_dependencies=True,
         camel_case_filename=False,
-        ignore_cache=False
+        ignore_cache=False,
+        methods_to_call_on_model_obj=[]
     ):
         # Set the generator model class and type name:
         self.model_cls = model_class
@@ -163,6 +170,7 @@ class basic_generator(object):
         self.has_dependencies = has_dependencies
         self.camel_case_filename = camel_case_filename
         self.ignore_cache = ignore_cache
+        self.methods_to_call_on_model_obj = methods_to_call_on_model_obj
 
         # If a full template filename is not given, then form one using
         # the model_type:
@@ -272,8 +280,9 @@ class basic_generator(object):
 
         # Call any desired methods on the model object. This performance feature is used to
         # add functionality to some models that are needed by only some generators,
-        # while most generators can ignore the functionality.
-        for method in methods_to_call_on_model_obj:
+        # while most generators can ignore the functionality. Methods given when the
+        # generator is created are called first.
+        for method in self.methods_to_call_on_model_obj + methods_to_call_on_model_obj:
             getattr(model_obj, method)()
 
         output = model_obj.render(self.template, self.template_dir)
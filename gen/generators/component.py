@@ -41,13 +41,14 @@ add_basic_generators_to_module(
     has_dependencies=False,
 )
 # We cannot use the cached component model for anything to do with unit
-# tests, since unit tests are not in the path, and need to be found by
-# searching the filesystem each time. By doing this, we will always detect
-# any new unit tests models that might appear on the filesystem for a
-# component.
+# tests, since unit tests are not in the path, and are only found by the
+# search for the build path of the current session. By doing this, we will
+# always detect any new unit tests models that might appear on the filesystem
+# for a component. The unit test models are only loaded by this generator.
 add_basic_generator_to_module(
     component.component,
     "component/name_unit_test.tex",
     module=this_module,
-    ignore_cache=True
+    ignore_cache=True,
+    methods_to_call_on_model_obj=["load_unit_tests"]
 )
@@ -3,6 +3,10 @@ from base_classes.generator_base import generator_base
 from models import record
 from models import array
 from models import enums
+from models import packed_type
+from util import ada
+from util import jinja
+import os.path
 
 record_templates = [
     "record/name.ads",
@@ -139,3 +143,50 @@ class enum_m_generator(basic_generator, generator_base):
             # Write content to m file:
             with open(output_dir + os.sep + filename, "w") as f:
                 f.write(content)
+
+
+class type_ranges_batch_adb(generator_base):
+    """
+    Generates a single Ada program for each directory that prints the type
+    ranges of every packed record and array in the directory, by calling the
+    type ranges procedure of each in turn. This lets the type ranges yaml files
+    of a directory be built with one link and one run, rather than one of each
+    per packed type, see build_type_ranges_yaml.py. The program is named after
+    the directory, and is generated from the first packed type in it, see
+    packed_type.type_ranges_batch().
+    """
+    def input_file_regex(self):
+        return r".*\.(record|array)\.yaml$"
+
+    def output_filename(self, input_filename):
+        directory = os.path.dirname(input_filename)
+        batch_name, models = packed_type.type_ranges_batch(directory)
+        # Only the first packed type in the directory generates the program:
+        if not models or next(iter(models.values())) != input_filename:
+            return None
+        return os.path.join(
+            directory, "build" + os.sep + "src" + os.sep + batch_name + "_type_ranges.adb"
+        )
+
+    def generate(self, input_filename):
+        directory = os.path.dirname(input_filename)
+        batch_name, models = packed_type.type_ranges_batch(directory)
+        batch_dict = dict()
+        batch_dict["name"] = ada.formatType(batch_name)
+        batch_dict["directory"] = os.path.basename(directory)
+        batch_dict["marker"] = packed_type.type_ranges_batch_marker
+        batch_dict["procedures"] = {
+            model_name: ada.formatType(model_name) + "_Type_Ranges"
+            for model_name in models
+        }
+        print(jinja.render(batch_dict, "/type_ranges/batch_type_ranges.adb"))
+
+    def depends_on(self, input_filename):
+        """
+        Depend on every packed type in the directory, so that the program is
+        generated again when one is removed. A packed type added since the program
+        was generated is not in it, and its type ranges are built by its own
+        program instead.
+        """
+        _, models = packed_type.type_ranges_batch(os.path.dirname(input_filename))
+        return list(models.values())
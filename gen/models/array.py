@@ -1,4 +1,5 @@
 from models.type import type
+from models.packed_type import struct_code, numpy_code
 from models.exceptions import ModelException
 import os
 from collections import OrderedDict
@@ -209,6 +210,54 @@ class array(type):
         if self.is_atomic_type:
             self.volatile_descriptor = "Atomic"
 
+        # Lay out the struct based python codec, if this array supports one:
+        self._load_struct_codec()
+
+    def _load_struct_codec(self):
+        """
+        Choose the struct based codec for the generated python type. The elements
+        are coded as:
+
+          values - a struct code per primitive value, for byte aligned values
+          bits   - a single big endian integer holding all of the primitive
+                   values, for values that are not byte aligned
+          nested - each element by the nested packed type itself
+
+        The struct format is left as None if the array cannot be coded with
+        struct, in which case the python type uses bitstring only.
+
+        If the elements are byte aligned, and map onto a NumPy type, then the
+        single unnamed field of the NumPy dtype of the python type is laid out
+        too, as for records (see record._load_struct_codec()).
+        """
+        self.struct_format = None
+        self.struct_kind = None
+        self.struct_num_values = self.length
+        self.numpy_fields = None
+        if self.element.is_packed_type:
+            if getattr(self.element.type_model, "struct_format", None):
+                self.struct_kind = "nested"
+                self.struct_format = ">" + str(self.size // 8) + "x"
+            if getattr(self.element.type_model, "numpy_fields", None):
+                self.numpy_fields = [("None", self.element.type_package, "0", "(" + str(self.length) + ",)")]
+            return
+
+        if self.element.format.length:
+            self.struct_num_values = self.length * self.element.format.length
+        code = struct_code(self.element.format.unit_size, self.element.format.type[0])
+        if code:
+            self.struct_kind = "values"
+            self.struct_format = ">" + str(self.struct_num_values) + code
+            shape = "(" + str(self.length) + ",)"
+            if self.element.format.length:
+                shape = "(" + str(self.length) + ", " + str(self.element.format.length) + ")"
+            self.numpy_fields = [
+                ("None", '"' + numpy_code(self.element.format.unit_size, self.element.format.type[0]) + '"', "0", shape)
+            ]
+        elif self.element.format.type[0] != "F":
+            self.struct_kind = "bits"
+            self.struct_format = ">" + str(self.size // 8) + "s"
+
     def flatten(self):
         """Returns a flat ordered list of field objects that make up this array."""
         fields = []
@@ -8,6 +8,7 @@ from util import ada
 from util import model_loader
 from util import redo_arg
 import os
+from bisect import bisect_right
 from collections import OrderedDict
 
 
@@ -105,6 +106,22 @@ class assembly_submodel(base):
         pass
 
 
+def _format_name(format_function, name, formatted_names):
+    """
+    Format a name found in connection data, ie. a component or connector
+    name. If a dictionary of formatted names is given, each name is only
+    formatted once, since the same names are used in many connections.
+    """
+    if formatted_names is None:
+        return format_function(name)
+    key = (format_function, name)
+    try:
+        return formatted_names[key]
+    except KeyError:
+        formatted_names[key] = format_function(name)
+        return formatted_names[key]
+
+
 class connection(object):
     """
     This class holds a connection. When instantiated the two connectors are
@@ -116,11 +133,19 @@ class connection(object):
         self.data = data
         self.lineno = data.lc.line
 
-    def connect(self, components):
-        """Make the actual connection, connecting one connector to another."""
+    def connect(self, components, formatted_names=None):
+        """
+        Make the actual connection, connecting one connector to another. The
+        formatted_names dictionary can be shared between connections, see
+        connect_all().
+        """
         # Collect from-side info:
-        from_component_name = ada.formatVariable(self.data["from_component"])
-        from_connector_name = ada.formatType(self.data["from_connector"])
+        from_component_name = _format_name(
+            ada.formatVariable, self.data["from_component"], formatted_names
+        )
+        from_connector_name = _format_name(
+            ada.formatType, self.data["from_connector"], formatted_names
+        )
         from_component = None
         from_connector = None
         if (
@@ -154,8 +179,12 @@ class connection(object):
                 )
 
         # Collect to-side info:
-        to_component_name = ada.formatVariable(self.data["to_component"])
-        to_connector_name = ada.formatType(self.data["to_connector"])
+        to_component_name = _format_name(
+            ada.formatVariable, self.data["to_component"], formatted_names
+        )
+        to_connector_name = _format_name(
+            ada.formatType, self.data["to_connector"], formatted_names
+        )
         to_component = None
         to_connector = None
         if (
@@ -326,6 +355,17 @@ class connection(object):
                 )
             self.ignored = True
 
+    @staticmethod
+    def connect_all(connections, components):
+        """
+        Make all the connections that have not yet been made, in one pass,
+        formatting each component and connector name used only once.
+        """
+        formatted_names = {}
+        for connection in connections:
+            if not connection.connected and not connection.ignored:
+                connection.connect(components, formatted_names)
+
     @classmethod
     @throw_exception_with_lineno
     def from_connection_data(cls, filename, connection_data):
@@ -333,6 +373,66 @@ class connection(object):
         return cls(filename=filename, data=connection_data)
 
 
+class id_allocator(object):
+    """
+    The ids reserved for one type of entity in an assembly, ie. commands
+    or events, kept as a sorted list of ranges of ids. Neighboring ranges
+    are merged, so the lowest open swath of ids of a given size can be
+    found by jumping from gap to gap, rather than checking the ids one
+    at a time.
+    """
+    def __init__(self, ids=[]):
+        self.starts = []  # The first id of each range, in order
+        self.ends = []  # The last id of each range
+        for id in ids:
+            self.reserve(id)
+
+    def __contains__(self, id):
+        index = bisect_right(self.starts, id) - 1
+        return index >= 0 and id <= self.ends[index]
+
+    def reserve(self, id):
+        """Reserve a single id."""
+        # Find the first range that starts after the id:
+        index = bisect_right(self.starts, id)
+        if index > 0 and id <= self.ends[index - 1] + 1:
+            # The id is in, or just after, the range before it:
+            if id > self.ends[index - 1]:
+                self.ends[index - 1] = id
+                # Merge with the next range if they now touch:
+                if index < len(self.starts) and self.starts[index] == id + 1:
+                    self.ends[index - 1] = self.ends[index]
+                    del self.starts[index]
+                    del self.ends[index]
+        elif index < len(self.starts) and self.starts[index] == id + 1:
+            # The id is just before the next range:
+            self.starts[index] = id
+        else:
+            self.starts.insert(index, id)
+            self.ends.insert(index, id)
+
+    def find_open_id_base(self, num_ids_to_reserve, min_id=1):
+        """
+        Find an open swath of ids at the lowest position possible,
+        at or above min_id.
+        """
+        if num_ids_to_reserve <= 0:
+            return min_id
+
+        # Start after the range that min_id is in, if any:
+        id_base = min_id
+        index = bisect_right(self.starts, min_id) - 1
+        if index >= 0 and self.ends[index] >= id_base:
+            id_base = self.ends[index] + 1
+
+        # Move past each range that starts before the swath would end:
+        index += 1
+        while index < len(self.starts) and self.starts[index] < id_base + num_ids_to_reserve:
+            id_base = self.ends[index] + 1
+            index += 1
+        return id_base
+
+
 class subassembly(base):
     """
     This is the object model for a assembly. It extracts data from a
@@ -715,9 +815,7 @@ class assembly(subassembly):
 
         # Make all connections that have not yet been made in
         # our subassemblies:
-        for connection in self.connections:
-            if not connection.connected and not connection.ignored:
-                connection.connect(self.components)
+        connection.connect_all(self.connections, self.components)
 
         # Remove ignored connections from connection list, we don't
         # want to see them anymore.
@@ -772,36 +870,23 @@ class assembly(subassembly):
             for component in self.components.values():
                 if component.connectors:
                     for connector in component.connectors:
-                        if connector.count > 1:
-                            for index0 in range(connector.count):
-                                index = index0 + 1
-                                if connector.ignored(index):
-                                    self.num_ignored_connectors += 1
-                                elif not connector.connected(index):
-                                    self.num_unconnected_connectors += 1
-                                    if not self.shallow_load:
-                                        self.warn(
-                                            "component '"
-                                            + component.instance_name
-                                            + "' has unattached connector '"
-                                            + connector.name
-                                            + "["
-                                            + str(index)
-                                            + "]'."
-                                        )
-                        else:
-                            if connector.ignored():
-                                self.num_ignored_connectors += 1
-                            elif not connector.connected():
-                                self.num_unconnected_connectors += 1
-                                if not self.shallow_load:
-                                    self.warn(
-                                        "component '"
-                                        + component.instance_name
-                                        + "' has unattached connector '"
-                                        + connector.name
-                                        + "'."
+                        self.num_ignored_connectors += connector.num_ignored()
+                        unconnected_indexes = connector.unconnected_indexes()
+                        self.num_unconnected_connectors += len(unconnected_indexes)
+                        if not self.shallow_load:
+                            for index in unconnected_indexes:
+                                self.warn(
+                                    "component '"
+                                    + component.instance_name
+                                    + "' has unattached connector '"
+                                    + connector.name
+                                    + (
+                                        "[" + str(index) + "]"
+                                        if connector.count > 1
+                                        else ""
                                     )
+                                    + "'."
+                                )
 
             # We almost always want to run the following code, however there are very special times, to avoid
             # circular dependencies, that a generator might disable the running of this code. That is why
@@ -1019,21 +1104,6 @@ class assembly(subassembly):
             #   sys.stderr.write(str(key) + ": " + str(value) + "\n")
 
     def _generate_component_ids(self):
-        def find_Open_Id_Base(id_List, num_Ids_To_Reserve, min_Id=1):
-            """
-            Find an open swath of IDs in the id list at the lowest
-            position possible.
-            """
-            count = 0
-            curr_Id = min_Id
-            while count < num_Ids_To_Reserve:
-                if curr_Id in id_List:
-                    count = 0
-                else:
-                    count += 1
-                curr_Id += 1
-            return curr_Id - num_Ids_To_Reserve
-
         # Grab all ided entities from the components:
         for component in self.components.values():
             for suite_type, suite in component.ided_suites.items():
@@ -1064,6 +1134,7 @@ class assembly(subassembly):
             # Initialize the entity dictionary with this entity type:
             if suite_type not in self.entity_dict:
                 self.entity_dict[suite_type] = {}
+            reserved_ids = id_allocator(self.entity_dict[suite_type])
 
             # Reserve any entities that already have static ids set:
             for suite in suite_list:
@@ -1118,6 +1189,7 @@ class assembly(subassembly):
                             raise ModelException(this_str + that_str)
                         else:
                             self.entity_dict[suite_type][entity.id] = entity
+                            reserved_ids.reserve(entity.id)
 
             # Compute the base id for any suites that do not yet have suite ids set:
             for suite in suite_list:
@@ -1127,9 +1199,7 @@ class assembly(subassembly):
                     param_Name = suite_type[:-1].capitalize() + "_Id_Base"
                     if param_Name in self.id_bases:
                         min_id = self.id_bases[param_Name]
-                    start_id = find_Open_Id_Base(
-                        self.entity_dict[suite_type], num_ids, min_id
-                    )
+                    start_id = reserved_ids.find_open_id_base(num_ids, min_id)
                     suite.set_id_base(start_id)
 
                     # If the suite id base got set by the operation above,
@@ -1155,6 +1225,7 @@ class assembly(subassembly):
                             # Add entity to the assembly entity dictionaray:
                             if entity.id not in self.entity_dict[suite_type]:
                                 self.entity_dict[suite_type][entity.id] = entity
+                                reserved_ids.reserve(entity.id)
                             else:
                                 raise ModelException(
                                     suite_type[:-1].capitalize()
@@ -17,6 +17,45 @@ import os
 from collections import OrderedDict
 
 
+# Directories below a component that are not searched for unit test models:
+_unit_test_ignore = ["build", "ignore", "doc"]
+
+
+def _is_unit_test_dir(component_dir, directory):
+    """
+    Return True if unit test models in directory belong to a component in
+    component_dir, ie. if the directory is below the component directory and
+    neither it nor any directory between them is ignored.
+    """
+    relpath = os.path.relpath(directory, component_dir)
+    if relpath == "." or relpath == ".." or relpath.startswith(".." + os.sep):
+        return False
+    for name in relpath.split(os.sep):
+        if name[0] in "._" or name in _unit_test_ignore:
+            return False
+    return True
+
+
+def _was_searched(directory, roots):
+    """
+    Return True if the search of the given build roots for the build path
+    searched the directory and all the directories below it, see
+    filesystem.recurse_through_repo_indexed.
+    """
+    if os.path.realpath(directory) != directory:
+        return False
+    for root in roots:
+        relpath = os.path.relpath(directory, root)
+        if relpath == ".":
+            return True
+        if relpath != ".." and not relpath.startswith(".." + os.sep):
+            for name in relpath.split(os.sep):
+                if name[0] in "._" or name in ["build", "alire"]:
+                    return False
+            return True
+    return False
+
+
 class component_submodel(base):
     """
     This is the submodel class for a component. All component submodels
@@ -148,6 +187,7 @@ class component(base):
         self.connectors = None
         self.requirements = None
         self.unit_tests = []
+        self.unit_tests_loaded = False
         self.submodels = OrderedDict()
 
         # Initialize other things:
@@ -617,47 +657,68 @@ class component(base):
             if inc not in self.tester_template_ads_includes
         ]
 
-        # Finally, let's load any unit tests:
-        ut_model_files = self._load_unit_tests()
+        # Finally, let's find any unit tests. They are only loaded if a generator
+        # needs them, see load_unit_tests():
+        self.unit_test_files = self._find_unit_test_files()
 
         # Gather dependencies of our dependencies:
-        self.dependencies.extend(ut_model_files)
+        self.dependencies.extend(self.unit_test_files)
         for m in submodels:
             self.dependencies.extend([m.full_filename] + m.get_dependencies())
         self.dependencies = list(dict.fromkeys(self.dependencies))
 
-    def _load_unit_tests(self):
+    def _find_unit_test_files(self):
         """
-        Look for and load all unit tests associated with this component.
+        Find all unit test models associated with this component.
         Note: We cannot to this the standard way, ie. using the model loader, because unit tests
         by default are not expected to be in the global path, so they are undiscoverable via the
-        model loader. Instead we search directories below this directory that include unit tests
-        models of the correct name.
+        model loader. Instead we look for unit test models of the correct name in directories below
+        this directory. The unit test models found while searching the build roots are stored in the
+        model database, so if this directory was searched, we just filter those. Otherwise we search
+        the directories below this directory ourselves.
         """
-        from models.tests import tests
         import glob
 
-        ut_model_files = []
         self.full_file_dir = os.path.dirname(self.full_filename)
+        suffix = self.name.lower() + ".tests.yaml"
+        roots, unit_test_files = model_loader.get_unit_test_file_paths(self.name)
+        if _was_searched(self.full_file_dir, roots):
+            return [
+                f
+                for f in unit_test_files
+                if os.path.basename(f).endswith(suffix)
+                and _is_unit_test_dir(self.full_file_dir, os.path.dirname(f))
+            ]
+
+        ut_model_files = []
         for root, dirs, files in filesystem.recurse_through_repo(
             self.full_file_dir,
-            ignore=["build", "ignore", "doc"]
+            ignore=_unit_test_ignore
         ):
             for dirname in dirs:
-                for unit_test_model in glob.iglob(
-                    os.path.join(
-                        os.path.join(root, dirname),
-                        "*" + self.name.lower() + ".tests.yaml",
-                    )
-                ):
-                    # Unit test found, load it:
-                    # sys.stderr.write(unit_test_model + "\n")
-                    t = tests(unit_test_model)
-                    t.set_component(self)
-                    self.unit_tests.append(t)
-                    ut_model_files.append(t.full_filename)
+                ut_model_files.extend(
+                    glob.iglob(os.path.join(os.path.join(root, dirname), "*" + suffix))
+                )
         return ut_model_files
 
+    def load_unit_tests(self):
+        """
+        Special function to load all the unit test models of the component. This is only
+        needed by a few templates, so it has been broken out into its own function. Generators
+        that need this capability can call this function manually after init.
+        """
+        from models.tests import tests
+
+        # Only load models if they haven't been loaded already:
+        if not self.unit_tests_loaded:
+            for unit_test_model in self.unit_test_files:
+                # Unit test found, load it:
+                # sys.stderr.write(unit_test_model + "\n")
+                t = tests(unit_test_model)
+                t.set_component(self)
+                self.unit_tests.append(t)
+            self.unit_tests_loaded = True
+
     def set_component_instance_data(
         self, component_instance_name, component_instance_data
     ):
@@ -3,9 +3,20 @@ from util import ada
 from util import redo_arg
 from util import model_loader
 from util import redo
+from collections import OrderedDict
 import os
+import re
+import hashlib
 import abc
 
+# Packed records and arrays whose type ranges are printed by the batched type
+# ranges program of their directory, see type_ranges_batch():
+_type_ranges_batch_regex = re.compile(r"^([^.]+)\.(record|array)\.yaml$")
+
+# The line the batched type ranges program prints before the type ranges of each
+# packed type, followed by the packed type's model name:
+type_ranges_batch_marker = "# type ranges: "
+
 
 class packed_type(base):
     """
@@ -100,3 +111,202 @@ class packed_type(base):
             # Call the inherited abstract method.
             self.set_type_ranges(type_ranges_model)
         self.type_ranges_loaded = True
+
+
+def type_ranges_batch(directory):
+    """
+    Return the name of the batched type ranges program for a directory, and an
+    ordered dictionary mapping the model name of each packed record and array
+    that it prints the type ranges of to its model file, ie.
+    ("batch_types_0a1b2c3d", {"aa": "/path/to/types/aa.record.yaml", "bb": "/path/to/types/bb.array.yaml"}),
+    or (None, {}) if the directory has none. The program is named after the
+    directory, so the name does not change as packed types are added or removed.
+    Directory names are not unique in the build path, so the name ends with a
+    hash of the directory's path.
+    """
+    try:
+        filenames = os.listdir(directory)
+    except OSError:
+        return None, OrderedDict()
+    models = OrderedDict()
+    for filename in filenames:
+        match = _type_ranges_batch_regex.match(filename)
+        if match:
+            models[match.group(1).lower()] = os.path.join(directory, filename)
+    models = OrderedDict(sorted(models.items()))
+    if not models:
+        return None, models
+    real_directory = os.path.realpath(directory)
+    name = re.sub(r"[^a-z0-9]+", "_", os.path.basename(real_directory).lower()).strip("_")
+    path_hash = hashlib.sha1(real_directory.encode("utf-8")).hexdigest()[:8]
+    return "_".join(part for part in ["batch", name, path_hash] if part), models
+
+
+def struct_code(size, kind):
+    """
+    Return the big endian python struct code for a byte aligned primitive value
+    of size bits, or None if there is not one. The kind is the format type letter:
+    "U" or "E" for unsigned, "I" for signed and "F" for float.
+    """
+    if kind == "F":
+        return {16: "e", 32: "f", 64: "d"}.get(size)
+    code = {8: "b", 16: "h", 32: "i", 64: "q"}.get(size)
+    if code and kind != "I":
+        code = code.upper()
+    return code
+
+
+def numpy_code(size, kind):
+    """
+    Return the NumPy type code, without a byte order, for a byte aligned
+    primitive value of size bits and kind (see struct_code()), or None if there
+    is not one.
+    """
+    code = struct_code(size, kind)
+    if code is None:
+        return None
+    return {"e": "f", "f": "f", "d": "f"}.get(code, "i" if code.islower() else "u") + str(size // 8)
+
+
+class struct_layout(object):
+    """
+    Lays out the values of a fixed size packed type as a single big endian
+    python struct format, so that the generated python packed type can encode
+    and decode itself with one struct.Struct call instead of with bitstring.
+
+    Byte aligned values of 8, 16, 32 or 64 bits (or 16, 32 or 64 bit floats)
+    map directly onto a struct code. Runs of values that are not byte aligned
+    are grouped until the group ends on a byte boundary, and the group is packed
+    as a single unsigned integer, with each value extracted by a shift and a
+    mask. Nested packed types that start on a byte boundary are skipped with pad
+    bytes, and are coded by the nested type itself at their byte offset. Any
+    other layout, ie. a float that is not byte aligned, is not supported and the
+    generated type falls back to bitstring.
+
+    After adding every value in order and calling finish(), format holds the
+    struct format, decode_expression() returns the python expression that decodes
+    a value from the unpacked tuple "_v", word_lines holds the lines that convert
+    multi-byte groups to integers beforehand, and pack_args holds the arguments to
+    pass to pack_into. supported is False if the layout cannot be coded with struct.
+    """
+    def __init__(self):
+        self.supported = True
+        self.format = ">"
+        self.size = 0  # in bits
+        self.decode = []
+        self.word_lines = []
+        self.pack_args = []
+        self._num_values = 0
+        self._group = []
+        self._group_size = 0
+
+    def add(self, value, size, kind):
+        """
+        Add a primitive value of size bits and kind (see struct_code()). The
+        value is the python expression that evaluates to the value when
+        encoding. Returns the index of the value's expression in decode.
+        """
+        self.decode.append(None)
+        index = len(self.decode) - 1
+        code = struct_code(size, kind)
+        if code and not self._group:
+            self.format += code
+            self.decode[index] = "_v[" + str(self._num_values) + "]"
+            self.pack_args.append(value)
+            self._num_values += 1
+        elif kind == "F":
+            self.supported = False
+        else:
+            self._group.append((index, value, size, kind == "I"))
+            self._group_size += size
+            if self._group_size % 8 == 0:
+                self._flush_group()
+        self.size += size
+        return index
+
+    def add_list(self, value, length, size, kind):
+        """
+        Add a list of length primitive values of size bits each, where value is
+        the python expression that evaluates to the list when encoding. Returns the
+        index of the list's expression in decode.
+        """
+        code = struct_code(size, kind)
+        if code and not self._group:
+            start = self._num_values
+            self.format += str(length) + code
+            self.decode.append("list(_v[" + str(start) + ":" + str(start + length) + "])")
+            self.pack_args.append("*" + value)
+            self._num_values += length
+            self.size += size * length
+            return len(self.decode) - 1
+        indexes = [self.add(value + "[" + str(idx) + "]", size, kind) for idx in range(length)]
+        self.decode.append(indexes)
+        return len(self.decode) - 1
+
+    def decode_expression(self, index):
+        """Return the python expression that decodes the value or list added at index."""
+        expression = self.decode[index]
+        if isinstance(expression, list):
+            return "[" + ", ".join([self.decode[idx] for idx in expression]) + "]"
+        return expression
+
+    def add_nested(self, size):
+        """
+        Add a nested packed type of size bits. Returns its offset in bytes, which
+        is only valid if the layout is still supported.
+        """
+        if self._group:
+            self.supported = False
+        offset = self.size // 8
+        self.format += str(size // 8) + "x"
+        self.size += size
+        return offset
+
+    def _flush_group(self):
+        """Pack the current group of values into a single unsigned integer."""
+        num_bytes = self._group_size // 8
+        word = "_v[" + str(self._num_values) + "]"
+        if num_bytes in (1, 2, 4, 8):
+            self.format += struct_code(self._group_size, "U")
+        else:
+            self.format += str(num_bytes) + "s"
+            self.word_lines.append("_w" + str(self._num_values) + ' = int.from_bytes(' + word + ', "big")')
+            word = "_w" + str(self._num_values)
+
+        shift = self._group_size
+        parts = []
+        for index, value, size, signed in self._group:
+            shift -= size
+            expression = word
+            if shift:
+                expression += " >> " + str(shift)
+            if shift + size != self._group_size:
+                if shift:
+                    expression = "(" + expression + ")"
+                expression += " & " + hex((1 << size) - 1)
+            if signed:
+                if expression != word:
+                    expression = "(" + expression + ")"
+                sign_bit = hex(1 << (size - 1))
+                expression = "(" + expression + " ^ " + sign_bit + ") - " + sign_bit
+            self.decode[index] = expression
+            part = "self._bits(" + value + ", " + str(size) + ", " + str(signed) + ")"
+            if shift:
+                part = "(" + part + " << " + str(shift) + ")"
+            parts.append(part)
+
+        pack_arg = " | ".join(parts)
+        if num_bytes not in (1, 2, 4, 8):
+            if len(parts) > 1:
+                pack_arg = "(" + pack_arg + ")"
+            pack_arg += ".to_bytes(" + str(num_bytes) + ', "big")'
+        self.pack_args.append(pack_arg)
+        self._num_values += 1
+        self._group = []
+        self._group_size = 0
+
+    def finish(self):
+        """Finish the layout. Returns whether it is supported."""
+        if self._group:
+            self.supported = False
+        return self.supported
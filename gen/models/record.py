@@ -1,4 +1,4 @@
-from models.packed_type import packed_type
+from models.packed_type import packed_type, struct_layout, numpy_code
 from models.exceptions import ModelException
 from models.submodels.field import field
 from collections import OrderedDict
@@ -466,6 +466,91 @@ class record(packed_type):
             )
         )
 
+        # Lay out the struct based python codec, if this record supports one:
+        self._load_struct_codec()
+
+    def _load_struct_codec(self):
+        """
+        Lay out the fields of this record for the struct based codec, and the
+        NumPy dtype, of the generated python type. The struct attributes are left
+        as None if the record is variable length, or its layout cannot be coded
+        with struct, in which case the python type uses bitstring only.
+        """
+        self.struct_format = None
+        self.struct_word_lines = None
+        self.struct_pack_args = None
+        self.struct_decode = None
+        self.struct_nested = None
+        self.numpy_fields = None
+        if self.variable_length:
+            return
+
+        layout = struct_layout()
+        decode_indexes = OrderedDict()
+        nested_offsets = OrderedDict()
+        for a_field in self.fields.values():
+            if a_field.is_packed_type:
+                if not getattr(a_field.type_model, "struct_format", None):
+                    return
+                nested_offsets[a_field.name] = layout.add_nested(a_field.size)
+            elif a_field.format.length:
+                decode_indexes[a_field.name] = layout.add_list(
+                    "_" + a_field.name,
+                    a_field.format.length,
+                    a_field.format.unit_size,
+                    a_field.format.type[0],
+                )
+            else:
+                decode_indexes[a_field.name] = layout.add(
+                    "_" + a_field.name, a_field.format.unit_size, a_field.format.type[0]
+                )
+        if not layout.finish():
+            return
+
+        self.struct_decode = OrderedDict()
+        for name, a_field in self.fields.items():
+            if name in nested_offsets:
+                self.struct_decode[name] = (
+                    a_field.type_package
+                    + "._create_from_buffer(buffer, offset + "
+                    + str(nested_offsets[name])
+                    + ")"
+                )
+            elif a_field.is_enum:
+                self.struct_decode[name] = (
+                    a_field.type_model.name
+                    + "("
+                    + layout.decode_expression(decode_indexes[name])
+                    + ")"
+                )
+            else:
+                self.struct_decode[name] = layout.decode_expression(decode_indexes[name])
+        self.struct_nested = list(nested_offsets.items())
+        self.struct_word_lines = layout.word_lines
+        self.struct_pack_args = layout.pack_args
+        self.struct_format = layout.format
+
+        # If every field is byte aligned, and maps onto a NumPy type, then lay out
+        # the fields for the NumPy dtype of the python type too. Each field is
+        # given as a tuple of the python expressions for its name, its NumPy type
+        # code or nested packed type, its offset in bytes and its shape.
+        numpy_fields = []
+        for name, a_field in self.fields.items():
+            if a_field.start_bit % 8 != 0:
+                return
+            offset = str(a_field.start_bit // 8)
+            if a_field.is_packed_type:
+                if not getattr(a_field.type_model, "numpy_fields", None):
+                    return
+                numpy_fields.append(('"' + name + '"', a_field.type_package, offset, "()"))
+            else:
+                code = numpy_code(a_field.format.unit_size, a_field.format.type[0])
+                if not code:
+                    return
+                shape = "(" + str(a_field.format.length) + ",)" if a_field.format.length else "()"
+                numpy_fields.append(('"' + name + '"', '"' + code + '"', offset, shape))
+        self.numpy_fields = numpy_fields
+
     def get_all_types_recursive(self):
         """Get the model types, recursively delving into any fields that are of record type."""
         types = []
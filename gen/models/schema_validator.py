@@ -0,0 +1,115 @@
+from pykwalify.core import Core
+from pykwalify.rule import Rule
+from pykwalify.errors import SchemaError
+import pykwalify
+import os.path
+
+# This module provides a fast path for validating YAML model data against
+# a pykwalify schema. Pykwalify, used directly, needs the YAML to be stored
+# in a file, and then re-reads and re-parses both the YAML file and the
+# schema file, and rebuilds all of the schema rules, for every validation.
+# Since each schema is used for many, many model loads during a build, we
+# instead compile each schema into its pykwalify rules once per process,
+# and validate the already-parsed model data in memory against those.
+#
+# Pykwalify's error messages reflect the exact objects it validates, which
+# come from its own YAML loader. To keep the error messages identical to
+# validating the file directly, any data that fails validation on the fast
+# path is validated again the original way, from the file contents, and that
+# error is reported.
+
+
+class compiled_schema(Core):
+    """
+    A pykwalify validator with its schema loaded and its rules built once, which
+    can then be used to validate any number of in-memory YAML data structures.
+    """
+    def __init__(self, schema_file):
+        # Let pykwalify load the schema file and any extensions the schema
+        # references, with dummy source data:
+        super(compiled_schema, self).__init__(source_data={}, schema_files=[schema_file])
+        self.schema_file = schema_file
+
+        # Build the rules for any partial schemas and the root schema, the same
+        # way pykwalify does at the start of each validation:
+        self.partial_rules = {}
+        schema = {}
+        for key, value in self.schema.items():
+            if key.startswith("schema;"):
+                self.partial_rules[key.split(";", 1)[1]] = Rule(schema=value)
+            else:
+                schema[key] = value
+        self.schema = schema
+        self.root_rule = Rule(schema=self.schema)
+
+    def is_valid(self, data):
+        """Validate the data against the schema, returning True if it is valid."""
+        # Partial schemas are stored globally by pykwalify, and can be replaced
+        # by another schema with the same partial schema name, so register ours
+        # before each validation:
+        pykwalify.partial_schemas.update(self.partial_rules)
+        self.source = data
+        self.errors = []
+        self._validate(data, self.root_rule, "", [])
+        return not self.errors
+
+
+# Compiled schemas for this process, keyed by absolute schema filename:
+_compiled_schemas = {}
+
+
+def get_compiled_schema(schema_file):
+    """Return the compiled schema for a schema file, compiling it on first use."""
+    schema_file = os.path.abspath(schema_file)
+    schema = _compiled_schemas.get(schema_file)
+    if schema is None:
+        schema = compiled_schema(schema_file)
+        _compiled_schemas[schema_file] = schema
+    return schema
+
+
+def _validate_file_contents(file_contents, schema_file):
+    """
+    Validate YAML file contents against a schema the way pykwalify does it
+    natively, raising pykwalify's exception on failure.
+    """
+    import tempfile
+
+    # Pykwalify requires a the yaml be stored in a file prior to validation. We may
+    # have altered the contents of the yaml based on the adamant global configuration
+    # variables. So save the (possibly modified) file contents to a temp file, and then
+    # pass that into Pykwalify.
+    temp_fd, temp_file = tempfile.mkstemp(suffix=".yaml")
+    try:
+        with os.fdopen(temp_fd, "w") as tmp:
+            # Write model file contents to temp file
+            tmp.write(file_contents)
+        # Perform Pykwalify model validation against the schema
+        c = Core(source_file=temp_file, schema_files=[schema_file])
+        c.validate(raise_exception=True)
+    finally:
+        # Make sure we clean up the temp file.
+        os.remove(temp_file)
+
+
+def validate(data, file_contents, schema_file):
+    """
+    Validate parsed YAML data against a schema file. The file contents the data
+    was parsed from are only used to produce pykwalify's usual error message if
+    the data is invalid. Raises an exception on failure.
+    """
+    # The fast path can be turned off, which validates every model the original way:
+    if "ADAMANT_DISABLE_FAST_SCHEMA_VALIDATION" in os.environ:
+        _validate_file_contents(file_contents, schema_file)
+        return
+
+    schema = get_compiled_schema(schema_file)
+    if not schema.is_valid(data):
+        _validate_file_contents(file_contents, schema_file)
+        # The fast path and pykwalify should never disagree, but if they do, report
+        # the fast path errors rather than silently accepting the data:
+        raise SchemaError(
+            "Schema validation failed:\n - {error_msg}.".format(
+                error_msg=".\n - ".join(str(error) for error in schema.errors)
+            )
+        )
@@ -170,6 +170,9 @@ class connector(subprogram):
         self._connector_package = _connector_package_map[self._kind]
         self._connected_to = [None] * count  # List of connected connector objects
         self._connections = [None] * count  # List of connected connection objects
+        # Bitmaps of the indexes that are connected or ignored, bit 0 being index 1:
+        self._connected_bits = 0
+        self._ignored_bits = 0
         self._unconstrained = False
         if self._count == 0:
             self._unconstrained = True
@@ -465,6 +468,8 @@ class connector(subprogram):
         assert not self._connected_to, "This would be a bug."
         self._connected_to = [None] * self._count
         self._connections = [None] * self._count
+        self._connected_bits = 0
+        self._ignored_bits = 0
 
     def set_type_generic(self, serialized_length_func=False):
         self.parameter.set_generic()
@@ -525,6 +530,20 @@ class connector(subprogram):
         conn = self._connected_to[index - 1]
         return bool(conn == "ignore")
 
+    def num_ignored(self):
+        """Return the number of indexes of the connector that are ignored."""
+        return bin(self._ignored_bits).count("1")
+
+    def unconnected_indexes(self):
+        """Return the indexes of the connector that are neither connected nor ignored, in order."""
+        open_bits = ~(self._connected_bits | self._ignored_bits) & ((1 << len(self._connected_to)) - 1)
+        indexes = []
+        while open_bits:
+            low_bit = open_bits & -open_bits
+            indexes.append(low_bit.bit_length())
+            open_bits ^= low_bit
+        return indexes
+
     def get_connected(self):
         return self._connector_to
 
@@ -615,6 +634,7 @@ class connector(subprogram):
                     )
             self._connected_to[from_index - 1] = connector
             self._connections[from_index - 1] = connection
+            self._connected_bits |= 1 << (from_index - 1)
         except IndexError:
             err(
                 "From index '"
@@ -639,6 +659,7 @@ class connector(subprogram):
             except AttributeError:
                 connector._connected_to[to_index - 1] = [self]
                 connector._connections[to_index - 1] = [connection]
+            connector._connected_bits |= 1 << (to_index - 1)
         except IndexError:
             err(
                 "To index '"
@@ -683,6 +704,7 @@ class connector(subprogram):
                         )
                 self._connected_to[index - 1] = "ignore"
                 self._connections[index - 1] = "ignore"
+                self._ignored_bits |= 1 << (index - 1)
             except IndexError:
                 err(
                     "Index '"
@@ -704,6 +726,7 @@ class connector(subprogram):
             else:
                 self._connected_to[index - 1] = "ignore"
                 self._connections[index - 1] = "ignore"
+                self._ignored_bits |= 1 << (index - 1)
 
 
 class connectors(object):
@@ -992,6 +1015,12 @@ class connectors(object):
 
     def of_name(self, name):
         """Non cached filters."""
+        # The connectors are stored by their formatted names, so a name that is
+        # already formatted, as it is when connecting an assembly, is found as is:
+        try:
+            return self._connectors[name]
+        except KeyError:
+            pass
         name = ada.formatType(name)
         try:
             return self._connectors[name]
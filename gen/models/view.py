@@ -1,8 +1,6 @@
 import models.base
 from util import ada
-import models.assembly
 import os
-import copy
 from collections import OrderedDict
 from models.exceptions import ModelException
 import sys
@@ -135,420 +133,334 @@ def check_data_dependency_names(filter_obj, assm):
 
 
 #################################################
-# Filter combinators:
+# Assembly index and selections:
 ##################################################
 
+# A view is applied to an assembly without copying it. The components,
+# connections, and data dependencies of the assembly are numbered once,
+# in an assembly_index, and a filter, or a combination of filters, maps
+# a selection of those numbers to a new selection. The assembly itself
+# is never modified, so every filter of a view shares it. The selected
+# items are only looked up once the rule has been applied, to make the
+# view_assembly that is rendered by the templates.
 
-def include_component_name_filter(filter_obj, assm):
-    check_component_names(filter_obj, assm)
 
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.instance_name in filter_obj.item_list:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
+class assembly_index(object):
+    """
+    Numbers the components, connections, and data dependencies of an
+    assembly, and records which components each connection and data
+    dependency joins, so that filters can work on sets of numbers.
+    """
+    def __init__(self, assm, show_data_dependencies=False):
+        self.show_data_dependencies = show_data_dependencies
+        self.components = list(assm.components.values())
+        self.component_numbers = {
+            c.instance_name: number for number, c in enumerate(self.components)
+        }
+        self.connections = list(assm.connections)
+        self.connection_ends = [
+            (
+                self.component_numbers[c.from_component.instance_name],
+                self.component_numbers[c.to_component.instance_name],
+            )
+            for c in self.connections
+        ]
+        # Data dependencies are numbered in the order of their ids, and the
+        # id of each is kept, so that they can be grouped by id again:
+        self.data_dependencies = [
+            (id, dd) for id, dd_list in assm.data_dependencies.items() for dd in dd_list
+        ]
+        self.data_dependency_ends = [
+            (
+                self.component_numbers[dd.data_product.suite.component.instance_name],
+                self.component_numbers[dd.suite.component.instance_name],
+            )
+            for id, dd in self.data_dependencies
+        ]
+        # The components selected by each group operation, see assembly_group:
+        self.groups = []
 
-    return f
+    def select_all(self):
+        """Return a selection of the entire assembly."""
+        return selection(
+            self,
+            tuple(range(len(self.components))),
+            tuple(range(len(self.connections))),
+            tuple(range(len(self.data_dependencies))),
+        )
 
 
-def exclude_component_name_filter(filter_obj, assm):
-    check_component_names(filter_obj, assm)
+class selection(object):
+    """
+    The components, connections, and data dependencies of an assembly
+    selected by a view, as tuples of their numbers in an assembly_index.
+    The order of each tuple is the order the items are rendered in.
+    """
+    def __init__(self, index, components, connections, data_dependencies):
+        self.index = index
+        self.components = components
+        self.connections = connections
+        self.data_dependencies = data_dependencies
+
+    def replace(self, components=None, connections=None, data_dependencies=None):
+        """Return a new selection, replacing any of the given parts of this one."""
+        return selection(
+            self.index,
+            self.components if components is None else components,
+            self.connections if connections is None else connections,
+            self.data_dependencies if data_dependencies is None else data_dependencies,
+        )
 
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.instance_name in filter_obj.item_list:
-                pass
-            else:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
 
-    return f
+def _keep(numbers, predicate, include):
+    """Return the numbers, in order, for which the predicate is equal to include."""
+    return tuple(n for n in numbers if bool(predicate(n)) == include)
 
 
-def include_component_type_filter(filter_obj, assm):
-    check_component_types(filter_obj, assm)
+def _difference(numbers, other):
+    other = set(other)
+    return tuple(n for n in numbers if n not in other)
 
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.name in filter_obj.item_list:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
 
-    return f
+def _intersection(numbers, other):
+    other = set(other)
+    return tuple(n for n in numbers if n in other)
 
 
-def exclude_component_type_filter(filter_obj, assm):
-    check_component_types(filter_obj, assm)
-
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.name in filter_obj.item_list:
-                pass
-            else:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
-
-    return f
+def _union(numbers, other):
+    return numbers + _difference(other, numbers)
 
 
-def include_component_execution_filter(filter_obj, assm):
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.instance_execution in filter_obj.item_list:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
+#################################################
+# Filter combinators:
+##################################################
 
-    return f
 
+def _component_filter(filter_obj, include, get_attribute):
+    """Make a filter that selects components by an attribute of the component model."""
+    items = set(filter_obj.item_list)
 
-def exclude_component_execution_filter(filter_obj, assm):
-    def f(assm_to_filter):
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.instance_execution in filter_obj.item_list:
-                pass
-            else:
-                components[component.instance_name] = component
-        assm_to_filter.components = components
-        return assm_to_filter
+    def f(sel):
+        components = sel.index.components
+        return sel.replace(
+            components=_keep(
+                sel.components, lambda n: get_attribute(components[n]) in items, include
+            )
+        )
 
     return f
 
 
-def _add_data_dependency_components(assm_to_filter, components):
-    """When show_data_dependencies is True, expand a set of component names to include
+def _add_data_dependency_components(sel, components):
+    """When show_data_dependencies is True, expand a set of component numbers to include
     direct neighbors connected via data dependencies. Only adds components that are
     one hop away (no transitive closure), matching the behavior of connection-based
     context filters."""
-    if not assm_to_filter.show_switches.get("show_data_dependencies", False):
+    if not sel.index.show_data_dependencies:
         return
     # Snapshot the original set so we only consider direct neighbors of
     # the originally selected components, not neighbors of neighbors:
     original = set(components)
-    for id, dd_list in assm_to_filter.data_dependencies.items():
-        for dd in dd_list:
-            to_name = dd.suite.component.instance_name
-            from_name = dd.data_product.suite.component.instance_name
-            if to_name in original and from_name not in components:
-                components.add(from_name)
-            elif from_name in original and to_name not in components:
-                components.add(to_name)
+    for n in sel.data_dependencies:
+        from_number, to_number = sel.index.data_dependency_ends[n]
+        if to_number in original and from_number not in components:
+            components.add(from_number)
+        elif from_number in original and to_number not in components:
+            components.add(to_number)
 
 
-def include_component_name_context_filter(filter_obj, assm):
-    check_component_names(filter_obj, assm)
-
-    def f(assm_to_filter):
-        connections = []
-        components = []
-        for connection in assm_to_filter.connections:
-            if (
-                connection.to_component.instance_name in filter_obj.item_list
-                or connection.from_component.instance_name in filter_obj.item_list
-            ):
-                connections.append(connection)
-                components.append(connection.to_component.instance_name)
-                components.append(connection.from_component.instance_name)
-        components = set(components)
-        _add_data_dependency_components(assm_to_filter, components)
-        assm_to_filter.connections = connections
-        new_components = OrderedDict()
-        for c_name, c in assm_to_filter.components.items():
-            if c_name in components:
-                new_components[c_name] = c
-        assm_to_filter.components = new_components
-        return assm_to_filter
+def _component_context_filter(filter_obj, include, get_attribute):
+    """
+    Make a filter that selects the connections to or from components with an
+    attribute of the component model, and the components on either end of them.
+    """
+    items = set(filter_obj.item_list)
+
+    def f(sel):
+        index = sel.index
+        matches = [get_attribute(c) in items for c in index.components]
+        connections = _keep(
+            sel.connections,
+            lambda n: matches[index.connection_ends[n][0]] or matches[index.connection_ends[n][1]],
+            include,
+        )
+        components = {end for n in connections for end in index.connection_ends[n]}
+        _add_data_dependency_components(sel, components)
+        return sel.replace(
+            components=_intersection(sel.components, components), connections=connections
+        )
 
     return f
 
 
-def exclude_component_name_context_filter(filter_obj, assm):
-    check_component_names(filter_obj, assm)
+def _connection_filter(filter_obj, include, predicate):
+    """Make a filter that selects connections by the predicate(connection, items)."""
+    items = set(filter_obj.item_list)
 
-    def f(assm_to_filter):
-        connections = []
-        components = []
-        for connection in assm_to_filter.connections:
-            if (
-                connection.to_component.instance_name in filter_obj.item_list
-                or connection.from_component.instance_name in filter_obj.item_list
-            ):
-                pass
-            else:
-                connections.append(connection)
-                components.append(connection.to_component.instance_name)
-                components.append(connection.from_component.instance_name)
-        components = set(components)
-        _add_data_dependency_components(assm_to_filter, components)
-        assm_to_filter.connections = connections
-        new_components = OrderedDict()
-        for c_name, c in assm_to_filter.components.items():
-            if c_name in components:
-                new_components[c_name] = c
-        assm_to_filter.components = new_components
-        return assm_to_filter
+    def f(sel):
+        connections = sel.index.connections
+        return sel.replace(
+            connections=_keep(
+                sel.connections, lambda n: predicate(connections[n], items), include
+            )
+        )
 
     return f
 
 
-def include_component_type_context_filter(filter_obj, assm):
-    check_component_types(filter_obj, assm)
+def _data_dependency_filter(filter_obj, include, predicate):
+    """Make a filter that selects data dependencies by the predicate(dd, items)."""
+    items = set(filter_obj.item_list)
 
-    def f(assm_to_filter):
-        comp_to_type = {
-            x.instance_name: x.name for x in assm_to_filter.components.values()
-        }
-        connections = []
-        components = []
-        for connection in assm_to_filter.connections:
-            if (
-                comp_to_type[connection.to_component.instance_name]
-                in filter_obj.item_list
-                or comp_to_type[connection.from_component.instance_name]
-                in filter_obj.item_list
-            ):
-                connections.append(connection)
-                components.append(connection.to_component.instance_name)
-                components.append(connection.from_component.instance_name)
-        components = set(components)
-        _add_data_dependency_components(assm_to_filter, components)
-        assm_to_filter.connections = connections
-        new_components = OrderedDict()
-        for c_name, c in assm_to_filter.components.items():
-            if c_name in components:
-                new_components[c_name] = c
-        assm_to_filter.components = new_components
-        return assm_to_filter
+    def f(sel):
+        data_dependencies = sel.index.data_dependencies
+        return sel.replace(
+            data_dependencies=_keep(
+                sel.data_dependencies, lambda n: predicate(data_dependencies[n][1], items), include
+            )
+        )
 
     return f
 
 
-def exclude_component_type_context_filter(filter_obj, assm):
+def _instance_name(component):
+    return component.instance_name
+
+
+def _type_name(component):
+    return component.name
+
+
+def _instance_execution(component):
+    return component.instance_execution
+
+
+def _connector_name_matches(connection, items):
+    return connection.to_name in items or connection.from_name in items
+
+
+def _connector_base_name_matches(connection, items):
+    # Currently if you remove an arrayed connector, the following code will remove all
+    # components of that array. TODO: maybe make a way to remove one at a time, and another
+    # method to remove all of the array.
+    return connection.to_name.split("[")[0] in items or connection.from_name.split("[")[0] in items
+
+
+def _connector_type_matches(connection, items):
+    return (connection.to_connector.type and connection.to_connector.type in items) or (
+        connection.to_connector.return_type and connection.to_connector.return_type in items
+    )
+
+
+def _connector_kind_matches(connection, items):
+    return connection.to_connector.kind in items or connection.from_connector.kind in items
+
+
+def _data_dependency_type_matches(dd, items):
+    return dd.type in items
+
+
+def _data_dependency_name_matches(dd, items):
+    return (
+        dd.suite.component.instance_name + "." + dd.name in items
+        or dd.data_product.suite.component.instance_name + "." + dd.data_product.name in items
+    )
+
+
+def include_component_name_filter(filter_obj, assm):
+    check_component_names(filter_obj, assm)
+    return _component_filter(filter_obj, True, _instance_name)
+
+
+def exclude_component_name_filter(filter_obj, assm):
+    check_component_names(filter_obj, assm)
+    return _component_filter(filter_obj, False, _instance_name)
+
+
+def include_component_type_filter(filter_obj, assm):
     check_component_types(filter_obj, assm)
+    return _component_filter(filter_obj, True, _type_name)
 
-    def f(assm_to_filter):
-        comp_to_type = {
-            x.instance_name: x.name for x in assm_to_filter.components.values()
-        }
-        connections = []
-        components = []
-        for connection in assm_to_filter.connections:
-            if (
-                comp_to_type[connection.to_component.instance_name]
-                in filter_obj.item_list
-                or comp_to_type[connection.from_component.instance_name]
-                in filter_obj.item_list
-            ):
-                pass
-            else:
-                connections.append(connection)
-                components.append(connection.to_component.instance_name)
-                components.append(connection.from_component.instance_name)
-        components = set(components)
-        _add_data_dependency_components(assm_to_filter, components)
-        assm_to_filter.connections = connections
-        new_components = OrderedDict()
-        for c_name, c in assm_to_filter.components.items():
-            if c_name in components:
-                new_components[c_name] = c
-        assm_to_filter.components = new_components
-        return assm_to_filter
 
-    return f
+def exclude_component_type_filter(filter_obj, assm):
+    check_component_types(filter_obj, assm)
+    return _component_filter(filter_obj, False, _type_name)
 
 
-def include_connector_name_filter(filter_obj, assm):
-    check_connector_names(filter_obj, assm)
+def include_component_execution_filter(filter_obj, assm):
+    return _component_filter(filter_obj, True, _instance_execution)
 
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            if (
-                connection.to_name in filter_obj.item_list
-                or connection.from_name in filter_obj.item_list
-            ):
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
 
-    return f
+def exclude_component_execution_filter(filter_obj, assm):
+    return _component_filter(filter_obj, False, _instance_execution)
 
 
-def exclude_connector_name_filter(filter_obj, assm):
-    check_connector_names(filter_obj, assm)
+def include_component_name_context_filter(filter_obj, assm):
+    check_component_names(filter_obj, assm)
+    return _component_context_filter(filter_obj, True, _instance_name)
 
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            # Currently if you remove an arrayed connector, the following code will remove all
-            # components of that array. TODO: maybe make a way to remove one at a time, and another
-            # method to remove all of the array.
-            if (
-                connection.to_name.split("[")[0] in filter_obj.item_list
-                or connection.from_name.split("[")[0] in filter_obj.item_list
-            ):
-                pass
-            else:
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
 
-    return f
+def exclude_component_name_context_filter(filter_obj, assm):
+    check_component_names(filter_obj, assm)
+    return _component_context_filter(filter_obj, False, _instance_name)
 
 
-def include_connector_type_filter(filter_obj, assm):
-    check_connector_types(filter_obj, assm)
+def include_component_type_context_filter(filter_obj, assm):
+    check_component_types(filter_obj, assm)
+    return _component_context_filter(filter_obj, True, _type_name)
 
-    # Filter function:
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            if (
-                (
-                    connection.to_connector.type
-                    and connection.to_connector.type in filter_obj.item_list
-                ) or (
-                    connection.to_connector.return_type
-                    and connection.to_connector.return_type in filter_obj.item_list
-                )
-            ):
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
 
-    return f
+def exclude_component_type_context_filter(filter_obj, assm):
+    check_component_types(filter_obj, assm)
+    return _component_context_filter(filter_obj, False, _type_name)
 
 
-def exclude_connector_type_filter(filter_obj, assm):
+def include_connector_name_filter(filter_obj, assm):
+    check_connector_names(filter_obj, assm)
+    return _connection_filter(filter_obj, True, _connector_name_matches)
+
+
+def exclude_connector_name_filter(filter_obj, assm):
+    check_connector_names(filter_obj, assm)
+    return _connection_filter(filter_obj, False, _connector_base_name_matches)
+
+
+def include_connector_type_filter(filter_obj, assm):
     check_connector_types(filter_obj, assm)
+    return _connection_filter(filter_obj, True, _connector_type_matches)
 
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            if (
-                (
-                    connection.to_connector.type
-                    and connection.to_connector.type in filter_obj.item_list
-                ) or (
-                    connection.to_connector.return_type
-                    and connection.to_connector.return_type in filter_obj.item_list
-                )
-            ):
-                pass
-            else:
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
 
-    return f
+def exclude_connector_type_filter(filter_obj, assm):
+    check_connector_types(filter_obj, assm)
+    return _connection_filter(filter_obj, False, _connector_type_matches)
 
 
 def include_connector_kind_filter(filter_obj, assm):
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            if (
-                connection.to_connector.kind in filter_obj.item_list
-                or connection.from_connector.kind in filter_obj.item_list
-            ):
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
-
-    return f
+    return _connection_filter(filter_obj, True, _connector_kind_matches)
 
 
 def exclude_connector_kind_filter(filter_obj, assm):
-    def f(assm_to_filter):
-        connections = []
-        for connection in assm_to_filter.connections:
-            if (
-                connection.to_connector.kind in filter_obj.item_list
-                or connection.from_connector.kind in filter_obj.item_list
-            ):
-                pass
-            else:
-                connections.append(connection)
-        assm_to_filter.connections = connections
-        return assm_to_filter
-
-    return f
+    return _connection_filter(filter_obj, False, _connector_kind_matches)
 
 
 def include_data_dependency_type_filter(filter_obj, assm):
     check_data_dependency_types(filter_obj, assm)
-
-    def f(assm_to_filter):
-        data_deps = {}
-        for id, dd_list in assm_to_filter.data_dependencies.items():
-            filtered = [dd for dd in dd_list if dd.type in filter_obj.item_list]
-            if filtered:
-                data_deps[id] = filtered
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
-    return f
+    return _data_dependency_filter(filter_obj, True, _data_dependency_type_matches)
 
 
 def exclude_data_dependency_type_filter(filter_obj, assm):
     check_data_dependency_types(filter_obj, assm)
-
-    def f(assm_to_filter):
-        data_deps = {}
-        for id, dd_list in assm_to_filter.data_dependencies.items():
-            filtered = [dd for dd in dd_list if dd.type not in filter_obj.item_list]
-            if filtered:
-                data_deps[id] = filtered
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
-    return f
+    return _data_dependency_filter(filter_obj, False, _data_dependency_type_matches)
 
 
 def include_data_dependency_name_filter(filter_obj, assm):
     check_data_dependency_names(filter_obj, assm)
-
-    def f(assm_to_filter):
-        data_deps = {}
-        for id, dd_list in assm_to_filter.data_dependencies.items():
-            filtered = [dd for dd in dd_list if (
-                dd.suite.component.instance_name + "." + dd.name in filter_obj.item_list
-                or dd.data_product.suite.component.instance_name + "." + dd.data_product.name in filter_obj.item_list
-            )]
-            if filtered:
-                data_deps[id] = filtered
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
-    return f
+    return _data_dependency_filter(filter_obj, True, _data_dependency_name_matches)
 
 
 def exclude_data_dependency_name_filter(filter_obj, assm):
     check_data_dependency_names(filter_obj, assm)
-
-    def f(assm_to_filter):
-        data_deps = {}
-        for id, dd_list in assm_to_filter.data_dependencies.items():
-            filtered = [dd for dd in dd_list if not (
-                dd.suite.component.instance_name + "." + dd.name in filter_obj.item_list
-                or dd.data_product.suite.component.instance_name + "." + dd.data_product.name in filter_obj.item_list
-            )]
-            if filtered:
-                data_deps[id] = filtered
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
-    return f
+    return _data_dependency_filter(filter_obj, False, _data_dependency_name_matches)
 
 
 # this dictionary is key'd by the tuple:
@@ -556,8 +468,8 @@ def exclude_data_dependency_name_filter(filter_obj, assm):
 # where include is a boolean where:
 #   include = True, exclude = False
 # the dictionary values are the filter combinator
-# which returns a function that takes assembly data
-# and returns modified (filtered) assembly data.
+# which returns a function that takes a selection
+# and returns a new (filtered) selection.
 filter_type_dict = {
     ("component_name", True): include_component_name_filter,
     ("component_name", False): exclude_component_name_filter,
@@ -582,234 +494,139 @@ filter_type_dict = {
 }
 
 
-def prune(assm_to_filter):
-    component_names = [x.instance_name for x in assm_to_filter.components.values()]
+def prune(sel):
+    index = sel.index
+    components = set(sel.components)
 
     # Cleanup 1: Remove connections for which there is no component:
-    components_with_connections = []
-    new_connections = []
-    for connection in assm_to_filter.connections:
-        to_component = connection.to_component.instance_name
-        from_component = connection.from_component.instance_name
-        if (to_component in component_names) and (from_component in component_names):
-            components_with_connections.append(to_component)
-            components_with_connections.append(from_component)
-            new_connections.append(connection)
-    assm_to_filter.connections = new_connections
+    connections = tuple(
+        n for n in sel.connections
+        if index.connection_ends[n][0] in components and index.connection_ends[n][1] in components
+    )
+    allowed = {end for n in connections for end in index.connection_ends[n]}
 
     # Cleanup 2: Remove data_dependencies for which there is no component:
-    components_with_data_dependencies = []
-    new_data_dependencies = {}
-    for id, dd_list in assm_to_filter.data_dependencies.items():
-        filtered = []
-        for dd in dd_list:
-            to_component = dd.suite.component.instance_name
-            from_component = dd.data_product.suite.component.instance_name
-            if (to_component in component_names) and (from_component in component_names):
-                components_with_data_dependencies.append(to_component)
-                components_with_data_dependencies.append(from_component)
-                filtered.append(dd)
-        if filtered:
-            new_data_dependencies[id] = filtered
-    assm_to_filter.data_dependencies = new_data_dependencies
-    assm_to_filter.num_data_dependencies = sum(len(dd_list) for dd_list in new_data_dependencies.values())
+    data_dependencies = tuple(
+        n for n in sel.data_dependencies
+        if index.data_dependency_ends[n][0] in components
+        and index.data_dependency_ends[n][1] in components
+    )
 
     # Cleanup 3: Remove components for which there is no connectors or data dependencies (if selected):
-    # Build the allowed set, then filter in input order.
-    if assm_to_filter.show_switches["show_data_dependencies"]:
-        allowed = set(components_with_connections) | set(components_with_data_dependencies)
-    else:
-        allowed = set(components_with_connections)
-    component_names = [c for c in component_names if c in allowed]
-
-    filtered_components = OrderedDict()
-    for name, c in assm_to_filter.components.items():
-        if name in component_names:
-            filtered_components[name] = c
-    assm_to_filter.components = filtered_components
-    return assm_to_filter
+    if index.show_data_dependencies:
+        allowed.update(end for n in data_dependencies for end in index.data_dependency_ends[n])
+    return selection(
+        index, _intersection(sel.components, allowed), connections, data_dependencies
+    )
 
 
 def assembly_not(filter1):
-    def f(assm_to_filter):
-        # Run the assembly through both filters to obtain new modified assemblies:
-        assm_to_filter1 = prune(filter1.apply(copy.deepcopy(assm_to_filter)))
+    def f(sel):
+        # Run the selection through the filter:
+        sel1 = prune(filter1.apply(sel))
 
-        # Union all component and connector names between two assemblies:
-        component_names1 = {
-            x.instance_name for x in assm_to_filter1.components.values()
-        }
-        connection_names1 = {x.name for x in assm_to_filter1.connections}
-        data_deps_ids1 = {id for id, dd_list in assm_to_filter1.data_dependencies.items()}
-
-        # Anything in the original assembly that is not in the filtered assembly
+        # Anything in the original selection that is not in the filtered selection
         # we should keep:
-        components = OrderedDict()
-        for component in assm_to_filter.components.values():
-            if component.instance_name not in component_names1:
-                components[component.instance_name] = component
-        connections = []
-        for connection in assm_to_filter.connections:
-            if connection.name not in connection_names1:
-                connections.append(connection)
-        data_deps = {}
-        for id, dd_list in assm_to_filter.data_dependencies.items():
-            if id not in data_deps_ids1:
-                # Entire id absent from filtered result, keep all dds:
-                data_deps[id] = dd_list
-            else:
-                # Id present in filtered result — keep only dds that were NOT in the filtered result:
-                filtered1_names = {
-                    dd.suite.component.instance_name + "." + dd.name
-                    for dd in assm_to_filter1.data_dependencies.get(id, [])
-                }
-                remaining = [
-                    dd for dd in dd_list
-                    if dd.suite.component.instance_name + "." + dd.name not in filtered1_names
-                ]
-                if remaining:
-                    data_deps[id] = remaining
-
-        # Create new assembly and return it:
-        assm_to_filter.components = components
-        assm_to_filter.connections = connections
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
+        return selection(
+            sel.index,
+            _difference(sel.components, sel1.components),
+            _difference(sel.connections, sel1.connections),
+            _difference(sel.data_dependencies, sel1.data_dependencies),
+        )
 
     return f
 
 
-def assembly_group(filter1, self):
-    def f(assm_to_filter):
-        # Run the assembly through both filters to obtain new modified assemblies:
-        assm_to_filter1 = prune(filter1.apply(copy.deepcopy(assm_to_filter)))
+def assembly_group(filter1):
+    def f(sel):
+        # Run the selection through the filter:
+        sel1 = prune(filter1.apply(sel))
 
-        # Save off the connections into a group:
-        self.groups.append(
-            {c.instance_name: c for c in assm_to_filter1.components.values()}
-        )
-        return assm_to_filter1
+        # Save off the components into a group:
+        sel.index.groups.append(sel1.components)
+        return sel1
 
     return f
 
 
 def assembly_intersection(filter1, filter2):
-    def f(assm_to_filter):
-        # Run the assembly through both filters to obtain new modified assemblies:
-        assm_to_filter1 = prune(filter1.apply(copy.deepcopy(assm_to_filter)))
-        assm_to_filter2 = prune(filter2.apply(copy.deepcopy(assm_to_filter)))
-
-        # Union all component and connector names between two assemblies:
-        component_names1 = {
-            x.instance_name for x in assm_to_filter1.components.values()
-        }
-        component_names2 = {
-            x.instance_name for x in assm_to_filter2.components.values()
-        }
-        component_names_intersect = component_names1.intersection(component_names2)
-        connection_names1 = {x.name for x in assm_to_filter1.connections}
-        connection_names2 = {x.name for x in assm_to_filter2.connections}
-        connection_names_intersect = connection_names1.intersection(connection_names2)
-
-        # Gather all intersected component and connectors and create new assembly:
-        components = OrderedDict()
-        for component in assm_to_filter1.components.values():
-            if component.instance_name in component_names_intersect:
-                components[component.instance_name] = component
-        connections = []
-        for connection in assm_to_filter1.connections:
-            if connection.name in connection_names_intersect:
-                connections.append(connection)
-        # Intersect data dependencies: keep only dds present in both filters
-        # (matched by component instance name + dd name):
-        data_deps = {}
-        ids2 = set(assm_to_filter2.data_dependencies.keys())
-        for id in assm_to_filter1.data_dependencies.keys():
-            if id not in ids2:
-                continue
-            names2 = {
-                dd.suite.component.instance_name + "." + dd.name
-                for dd in assm_to_filter2.data_dependencies[id]
-            }
-            intersected = [
-                dd for dd in assm_to_filter1.data_dependencies[id]
-                if dd.suite.component.instance_name + "." + dd.name in names2
-            ]
-            if intersected:
-                data_deps[id] = intersected
-
-        # Create new assembly and return it:
-        assm_to_filter.components = components
-        assm_to_filter.connections = connections
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
+    def f(sel):
+        # Run the selection through both filters:
+        sel1 = prune(filter1.apply(sel))
+        sel2 = prune(filter2.apply(sel))
+
+        # Keep the items in both, in the order of the first:
+        return selection(
+            sel.index,
+            _intersection(sel1.components, sel2.components),
+            _intersection(sel1.connections, sel2.connections),
+            _intersection(sel1.data_dependencies, sel2.data_dependencies),
+        )
 
     return f
 
 
 def assembly_union(filter1, filter2):
-    def f(assm_to_filter):
-        # Run the assembly through both filters to obtain new modified assemblies:
-        assm_to_filter1 = prune(filter1.apply(copy.deepcopy(assm_to_filter)))
-        assm_to_filter2 = prune(filter2.apply(copy.deepcopy(assm_to_filter)))
-
-        # Union all component and connector names between two assemblies:
-        component_names1 = {
-            x.instance_name for x in assm_to_filter1.components.values()
-        }
-        component_names2 = {
-            x.instance_name for x in assm_to_filter2.components.values()
-        }
-        component_names_union = component_names1.union(component_names2)
-        connection_names1 = {x.name for x in assm_to_filter1.connections}
-        connection_names2 = {x.name for x in assm_to_filter2.connections}
-        connection_names_union = connection_names1.union(connection_names2)
-
-        # Gather all unioned component and connectors and create new assembly:
-        components = OrderedDict()
-        for component in list(assm_to_filter1.components.values()) + list(
-            assm_to_filter2.components.values()
-        ):
-            if component.instance_name in component_names_union:
-                components[component.instance_name] = component
-                component_names_union.remove(component.instance_name)
-        connections = []
-        for connection in assm_to_filter1.connections + assm_to_filter2.connections:
-            if connection.name in connection_names_union:
-                connections.append(connection)
-                connection_names_union.remove(connection.name)
-        # Merge data dependency lists from both filters. For shared ids, combine
-        # lists and deduplicate by component.instance_name + dd.name:
-        data_deps = {}
-        all_ids = list(dict.fromkeys(
-            list(assm_to_filter1.data_dependencies.keys())
-            + list(assm_to_filter2.data_dependencies.keys())
-        ))
-        for id in all_ids:
-            list1 = assm_to_filter1.data_dependencies.get(id, [])
-            list2 = assm_to_filter2.data_dependencies.get(id, [])
-            seen = set()
-            merged = []
-            for dd in list1 + list2:
-                key = dd.suite.component.instance_name + "." + dd.name
-                if key not in seen:
-                    seen.add(key)
-                    merged.append(dd)
-            if merged:
-                data_deps[id] = merged
-
-        # Create new assembly and return it:
-        assm_to_filter.components = components
-        assm_to_filter.connections = connections
-        assm_to_filter.data_dependencies = data_deps
-        assm_to_filter.num_data_dependencies = sum(len(v) for v in data_deps.values())
-        return assm_to_filter
+    def f(sel):
+        # Run the selection through both filters:
+        sel1 = prune(filter1.apply(sel))
+        sel2 = prune(filter2.apply(sel))
+
+        # Keep the items in either, those of the first followed by those only in the second:
+        return selection(
+            sel.index,
+            _union(sel1.components, sel2.components),
+            _union(sel1.connections, sel2.connections),
+            _union(sel1.data_dependencies, sel2.data_dependencies),
+        )
 
     return f
 
 
+class view_assembly(models.base.renderable_object):
+    """
+    The filtered assembly of a view, rendered by the assembly templates in
+    place of the assembly itself. It refers to the component, connection,
+    and data dependency models of the assembly selected by the view,
+    rather than copying them.
+    """
+    def __init__(self, view_model, sel):
+        index = sel.index
+        # Add things to assembly from view to help out templates:
+        self.is_view = True
+        self.model_name = view_model.name
+        self.name = ada.formatType(self.model_name)
+        self.lowercasename = self.name.lower()
+        self.prettyname = self.name.replace("_", " ")
+        self.full_filename = "view model '" + view_model.name + "'"
+        self.layout = view_model.layout
+        self.show_switches = view_model.show_switches
+        self.groups = view_model.groups
+        self.preamble = view_model.preamble
+        self.postamble = view_model.postamble
+        self.description = view_model.description
+
+        # Look up the selected components, connections, and data dependencies:
+        self.components = OrderedDict()
+        for n in sel.components:
+            component = index.components[n]
+            self.components[component.instance_name] = component
+        self.connections = [index.connections[n] for n in sel.connections]
+        self.data_dependencies = {}
+        for n in sel.data_dependencies:
+            id, dd = index.data_dependencies[n]
+            self.data_dependencies.setdefault(id, []).append(dd)
+        self.num_data_dependencies = len(sel.data_dependencies)
+
+        # Set remaining components to aid in "group" graphing.
+        component_names = set(c for comps in self.groups for c in comps.keys())
+        self.remaining_components = [
+            c
+            for c in self.components.values()
+            if c.instance_name not in component_names
+        ]
+
+
 class Filter(object):
     def __init__(self, name, type, item_list=[], list_type="exclude"):
         self.name = name.lower()
@@ -1071,7 +888,7 @@ class view(models.base.base):
                 arg = tokens[0]
                 assert len(arg) == 2
                 op_self.filter = arg[1]
-                op_self.apply = assembly_group(op_self.filter, self)
+                op_self.apply = assembly_group(op_self.filter)
 
             def __str__(op_self):
                 return "group(" + str(op_self.filter) + ")"
@@ -1159,75 +976,23 @@ class view(models.base.base):
             )
 
     def apply(self, assm):
-        def new_assembly(data, data_dependencies):
-            """Create new assembly object from a YAML data object."""
-            # Create new assembly
-            a = models.assembly.assembly(filename=None, is_subassembly=True)
-            # Add things to assembly from view to help out templates:
-            a.is_view = True
-            a.model_name = self.name
-            a.layout = self.layout
-            a.full_filename = "view model '" + self.name + "'"
-            a.printMultiLine = models.base.printMultiLine
-            a.data = data
-            # Add all view "show" switches to assembly:
-            a.show_switches = self.show_switches
-            a.groups = self.groups
-            # Load and check the new assembly:
-            a.load()
-            a.preamble = self.preamble
-            a.postamble = self.postamble
-            a.description = self.description
-            # Set remaining components to aid in "group" graphing.
-            component_names = set(c for comps in self.groups for c in comps.keys())
-            a.remaining_components = [
-                c
-                for c in a.components.values()
-                if c.instance_name not in component_names
-            ]
-            a.data_dependencies = data_dependencies
-            a.num_data_dependencies = sum(len(dd_list) for dd_list in data_dependencies.values())
-            return a
-
-        # We will apply changes to only the assm.data object and then we will
-        # refresh the assembly object with this new data later.
-        assm_copy = copy.deepcopy(assm)
+        """
+        Apply the view's rule to an assembly, and return the view_assembly
+        of the components, connections, and data dependencies it selects.
+        The assembly itself is left unchanged.
+        """
         # Parse the rule to obtain a filter function:
         filt = self._parseRule(assm)
         # Allow prune to respect show/hide data_dependencies
-        assm_copy.show_switches["show_data_dependencies"] = self.show_switches["show_data_dependencies"]
-        # Apply the filter to the data:
-        # import sys
-        # sys.stderr.write("FILTER: " + str(filt) + "\n")
+        index = assembly_index(assm, self.show_switches["show_data_dependencies"])
+        # Apply the filter to the entire assembly:
+        sel = index.select_all()
         if filt:
-            new_assm = prune(filt.apply(assm_copy))
-        else:
-            new_assm = assm_copy
-
-        # Create a new "data" dictionary from the new assembly
-        # object. We do this in order to create a truly "fresh"
-        # assembly object which includes only the filtered items.
-        # Creating a "data" dictionary allows us to simulate the
-        # loading of a YAML file from scratch with only the filtered
-        # data in it.
-        new_data = new_assm.data
-
-        # Stuff filtered component data:
-        new_component_data = []
-        for component in new_assm.components.values():
-            new_component_data.append(component.instance_data)
-        new_data["components"] = new_component_data
-
-        # Stuff filtered connection data:
-        new_connection_data = []
-        for connection in new_assm.connections:
-            new_connection_data.append(connection.data)
-        new_data["connections"] = new_connection_data
-
-        # Remove any subassemblies, since our new data will already
-        # contain subassembly components and connections, we don't want
-        # to reload them:
-        new_data["subassemblies"] = []
-
-        # Create an assembly out of the new data and return it:
-        return new_assembly(new_data, new_assm.data_dependencies)
+            sel = prune(filt.apply(sel))
+
+        # Look up the components of each group:
+        self.groups = [
+            {index.components[n].instance_name: index.components[n] for n in group}
+            for group in index.groups
+        ]
+        return view_assembly(self, sel)
@@ -6,6 +6,9 @@
 
 from base_classes.packed_type_base import PackedTypeBase
 from bitstring import BitArray
+{% if struct_format %}
+import struct
+{% endif %}
 {% if element.is_packed_type %}
 
 # Internal packed type imports:
@@ -21,6 +24,18 @@ from {{ element.type_package|lower }} import {{ element.type_model.name }}
 {{ printMultiLine(description, '# ') }}
 {% endif %}
 class {{ name }}(PackedTypeBase):
+{% if struct_format %}
+    # Big endian layout of the elements, used to code this type with struct:
+    _struct = struct.Struct("{{ struct_format }}")
+{% endif %}
+{% if numpy_fields %}
+    # NumPy layout of the elements, as (name, type, offset in bytes, shape):
+    _numpy_fields = [
+{% for field_name, field_type, field_offset, field_shape in numpy_fields %}
+        ({{ field_name }}, {{ field_type }}, {{ field_offset }}, {{ field_shape }}),
+{% endfor %}
+    ]
+{% endif %}
 
     def __init__(self, elements=[]):
 
@@ -175,6 +190,80 @@ class {{ name }}(PackedTypeBase):
             "Expected: " + str(len(bits)) + " >= " + str(self._min_serialized_length_in_bits)
         return bits
 
+{% if struct_format %}
+{% if struct_kind != "nested" %}
+{% set unit = element.format.unit_size %}
+{% set mask = '0x%x' % (2 ** unit - 1) %}
+{% set sign_bit = '0x%x' % (2 ** (unit - 1)) %}
+{% endif %}
+    def _unpack_from(self, buffer, offset):
+        # Extract each element from the buffer:
+{% if struct_kind == "nested" %}
+        elements = [
+            {{ element.type_package }}._create_from_buffer(buffer, _offset)
+            for _offset in range(offset, offset + {{ size // 8 }}, {{ element.size // 8 }})
+        ]
+{% else %}
+{% if struct_kind == "bits" %}
+        _w = int.from_bytes(self._struct.unpack_from(buffer, offset)[0], "big")
+        _v = [
+{% if element.format.type[0] == "I" %}
+            (((_w >> _shift) & {{ mask }}) ^ {{ sign_bit }}) - {{ sign_bit }}
+{% else %}
+            (_w >> _shift) & {{ mask }}
+{% endif %}
+            for _shift in range({{ size - unit }}, -1, -{{ unit }})
+        ]
+{% else %}
+        _v = self._struct.unpack_from(buffer, offset)
+{% endif %}
+{% if element.format.length %}
+        elements = [
+            list(_v[_idx:_idx + {{ element.format.length }}])
+            for _idx in range(0, {{ struct_num_values }}, {{ element.format.length }})
+        ]
+{% elif element.is_enum %}
+        elements = [{{ element.type_model.name }}(_x) for _x in _v]
+{% else %}
+        elements = list(_v)
+{% endif %}
+{% endif %}
+        # Fill in self:
+        {{ name }}.__init__(self=self, elements=elements)
+
+    def _pack_into(self, buffer, offset):
+        if len(self.elements) != self.length:
+            raise ValueError("Expected length of element array to be '" + str(self.length) + "'.")
+{% if struct_kind == "nested" %}
+        for idx, e in enumerate(self.elements):
+            if e is not None:
+                e._pack_into(buffer, offset + idx * {{ element.size // 8 }})
+{% else %}
+{% if element.format.length %}
+        _values = [_x for e in self.elements for _x in (e if e else (0,) * {{ element.format.length }})]
+{% elif element.is_enum %}
+        _values = [e.value if e is not None else 0 for e in self.elements]
+{% elif element.format.type[0] == "F" %}
+        # Encode any NaN as the canonical NaN, like bitstring:
+        _values = [(e if e == e else float("nan")) if e is not None else 0 for e in self.elements]
+{% else %}
+        _values = [e if e is not None else 0 for e in self.elements]
+{% endif %}
+{% if struct_kind == "bits" %}
+{% if element.format.length %}
+        if len(_values) != {{ struct_num_values }}:
+            raise ValueError("Expected {{ struct_num_values }} values but instead found " + str(len(_values)) + ".")
+{% endif %}
+        _w = 0
+        for _x in _values:
+            _w = (_w << {{ unit }}) | self._bits(_x, {{ unit }}, {{ element.format.type[0] == "I" }})
+        self._struct.pack_into(buffer, offset, _w.to_bytes({{ size // 8 }}, "big"))
+{% else %}
+        self._struct.pack_into(buffer, offset, *_values)
+{% endif %}
+{% endif %}
+
+{% endif %}
     def to_string(self, prefix=""):
         strn = prefix + self.to_byte_string() + "\n"
         strn += prefix + "{{ name }} : array {{ element.type }} [0:{{ length - 1 }}] => [\n"
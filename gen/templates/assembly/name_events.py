@@ -47,3 +47,13 @@ event_id_cls_dict = {
         "{{ event.description|default('', true)|replace('\n', ' ')|replace('"', '\\"') }}"{{ "\n    " }}){{ "," if not loop.last }}
 {% endfor %}
 }
+{% if events.items() %}
+
+# ID to entity class dispatch table, a tuple indexed by ID, with None for
+# the IDs that are not used:
+event_id_cls_table = ecg.dispatch_table(event_id_cls_dict)
+{% else %}
+
+# ID to entity class dispatch table:
+event_id_cls_table = ()
+{% endif %}
@@ -6,6 +6,9 @@
 
 from base_classes.packed_type_base import PackedTypeBase
 from bitstring import BitArray
+{% if struct_format %}
+import struct
+{% endif %}
 
 # Internal packed type imports:
 {% if complex_type_models %}
@@ -24,6 +27,18 @@ from {{ model.suite.name|lower }} import {{ model.name }}
 {{ printMultiLine(description, '# ') }}
 {% endif %}
 class {{ name }}(PackedTypeBase):
+{% if struct_format %}
+    # Big endian layout of the fields, used to code this type with struct:
+    _struct = struct.Struct("{{ struct_format }}")
+{% endif %}
+{% if numpy_fields %}
+    # NumPy layout of the fields, as (name, type, offset in bytes, shape):
+    _numpy_fields = [
+{% for field_name, field_type, field_offset, field_shape in numpy_fields %}
+        ({{ field_name }}, {{ field_type }}, {{ field_offset }}, {{ field_shape }}),
+{% endfor %}
+    ]
+{% endif %}
 
     def __init__(
         self,
@@ -168,7 +183,35 @@ class {{ name }}(PackedTypeBase):
 
     def serialized_length(self):  # in bytes
 {% if variable_length %}
-        return len(self.to_byte_array())
+        return int(int(self._serialized_length_in_bits() - 1)/8 + 1)
+
+    def _serialized_length_in_bits(self):
+{% set last_field = (fields.values()|list)[-1] %}
+{% if last_field.variable_length %}
+        # The length is computed from the variable length field each time,
+        # since that field can be changed in place, ie. by appending to it:
+{% if last_field.is_packed_type %}
+        return {{ prefix_size }} + (
+            min(
+                (self.{{ last_field.variable_length }} + int({{ last_field.variable_length_offset }}))
+                * {{ last_field.type_model.element.size }},
+                {{ last_field.size }}
+            )
+            if self.{{ last_field.variable_length }} is not None else {{ last_field.size }}
+        )
+{% else %}
+        return {{ prefix_size }} + (
+            len(self.{{ last_field.name }}) * {{ last_field.format.unit_size }}
+            if self.{{ last_field.name }} else 0
+        )
+{% endif %}
+{% else %}
+        # The length of the nested variable length record:
+        return {{ prefix_size }} + (
+            self.{{ last_field.name }}._serialized_length_in_bits()
+            if self.{{ last_field.name }} is not None else {{ last_field.size }}
+        )
+{% endif %}
 {% else %}
         return self._size_in_bytes
 {% endif %}
@@ -260,6 +303,51 @@ class {{ name }}(PackedTypeBase):
             "Expected: " + str(len(bits)) + " >= " + str(self._min_serialized_length_in_bits)
         return bits
 
+{% if struct_format %}
+    def _unpack_from(self, buffer, offset):
+        # Extract each field from the buffer:
+        _v = self._struct.unpack_from(buffer, offset)
+{% for line in struct_word_lines %}
+        {{ line }}
+{% endfor %}
+        # Fill in self:
+        {{ name }}.__init__(
+            self=self,
+{% for field_name, expression in struct_decode.items() %}
+            {{ field_name }}={{ expression }}{{ "," if not loop.last else ""}}
+{% endfor %}
+        )
+
+    def _pack_into(self, buffer, offset):
+{% for field in fields.values() %}
+{% if field.is_packed_type %}
+{% elif field.format.length %}
+        _{{ field.name }} = self.{{ field.name }} if self.{{ field.name }} else (0,) * {{ field.format.length }}
+        if len(_{{ field.name }}) != {{ field.format.length }}:
+            raise ValueError("Expected length of list for field '{{ field.name }}' to be '{{ field.format.length }}'.")
+{% elif field.is_enum %}
+        _{{ field.name }} = self.{{ field.name }}.value if self.{{ field.name }} is not None else 0
+{% else %}
+        _{{ field.name }} = self.{{ field.name }} if self.{{ field.name }} is not None else 0
+{% if field.format.type[0] == "F" %}
+        if _{{ field.name }} != _{{ field.name }}:
+            _{{ field.name }} = float("nan")  # Encode any NaN as the canonical NaN, like bitstring.
+{% endif %}
+{% endif %}
+{% endfor %}
+        self._struct.pack_into(
+            buffer,
+            offset,
+{% for arg in struct_pack_args %}
+            {{ arg }}{{ "," if not loop.last }}
+{% endfor %}
+        )
+{% for field_name, nested_offset in struct_nested %}
+        if self.{{ field_name }} is not None:
+            self.{{ field_name }}._pack_into(buffer, offset + {{ nested_offset }})
+{% endfor %}
+
+{% endif %}
     def to_string(self, prefix=""):
         strn = prefix + self.to_byte_string() + "\n"
 {% for field in fields.values() %}
@@ -0,0 +1,21 @@
+--------------------------------------------------------------------------------
+-- {{ name }} Type Ranges
+--
+-- Generated from the packed records and arrays in {{ directory }}.
+--------------------------------------------------------------------------------
+
+with Ada.Text_IO; use Ada.Text_IO;
+{% for procedure in procedures.values() %}
+with {{ procedure }};
+{% endfor %}
+
+-- Prints the type ranges of each packed type in turn, each preceded by a line
+-- naming the packed type, so that the output can be split into the type ranges
+-- yaml file of each packed type.
+procedure {{ name }}_Type_Ranges is
+begin
+{% for model_name, procedure in procedures.items() %}
+   Put_Line ("{{ marker }}{{ model_name }}");
+   {{ procedure }};
+{% endfor %}
+end {{ name }}_Type_Ranges;
@@ -19,6 +19,7 @@ from ff import Ff
 from complex_float_array import Complex_Float_Array
 from test_enums import First_Enum
 from base_classes.packed_type_base import epsilon, get_epsilon
+from bitstring import BitStream
 import sys
 
 
@@ -204,3 +205,44 @@ if __name__ == "__main__":
     assert fa5.is_equal(fa6, num_elements_to_compare=2, epsilon=0.0)
     println("passed.")
     println()
+
+    println("testing struct codec matches bitstring codec:")
+    for arr in [u, en, fa1, cfa1, c, Unaligned_Array([0, 1023, 512, 1, 999, 0, 7, 1000])]:
+        cls = arr.__class__
+        assert cls._struct is not None
+        data = arr.to_byte_array()
+        assert data == arr._to_byte_array().tobytes()
+        from_bits = cls()
+        from_bits._from_byte_array(BitStream(data))
+        assert cls.create_from_byte_array(data) == from_bits
+        println(cls.__name__ + " passed.")
+    # Values that do not fit are still reported by bitstring:
+    try:
+        Unaligned_Array([1024, 0, 0, 0, 0, 0, 0, 0]).to_byte_array()
+        assert False, "Expected an out of range value to fail to serialize."
+    except Exception as e:
+        println("out of range value raised " + type(e).__name__)
+        assert not isinstance(e, AssertionError)
+    println("passed.")
+    println()
+
+    println("testing decode_many:")
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is None:
+        assert Float_Array.numpy_dtype() is None
+        println("NumPy is not installed, skipping.")
+    else:
+        decoded = Float_Array.decode_many(fa1.to_byte_array() + fa5.to_byte_array())
+        assert decoded.shape == (2, 12)
+        assert decoded[0].tolist() == fa1.elements
+        assert decoded[1].tolist() == fa5.elements
+        decoded = Complex_Array.decode_many(c.to_byte_array())
+        assert decoded.shape == (1, 25)
+        assert decoded[0][3]["Three"] == c.elements[3].Three
+        # Arrays of elements that are not byte aligned do not have a dtype:
+        assert Unaligned_Array.numpy_dtype() is None
+    println("passed.")
+    println()
@@ -0,0 +1,14 @@
+from environments import test, modify_build_path  # noqa: F401
+import os
+
+this_dir = os.path.dirname(os.path.realpath(__file__))
+modify_build_path.add_to_build_path(
+    [
+        this_dir,
+        os.path.realpath(
+            os.path.join(
+                this_dir, ".." + os.sep + ".." + os.sep + ".." + os.sep + "doc" + os.sep + "example_architecture"
+            )
+        ),
+    ]
+)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import sys
+
+# Set up the build system, so that the example assemblies can be loaded:
+import database.setup
+
+this_file = os.path.realpath(__file__)
+database.setup.setup(this_file, os.path.splitext(this_file)[0], this_file + ".out")
+
+from models.assembly import id_allocator
+from util import model_loader
+
+
+def println(strn=""):
+    sys.stderr.write(strn + "\n")
+
+
+# The ids assigned to the entities of the example assemblies in
+# doc/example_architecture, by entity type:
+expected_ids = {
+    "science_assembly": {
+        "commands": {
+            1: "Command_Router_Instance.Noop",
+            2: "Science_Instance.Enable_Science",
+            3: "Science_Instance.Disable_Science",
+        },
+        "data_products": {
+            1: "Data_Collector_Instance.Sensor_1_Data",
+            2: "Data_Collector_Instance.Sensor_2_Data",
+            100: "Science_Instance.Science_1_Data",
+            101: "Science_Instance.Science_2_Data",
+        },
+        "events": {
+            1: "Rate_Group_Instance.Cycle_Slip",
+            2: "Rate_Group_Instance.Incoming_Tick_Dropped",
+            3: "Command_Router_Instance.Command_Received",
+            4: "Command_Router_Instance.Noop_Received",
+            5: "Command_Router_Instance.Invalid_Command_Received",
+            6: "Science_Instance.Science_Started",
+            7: "Science_Instance.Science_Stopped",
+        },
+        "parameters": {
+            1: "Science_Instance.Calibration_Coefficient_1",
+            2: "Science_Instance.Calibration_Coefficient_2",
+        },
+    },
+    "science_to_tester": {},
+}
+
+
+def find_open_id_base_by_stepping(id_list, num_ids_to_reserve, min_id=1):
+    """
+    The original search for an open swath of ids, which checks the ids
+    one at a time. The id_allocator must give the same answers.
+    """
+    count = 0
+    curr_id = min_id
+    while count < num_ids_to_reserve:
+        if curr_id in id_list:
+            count = 0
+        else:
+            count += 1
+        curr_id += 1
+    return curr_id - num_ids_to_reserve
+
+
+println("testing id allocator ranges:")
+ids = id_allocator([5, 3, 4, 10, 12, 11, 1])
+assert ids.starts == [1, 3, 10], ids.starts
+assert ids.ends == [1, 5, 12], ids.ends
+ids.reserve(2)
+assert ids.starts == [1, 10], ids.starts
+assert ids.ends == [5, 12], ids.ends
+assert 5 in ids
+assert 6 not in ids
+assert ids.find_open_id_base(4) == 6
+assert ids.find_open_id_base(5) == 13
+assert ids.find_open_id_base(2, min_id=9) == 13
+assert ids.find_open_id_base(2, min_id=7) == 7
+assert ids.find_open_id_base(0, min_id=3) == 3
+println("passed.")
+
+println("testing id allocator against the original search:")
+rand = random.Random(1)
+for _ in range(5000):
+    reserved = set()
+    ids = id_allocator()
+    for _ in range(rand.randint(0, 40)):
+        id = rand.randint(1, 120)
+        reserved.add(id)
+        ids.reserve(id)
+    num_ids = rand.randint(0, 12)
+    min_id = rand.randint(1, 130)
+    assert ids.find_open_id_base(num_ids, min_id) == find_open_id_base_by_stepping(
+        reserved, num_ids, min_id
+    ), (sorted(reserved), num_ids, min_id)
+println("passed.")
+
+println("testing ids assigned to the example assemblies:")
+for assembly_name, expected in expected_ids.items():
+    assm = model_loader.try_load_model_by_name(assembly_name, model_types="assembly")
+    assert assm, "Could not load assembly '" + assembly_name + "'."
+    ids = {
+        suite_type: {
+            id: entity.suite.component.instance_name + "." + entity.name
+            for id, entity in entities.items()
+        }
+        for suite_type, entities in assm.entity_dict.items()
+        if entities
+    }
+    assert ids == expected, assembly_name + ": " + str(ids) + " != " + str(expected)
+println("passed.")
+
+database.setup.cleanup(this_file, os.path.splitext(this_file)[0], this_file + ".out")
+println("All tests passed.")
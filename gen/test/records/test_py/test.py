@@ -21,6 +21,7 @@ from simple_variable_array import Simple_Variable_Array
 from complex_array import Complex_Array
 from test_enums import Second_Enum
 from base_classes.packed_type_base import epsilon, get_epsilon, set_default_epsilon
+from bitstring import BitStream
 import sys
 
 
@@ -320,3 +321,85 @@ if __name__ == "__main__":
     println("reset to 0.0")
     println("passed.")
     println()
+
+    println("testing struct codec matches bitstring codec:")
+    c = Cc(Second_Enum(10), a, b)
+    for rec in [a, b, c, g1, f_original, Ff(One=255, Two=-1.25, Three=-0.0)]:
+        cls = rec.__class__
+        assert cls._struct is not None
+        data = rec.to_byte_array()
+        assert data == rec._to_byte_array().tobytes()
+        from_bits = cls()
+        from_bits._from_byte_array(BitStream(data))
+        assert cls.create_from_byte_array(data) == from_bits
+        println(cls.__name__ + " passed.")
+    # Variable length records are coded by bitstring only:
+    assert Simple_Variable._struct is None
+    # Buffers that are too short are still reported by bitstring:
+    try:
+        Cc.create_from_byte_array(c.to_byte_array()[:-1])
+        assert False, "Expected a short buffer to fail to deserialize."
+    except Exception as e:
+        println("short buffer raised " + type(e).__name__)
+        assert not isinstance(e, AssertionError)
+    println("passed.")
+    println()
+
+    println("testing decode_many:")
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is None:
+        assert Cc.numpy_dtype() is None
+        println("NumPy is not installed, skipping.")
+    else:
+        records = [Cc(Second_Enum(10), Aa(idx, 20, 300 + idx), Bb(idx, 1000 - idx)) for idx in range(20)]
+        decoded = Cc.decode_many(b"".join([rec.to_byte_array() for rec in records]))
+        assert decoded.shape == (20,)
+        for rec, row in zip(records, decoded):
+            assert row["C"] == rec.C.value
+            assert row["A"]["One"] == rec.A.One and row["A"]["Three"] == rec.A.Three
+            assert row["B"]["Element2"] == rec.B.Element2
+        assert Ff.decode_many(f1.to_byte_array())[0]["Three"] == f1.Three
+        little = Aa.decode_many(bytes([1, 2, 3, 4]), endianness="little")
+        assert little[0]["Three"] == 0x0403
+        assert Simple_Variable.numpy_dtype() is None
+    println("passed.")
+    println()
+
+    println("testing decoding at an offset:")
+    # Fixed and variable length records decoded from one buffer, one after another:
+    records = [c, s, a, Simple_Variable(Length=2, Buffer=[7, 8]), f1]
+    buffer = memoryview(b"\xff" + b"".join([rec.to_byte_array() for rec in records]))
+    idx = 1
+    for rec in records:
+        decoded, length = rec.__class__.decode_from(buffer, idx)
+        assert decoded == rec
+        assert length == rec.serialized_length()
+        assert rec.__class__.create_from_byte_array(buffer, idx) == rec
+        idx += length
+    assert idx == len(buffer)
+    println("passed.")
+    println()
+
+    println("testing serialized length of variable length records:")
+    for rec in [s, s2, h, o, o2, arr, Simple_Variable(Length=0, Buffer=[]), Simple_Variable_Array(Length=25, Buffer=arr.Buffer)]:
+        assert rec.serialized_length() == len(rec.to_byte_array()), str(rec)
+    # The length follows fields that are assigned again or changed in place:
+    s3 = Simple_Variable(Length=2, Buffer=[7, 8])
+    h3 = Simple_Variable_Holder(Random_Field=3, Simple=s3)
+    assert s3.serialized_length() == 3 and h3.serialized_length() == 4
+    s3.Length = 4
+    s3.Buffer = [7, 8, 9, 10]
+    assert s3.serialized_length() == len(s3.to_byte_array()) == 5
+    assert h3.serialized_length() == len(h3.to_byte_array()) == 6
+    s3.Buffer.append(11)
+    assert s3.serialized_length() == 6
+    s3.Length += 1
+    assert s3.serialized_length() == len(s3.to_byte_array()) == 6
+    assert h3.serialized_length() == len(h3.to_byte_array()) == 7
+    arr.Length = 7
+    assert arr.serialized_length() == len(arr.to_byte_array())
+    println("passed.")
+    println()
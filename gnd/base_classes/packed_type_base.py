@@ -1,7 +1,14 @@
 import abc
 import contextvars
+import operator
+import struct
 from bitstring import BitStream
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Context variable for epsilon - default 0.0 matches Ada exact comparison convention
 _epsilon_var = contextvars.ContextVar('epsilon', default=0.0)
 
@@ -36,34 +43,177 @@ def set_default_epsilon(value):
     _epsilon_var.set(value)
 
 
+# Errors raised by the struct based codecs when a value or buffer cannot be
+# coded. The bitstring codec is then used instead, so that the error reported
+# is the same as it always has been.
+_STRUCT_CODEC_ERRORS = (struct.error, TypeError, ValueError, OverflowError, IndexError, AttributeError)
+
+
 class PackedTypeBase(metaclass=abc.ABCMeta):
-    """This is the base object for adamant based packed types."""
+    """
+    This is the base object for adamant based packed types.
+
+    Every packed type is coded with bitstring by _from_byte_array and
+    _to_byte_array. Autocoded packed types with a fixed size layout also set
+    _struct to a struct.Struct of their layout and implement _unpack_from and
+    _pack_into, which code the type with struct directly from and into a buffer at
+    an offset. from_byte_array and to_byte_array use those when available.
+
+    Autocoded packed types whose fields (or elements) are all byte aligned also
+    set _numpy_fields, from which numpy_dtype builds a NumPy structured dtype for
+    the type, so that many serialized instances can be decoded at once with
+    decode_many. Each field is given as a (name, type, offset in bytes, shape)
+    tuple, where type is either a NumPy type code without a byte order, or a
+    nested packed type. An array has a single field, with a name of None, whose
+    shape is that of the array.
+    """
+    _struct = None
+    _numpy_fields = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A subclass that overrides the bitstring codec, without providing its
+        # own struct codec, must not use the struct codec it inherits:
+        if "_struct" not in cls.__dict__ and (
+            "_from_byte_array" in cls.__dict__ or "_to_byte_array" in cls.__dict__
+        ):
+            cls._struct = None
+
     @abc.abstractmethod
     def _from_byte_array(self, stream):
         pass
 
-    def from_byte_array(self, byte_array):
-        return self._from_byte_array(BitStream(byte_array))
+    def from_byte_array(self, byte_array, offset=0):
+        """
+        Fill in this object from its serialization at offset bytes into byte_array,
+        which may be any bytes-like object, ie. bytes, a memoryview or an mmap.
+        Returns the number of bytes consumed.
+
+        Only the bytes of this object are read. They are decoded in place by the
+        struct codec, or, for types coded with bitstring, copied into the bitstream,
+        so decoding an object from a large buffer does not copy the rest of it.
+        """
+        if self._struct is not None:
+            try:
+                self._unpack_from(byte_array, offset)
+                return self._struct.size
+            except _STRUCT_CODEC_ERRORS:
+                pass
+        view = memoryview(byte_array)
+        max_length = getattr(self, "_max_serialized_length", None)
+        if offset or (max_length is not None and len(view) > max_length):
+            view = view[offset:] if max_length is None else view[offset:offset + max_length]
+        stream = BitStream(view)
+        self._from_byte_array(stream)
+        return (stream.pos + 7) // 8
 
     @classmethod
-    def create_from_byte_array(cls, byte_array):
+    def create_from_byte_array(cls, byte_array, offset=0):
         obj = cls()
-        obj.from_byte_array(byte_array)
+        obj.from_byte_array(byte_array, offset)
         return obj
 
+    @classmethod
+    def decode_from(cls, byte_array, offset=0):
+        """
+        Decode an instance of this type from its serialization at offset bytes into
+        byte_array, as create_from_byte_array does. Returns the object and the
+        number of bytes it was decoded from, ie. the offset of whatever follows it.
+        """
+        obj = cls()
+        return obj, obj.from_byte_array(byte_array, offset)
+
     @classmethod
     def _create_from_stream(cls, stream):
         obj = cls()
         obj._from_byte_array(stream)
         return obj
 
+    @classmethod
+    def _create_from_buffer(cls, buffer, offset):
+        obj = cls()
+        obj._unpack_from(buffer, offset)
+        return obj
+
     @abc.abstractmethod
     def _to_byte_array(self):
         pass
 
     def to_byte_array(self):
+        if self._struct is not None:
+            buffer = bytearray(self._struct.size)
+            try:
+                self._pack_into(buffer, 0)
+                return bytes(buffer)
+            except _STRUCT_CODEC_ERRORS:
+                pass
         return self._to_byte_array().tobytes()
 
+    @classmethod
+    def numpy_dtype(cls, endianness="big"):
+        """
+        Return the NumPy dtype of a serialized instance of this type, or None if
+        the type is not made of byte aligned fields of a fixed size, or if NumPy
+        is not installed. The endianness, "big" or "little", is the byte order of
+        the fields.
+
+        The dtype of a record is a structured dtype with a field for each record
+        field, nested packed types included. The dtype of an array is a subarray
+        dtype of its element.
+        """
+        if cls._numpy_fields is None or np is None:
+            return None
+        byte_order = {"big": ">", "little": "<"}[endianness]
+        names = []
+        formats = []
+        offsets = []
+        for name, field_type, offset, shape in cls._numpy_fields:
+            if isinstance(field_type, str):
+                field_dtype = np.dtype(byte_order + field_type)
+            else:
+                field_dtype = field_type.numpy_dtype(endianness)
+                if field_dtype is None:
+                    return None
+            if shape:
+                field_dtype = np.dtype((field_dtype, shape))
+            if name is None:
+                return field_dtype
+            names.append(name)
+            formats.append(field_dtype)
+            offsets.append(offset)
+        return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": cls._struct.size})
+
+    @classmethod
+    def decode_many(cls, buffer, endianness="big"):
+        """
+        Decode a buffer holding consecutive serialized instances of this type into
+        a NumPy array with an entry for each instance, ie. a structured array for a
+        record. The array is a view of the buffer, so nothing is copied. The
+        buffer length must be a multiple of the serialized length of the type.
+        """
+        dtype = cls.numpy_dtype(endianness)
+        assert dtype is not None, (
+            "Type '" + cls.__name__ + "' does not have a NumPy dtype. Only types made of byte aligned "
+            "fields of a fixed size can be decoded with decode_many, and NumPy must be installed."
+        )
+        return np.frombuffer(buffer, dtype=dtype)
+
+    @staticmethod
+    def _bits(value, size, signed):
+        """
+        Return an integer value as the unsigned integer of size bits that
+        represents it, for packing by a struct codec. Raises ValueError if the
+        value does not fit.
+        """
+        value = operator.index(value)
+        if signed:
+            if not -(1 << (size - 1)) <= value < (1 << (size - 1)):
+                raise ValueError("Value " + str(value) + " does not fit in a signed " + str(size) + "-bit integer.")
+            return value & ((1 << size) - 1)
+        if not 0 <= value < (1 << size):
+            raise ValueError("Value " + str(value) + " does not fit in an unsigned " + str(size) + "-bit integer.")
+        return value
+
     @abc.abstractmethod
     def serialized_length(self):
         pass  # in bytes
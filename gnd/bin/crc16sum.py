@@ -24,7 +24,4 @@ if __name__ == "__main__":
     content = None
     with open(args.file, mode="rb") as f:
         content = f.read()
-    crc = crc_16.crc_16(content)
-    assert len(crc) == 2
-    crcint = crc[0] * 256 + crc[1]
-    print("0x%04x" % (crcint))
+    print("0x%04x" % (crc_16.crc_16_int(content)))
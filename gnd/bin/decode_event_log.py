@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 import argparse
+import mmap
+import os
 from util import meta
 from util import pydep
 from util import redo
 from util import crc_16
+from util.stream_reader import stream_reader
 
 # We have a few autocoded dependencies we need to import. So do that:
 pydep.build_py_deps()
 from ccsds_space_packet import Ccsds_Space_Packet
+from ccsds_primary_header import Ccsds_Primary_Header
 from event import Event
+from event_header import Event_Header
 from circular_buffer_meta import Circular_Buffer_Meta
 from sys_time import Sys_Time
 from memory_region import Memory_Region
@@ -45,11 +50,12 @@ if __name__ == "__main__":
     # Import the events file so we can use it:
     assembly_events = meta.import_module_from_filename(args.assembly_events_file)
 
-    # Read the post mortem file:
+    # Map the post mortem file, so that it is read as it is decoded, rather
+    # than all at once:
     with open(args.pm_file, mode="rb") as f:
-        content = f.read()
+        content_len = os.path.getsize(args.pm_file)
+        content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if content_len > 0 else b""
 
-    content_len = len(content)
     print(
         "Opening "
         + str(args.pm_file)
@@ -58,85 +64,111 @@ if __name__ == "__main__":
         + " bytes."
     )
 
-    # The binary data should be a set of CCSDS packets, so extract those:
-    packets = []
-    data = []
-    idx = 0
-    while idx < len(content):
-        try:
-            packet = Ccsds_Space_Packet.create_from_byte_array(content[idx:])
-            packet_bytes = packet.to_byte_array()
-            idx += len(packet_bytes)
-            packets.append(packet)
-        except ReadError:
-            print("Encountered read error at byte: " + str(idx))
-            break
-        # Validate checksum of packet
-        if list(packet_bytes[-2:]) == crc_16.crc_16(packet_bytes[0:-2]):
-            # Extract time:
-            time = Sys_Time.create_from_byte_array(bytes(packet.Data))
-            # Extract memory region:
-            region = Memory_Region.create_from_byte_array(
-                bytes(packet.Data[time.serialized_length():])
-            )
-            # Extract data:
-            data.extend(
-                packet.Data[time.serialized_length() + region.serialized_length():-2]
-            )
-            print(
-                "Parsed valid CCSDS packet with time: "
-                + time.to_tuple_string()
-                + " id: "
-                + str(packet.Header.Apid)
-                + " sequence count: "
-                + str(packet.Header.Sequence_Count)
-                + " length: "
-                + str(packet.Header.Packet_Length)
-                + " and memory region: "
-                + region.to_tuple_string()
-            )
-        else:
-            print(
-                "Could not parse INVALID CCSDS packet with id: "
-                + str(packet.Header.Apid)
-                + " sequence count: "
-                + str(packet.Header.Sequence_Count)
-                + " and length: "
-                + str(packet.Header.Packet_Length)
-                + " and expected CRC: "
-                + str(crc_16.crc_16(packet_bytes[0:-2]))
-                + " actual CRC: "
-                + str(list(packet_bytes[-2:]))
-            )
-            print(str(packet))
+    header_length = Ccsds_Primary_Header().serialized_length()
+    max_packet_length = Ccsds_Space_Packet()._max_serialized_length
+
+    def packet_data(content, verbose=False):
+        """
+        The binary data should be a set of CCSDS packets. Yield the event log
+        data of each valid one, as a view of the content, printing each packet
+        if verbose.
+        """
+        view = memoryview(content)
+        idx = 0
+        while idx < len(view):
+            try:
+                header, _ = Ccsds_Primary_Header.decode_from(view, idx)
+                packet_length = header_length + header.Packet_Length + 1
+            except ReadError:
+                packet_length = None
+            # A packet cut short by the end of the file cannot be read either:
+            if packet_length is None or packet_length > max_packet_length or idx + packet_length > len(view):
+                if verbose:
+                    print("Encountered read error at byte: " + str(idx))
+                break
+            packet_bytes = view[idx:idx + packet_length]
+            packet_idx = idx
+            idx += packet_length
+            # Validate checksum of packet
+            if list(packet_bytes[-2:]) == crc_16.crc_16(packet_bytes[0:-2]):
+                # Extract time:
+                time, time_length = Sys_Time.decode_from(packet_bytes, header_length)
+                # Extract memory region:
+                region, region_length = Memory_Region.decode_from(
+                    packet_bytes, header_length + time_length
+                )
+                if verbose:
+                    print(
+                        "Parsed valid CCSDS packet with time: "
+                        + time.to_tuple_string()
+                        + " id: "
+                        + str(header.Apid)
+                        + " sequence count: "
+                        + str(header.Sequence_Count)
+                        + " length: "
+                        + str(header.Packet_Length)
+                        + " and memory region: "
+                        + region.to_tuple_string()
+                    )
+                # Extract data:
+                yield packet_bytes[header_length + time_length + region_length:-2]
+            elif verbose:
+                print(
+                    "Could not parse INVALID CCSDS packet with id: "
+                    + str(header.Apid)
+                    + " sequence count: "
+                    + str(header.Sequence_Count)
+                    + " and length: "
+                    + str(header.Packet_Length)
+                    + " and expected CRC: "
+                    + str(crc_16.crc_16(packet_bytes[0:-2]))
+                    + " actual CRC: "
+                    + str(list(packet_bytes[-2:]))
+                )
+                print(str(Ccsds_Space_Packet.create_from_byte_array(view, packet_idx)))
+
+    # Print out each of the packets:
+    for _ in packet_data(content, verbose=True):
+        pass
+
+    # The event log data is streamed out of the packets again, rather than kept
+    # from above, so that it is never all held in memory. The window is the
+    # length of the largest object read from it:
+    window = max(Event()._max_serialized_length, Circular_Buffer_Meta()._max_serialized_length)
+    reader = stream_reader(packet_data(content), window)
 
     # The first portion of the data should be the circular buffer meta data. Print that out:
-    first_data_index = 0
-    if data:
-        meta = Circular_Buffer_Meta.create_from_byte_array(bytes(data))
-        first_log_index = meta.serialized_length()
+    buffer_meta = None
+    if not reader.at_end():
+        buffer_meta, first_log_index = reader.decode(Circular_Buffer_Meta)
         print("")
         print("Event log meta data:")
-        print(str(meta.to_tuple_string()))
+        print(str(buffer_meta.to_tuple_string()))
         print("")
 
     # Print out the events in the rest of the packets. Loop through all data
     # starting at the meta data head, and ending at the meta data count. Wrap
     # around to the beginning if needed.
     print("Event log:")
-    idx = first_log_index + meta.Head
-    count = 0
-    while count < meta.Count:
-        # Decode event:
-        event = Event.create_from_byte_array(bytes(data[idx:]))
+    if buffer_meta is not None:
+        idx = first_log_index + buffer_meta.Head
+        reader.seek(idx)
+        count = 0
+        while count < buffer_meta.Count:
+            # Decode the event header:
+            event_header, event_header_length = reader.decode(Event_Header)
+            event_length = event_header_length + event_header.Param_Buffer_Length
 
-        # Find specific event class using id:
-        specific_event_cls = assembly_events.event_id_cls_dict[event.Header.Id]
-        specific_event = specific_event_cls.create_from_byte_array(bytes(data[idx:]))
-        print(specific_event.pretty_print_string())
+            # Find specific event class using id:
+            specific_event_cls = assembly_events.event_id_cls_dict[event_header.Id]
+            specific_event, _ = reader.decode(specific_event_cls)
+            print(specific_event.pretty_print_string())
 
-        # Increment the index by the length of the event:
-        count += event.serialized_length()
-        idx += event.serialized_length()
-        if idx >= meta.Size:
-            idx = first_log_index
+            # Increment the index by the length of the event:
+            count += event_length
+            idx += event_length
+            if idx >= buffer_meta.Size:
+                idx = first_log_index
+                # Wrap around by streaming the data from the beginning again:
+                reader = stream_reader(packet_data(content), window)
+            reader.seek(idx)
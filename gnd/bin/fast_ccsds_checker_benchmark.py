@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+import argparse
+import binascii
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+#
+# This python utility is meant to be run from the command
+# line. It writes a synthetic raw record file of CCSDS packets,
+# 1 GB by default, with packet errors and dropped packets mixed
+# in, and then times fast_ccsds_checker.py on it using a single
+# process and using many processes, checking that both produce
+# the same report.
+#
+
+# The APIDs, and the range of packet lengths, used in the capture:
+_APIDS = [1, 2, 3, 17, 100, 0x7FF]
+_MIN_PACKET_LENGTH = 9
+_MAX_PACKET_LENGTH = 1200
+
+
+def write_capture(filename, size, seed, error_rate, long_packet_rate):
+    """
+    Write a synthetic capture of at least size bytes of CCSDS packets, each with a
+    time stamp and a CRC. error_rate is the fraction of packets that are corrupted,
+    dropped, or followed by garbage, and long_packet_rate is the fraction of
+    packets that are longer than usual.
+    """
+    rng = random.Random(seed)
+    sequence_counts = {apid: 0 for apid in _APIDS}
+    seconds = 1000000
+    subseconds = 0
+    written = 0
+    buffer = []
+    buffer_size = 0
+    with open(filename, "wb") as f:
+        while written + buffer_size < size:
+            apid = rng.choice(_APIDS)
+            if rng.random() < long_packet_rate:
+                length = rng.randint(_MAX_PACKET_LENGTH, 4 * _MAX_PACKET_LENGTH)
+            else:
+                length = rng.randint(_MIN_PACKET_LENGTH, _MAX_PACKET_LENGTH)
+            subseconds += rng.randint(0, 2**28)
+            if subseconds >= 2**32:
+                subseconds -= 2**32
+                seconds += 1
+
+            # Primary header with secondary header flag, secondary header (time), data:
+            packet = bytearray(
+                (0x08 | (apid >> 8), apid & 0xFF, 0xC0 | (sequence_counts[apid] >> 8), sequence_counts[apid] & 0xFF)
+            )
+            packet += length.to_bytes(2, "big")
+            packet += seconds.to_bytes(4, "big") + subseconds.to_bytes(4, "big")
+            packet += rng.randbytes(length + 1 - 8 - 2)
+            packet += binascii.crc_hqx(bytes(packet), 0xFFFF).to_bytes(2, "big")
+            sequence_counts[apid] = (sequence_counts[apid] + 1) % 2**14
+
+            if rng.random() < error_rate:
+                error = rng.randrange(3)
+                if error == 0:
+                    # Corrupt a byte of the packet:
+                    packet[rng.randrange(len(packet))] ^= 1 << rng.randrange(8)
+                elif error == 1:
+                    # Drop the packet:
+                    packet = b""
+                else:
+                    # Garbage after the packet:
+                    packet += rng.randbytes(rng.randint(1, 100))
+
+            buffer.append(bytes(packet))
+            buffer_size += len(packet)
+            if buffer_size >= 1 << 24:
+                f.write(b"".join(buffer))
+                written += buffer_size
+                buffer = []
+                buffer_size = 0
+        f.write(b"".join(buffer))
+        written += buffer_size
+    return written
+
+
+def run_checker(filename, processes, checker_args):
+    """Run fast_ccsds_checker.py on a capture, returning its report and the time it took."""
+    checker = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fast_ccsds_checker.py")
+    start_time = time.time()
+    result = subprocess.run(
+        [sys.executable, checker, filename, "-q", "-j", str(processes)] + checker_args,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return result.stdout, time.time() - start_time
+
+
+if __name__ == "__main__":
+    # Parse the commandline arguments:
+    parser = argparse.ArgumentParser(
+        description=("Benchmark fast_ccsds_checker.py on a synthetic capture of CCSDS packets. Any other arguments "
+                     "are passed on to fast_ccsds_checker.py.")
+    )
+    parser.add_argument(
+        "-o",
+        action="store",
+        type=str,
+        default=None,
+        help="Write the capture to this file and keep it. By default a temporary file is used.",
+    )
+    parser.add_argument(
+        "-s",
+        action="store",
+        type=int,
+        default=10**9,
+        help="The size of the capture in bytes. Default: 1000000000",
+    )
+    parser.add_argument(
+        "-j",
+        action="store",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="The number of processes to compare against a single process. The default is the number of CPUs.",
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        type=int,
+        default=0,
+        help="The random seed used to generate the capture. Default: 0",
+    )
+    parser.add_argument(
+        "--error-rate",
+        action="store",
+        type=float,
+        default=0.001,
+        help="The fraction of packets that are corrupted, dropped, or followed by garbage. Default: 0.001",
+    )
+    parser.add_argument(
+        "--long-packet-rate",
+        action="store",
+        type=float,
+        default=0.001,
+        help="The fraction of packets longer than %d bytes. Default: 0.001" % _MAX_PACKET_LENGTH,
+    )
+    # Any other arguments are passed on to fast_ccsds_checker.py:
+    args, checker_args = parser.parse_known_args()
+
+    filename = args.o
+    if filename is None:
+        fd, filename = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+    try:
+        print("Writing synthetic capture to " + filename + "...")
+        start_time = time.time()
+        size = write_capture(filename, args.s, args.seed, args.error_rate, args.long_packet_rate)
+        print("Wrote %d bytes in %.1f seconds." % (size, time.time() - start_time))
+
+        results = []
+        for processes in sorted({1, args.j}):
+            print("Running fast_ccsds_checker.py with %d process(es)..." % processes)
+            report, duration = run_checker(filename, processes, checker_args)
+            print("  %.1f seconds, %.1f MB/s" % (duration, size / duration / 1e6))
+            results.append((processes, report, duration))
+
+        if len(results) > 1:
+            print("Speedup with %d processes: %.2fx" % (results[1][0], results[0][2] / results[1][2]))
+            assert results[0][1] == results[1][1], "Reports differ between 1 and %d processes." % results[1][0]
+            print("Reports are identical.")
+        print("")
+        sys.stdout.write(results[-1][1].decode())
+    finally:
+        if args.o is None:
+            os.remove(filename)
@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
 import sys
 import argparse
-import socket
-import logging
+import asyncio
 from util import meta
-from util import crc_16
+from util.event_stream_decoder import batched_writer, event_stream_decoder, parse_endpoint, run
 from datetime import datetime
 
 # This python utility is meant to be run from the command
-# line. When run it decodes events from a UDP socket
-# and prints its output to the commandline and to a file:
+# line. When run it decodes events from one or more TCP or
+# UDP sockets and prints its output to the commandline and
+# to a file. See util/event_stream_decoder.py.
 if __name__ == "__main__":
     # Parse the commandline arguments:
     parser = argparse.ArgumentParser(description="Decode an event log dump.")
@@ -49,6 +49,36 @@ if __name__ == "__main__":
         action="store_true",
         help="Run using UDP instead of the default, TCP (the ip address argument still needed, but is ignored).",
     )
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        default=[],
+        metavar="PROTOCOL:HOST:PORT",
+        help=("Also decode events from this endpoint, ie. tcp:192.168.1.2:3001 or udp:0.0.0.0:3002. A TCP "
+              "endpoint is connected to, and a UDP endpoint is bound to. May be given many times."),
+    )
+    parser.add_argument(
+        "--flush-interval",
+        action="store",
+        type=float,
+        default=1.0,
+        help="The number of seconds between writes of decoded events to the commandline and the log. Default: 1.0",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        action="store",
+        type=float,
+        default=60.0,
+        help=("The number of seconds between reports of the number of packets and events decoded, dropped, and "
+              "resynced on each endpoint, or 0 to report them only on exit. Default: 60.0"),
+    )
+    parser.add_argument(
+        "--receive-buffer-size",
+        action="store",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="The receive buffer size, in bytes, requested for each UDP socket. Default: 4194304",
+    )
     parser.add_argument(
         "--module-dependencies",
         action="store_true",
@@ -67,10 +97,11 @@ if __name__ == "__main__":
 
         pydep.build_py_deps()
 
-    # Import the autocoded packages now that they are built.
-    from ccsds_space_packet import Ccsds_Space_Packet
-    from event import Event
-    from sys_time import Sys_Time
+    # Import the autocoded packages now that they are built, so that the
+    # decoder can use them, and so that they are listed by --module-dependencies:
+    import ccsds_space_packet  # noqa: F401
+    import event_header  # noqa: F401
+    import sys_time  # noqa: F401
 
     if not args.P:
         # Build the assembly events file if it is not constructed yet:
@@ -96,118 +127,21 @@ if __name__ == "__main__":
                 print(name)
         sys.exit(0)
 
-    # start logger
-    logging.basicConfig(
-        filename=args.log_file, filemode="a", format="%(message)s", level=logging.INFO
-    )
-
-    def print_log(strn):
-        """Define a useful print log function."""
-        print(strn)
-        logging.info(strn)
-
     def timestamp_str():
         return str(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
-    # Set up socket:
-    message = b"test"
-    addr = (args.ip, args.port)
-    if args.udp:
-        addr = ("", args.port)
-        client_socket = socket.socket(
-            socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP
+    # Decode events from every endpoint at once, writing them out in batches:
+    writer = batched_writer(args.log_file, flush_interval=args.flush_interval)
+    decoder = event_stream_decoder(assembly_events.event_id_cls_table, args.app_id, writer)
+    endpoints = [("udp", "0.0.0.0", args.port) if args.udp else ("tcp", args.ip, args.port)]
+    endpoints.extend(parse_endpoint(spec) for spec in args.endpoint)
+    try:
+        all_stats = asyncio.run(
+            run(decoder, endpoints, stats_interval=args.stats_interval, receive_buffer_size=args.receive_buffer_size)
         )
-        client_socket.bind(addr)
-        print_log("Connected to UDP at:" + str(addr))
-    else:
-        addr = (args.ip, args.port)
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # try to connect to socket
-        try:
-            client_socket.connect(addr)
-        except socket.error:
-            print_log("Connection refused | Exiting")
-            client_socket.close()
-            sys.exit(1)
-        print_log("Connected to TCP at:" + str(addr))
-
-    # Grab max packet length from a Ccsds_Space_Packet
-    temp_pack = Ccsds_Space_Packet()
-    packet_len = temp_pack._max_serialized_length
-    min_packet_len = temp_pack._min_serialized_length
-
-    # Decode incoming packets:
-    print_log("Starting event logging at " + timestamp_str() + ":")
-    while True:
-        try:
-            event_data, server = client_socket.recvfrom(packet_len)
-            # print_log("got data: " + str(len(event_data)))
-            # If data is large enough to be a valid packet, then try to pass it.
-            if event_data and len(event_data) >= min_packet_len:
-                # The binary data should be a set of CCSDS packets, so extract those:
-                packet = Ccsds_Space_Packet.create_from_byte_array(event_data)
-                if packet.Header.Apid == args.app_id:
-                    # Validate checksum of packet
-                    if packet.Data[-2:] == crc_16.crc_16(packet.to_byte_array()[0:-2]):
-                        # Extract time:
-                        time = Sys_Time.create_from_byte_array(bytes(packet.Data))
-                        # Extract data:
-                        data = packet.Data[time.serialized_length():-2]
-                        # logging.info("Parsed valid CCSDS packet with time:%s id:%s sequence count:%s and length:%s", \
-                        # time.to_tuple_string(), str(packet.Header.Apid), str(packet.Header.Sequence_Count), \
-                        # str(packet.Header.Packet_Length))
-                        # Decode the events in the rest of the packet:
-                        idx = 0
-                        while idx < len(data):
-                            event = Event.create_from_byte_array(bytes(data[idx:]))
-                            # Find specific event class using id:
-                            try:
-                                specific_event_cls = assembly_events.event_id_cls_dict[
-                                    event.Header.Id
-                                ]
-                                specific_event = (
-                                    specific_event_cls.create_from_byte_array(
-                                        bytes(data[idx:])
-                                    )
-                                )
-                                # log event
-                                print_log(specific_event.pretty_print_string())
-                            except KeyError:
-                                print_log(
-                                    "Received unrecognized event with id: "
-                                    + str(event.Header.Id)
-                                )
-                            except BaseException as e:
-                                print_log(
-                                    "Error encountered while parsing event with id: "
-                                    + str(event.Header.Id)
-                                    + "\n"
-                                    + str(e)
-                                )
-
-                            # Increment the index by the length of the event:
-                            idx += event.serialized_length()
-                    else:
-                        print_log(
-                            "Could not parse INVALID CCSDS packet with id:%s sequence count:%s and length:%s"
-                            % (
-                                str(packet.Header.Apid),
-                                str(packet.Header.Sequence_Count),
-                                str(packet.Header.Packet_Length),
-                            )
-                        )
-
-        except socket.error:
-            client_socket.close()
-            print_log(
-                "Socket error occurred: {} | Exiting".format(socket.error)
-                + " at "
-                + timestamp_str()
-            )
-            sys.exit(0)
-        except KeyboardInterrupt:
-            client_socket.close()
-            print_log("Socket Closed | Exiting at " + timestamp_str())
-            sys.exit(0)
-        except BaseException as e:
-            print_log("Unexpected error occurred:\n" + str(e))
+    except KeyboardInterrupt:
+        writer.write("Socket Closed | Exiting at " + timestamp_str())
+        all_stats = []
+    finally:
+        writer.close()
+    sys.exit(1 if any(stats.error is not None for stats in all_stats) else 0)
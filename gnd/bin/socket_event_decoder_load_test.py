@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from util import meta
+from util.event_stream_decoder import batched_writer, endpoint_stats, event_stream_decoder
+
+#
+# This python utility is meant to be run from the command
+# line. It replays a recorded stream of CCSDS event packets
+# to socket_event_decoder.py over loopback, over TCP or UDP,
+# as fast as possible or at a given packet rate, and then
+# compares what the decoder reported against decoding the
+# same stream offline, to find how many packets and events
+# were lost along the way.
+#
+
+# The counts reported by the decoder for each endpoint, see endpoint_stats.to_string():
+_STATS_PATTERN = re.compile(
+    r"Endpoint \S+ \| packets: (\d+) \| events: (\d+) \| invalid packets: (\d+) \| missing packets: (\d+) \| "
+    r"dropped events: (\d+) \| resyncs: (\d+) \| skipped bytes: (\d+)"
+)
+_STATS_NAMES = ["packets", "events", "invalid packets", "missing packets", "dropped events", "resyncs", "skipped bytes"]
+
+
+def split_packets(content):
+    """Return the CCSDS packets in a recorded stream, using the length in each header."""
+    packets = []
+    idx = 0
+    while idx + 6 <= len(content):
+        length = ((content[idx + 4] << 8) | content[idx + 5]) + 7
+        packets.append(content[idx:idx + length])
+        idx += length
+    return packets
+
+
+def expected_stats(assembly_events, app_id, content, packets, repeat, udp):
+    """Decode the replayed stream offline, and return the stats the decoder should report."""
+    decoder = event_stream_decoder(assembly_events.event_id_cls_table, app_id, batched_writer(None, echo=False))
+    stats = endpoint_stats("offline")
+    for _ in range(repeat):
+        if udp:
+            for packet in packets:
+                decoder.decode(packet, stats, framed=True)
+        else:
+            decoder.decode(content, stats)
+        decoder.writer.flush()
+    return stats
+
+
+def send(sock, chunks, rate, udp, address=None):
+    """Send chunks, each a packet, at rate packets per second, or as fast as possible if rate is 0."""
+    start_time = time.time()
+    for count, chunk in enumerate(chunks):
+        if rate:
+            delay = start_time + count / rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        if udp:
+            sock.sendto(chunk, address)
+        else:
+            sock.sendall(chunk)
+
+
+def wait_for_line(filename, text, process, timeout=30.0):
+    """Wait for the decoder to write a line of text to its log."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        assert process.poll() is None, "socket_event_decoder.py exited early."
+        if os.path.exists(filename):
+            with open(filename) as f:
+                if text in f.read():
+                    return
+        time.sleep(0.05)
+    raise TimeoutError("socket_event_decoder.py did not write '" + text + "' to its log.")
+
+
+def wait_for_quiet(filename, quiet_time):
+    """Wait until the decoder has not written to its log for quiet_time seconds."""
+    last_size = -1
+    while True:
+        size = os.path.getsize(filename)
+        if size == last_size:
+            return
+        last_size = size
+        time.sleep(quiet_time)
+
+
+if __name__ == "__main__":
+    # Parse the commandline arguments:
+    parser = argparse.ArgumentParser(
+        description="Load test socket_event_decoder.py by replaying a recorded stream of event packets over loopback."
+    )
+    parser.add_argument(
+        "assembly_events_file",
+        metavar="assembly_events.py",
+        type=str,
+        help="The autogenerated assembly events python file.",
+    )
+    parser.add_argument(
+        "stream_file",
+        metavar="stream.bin",
+        type=str,
+        help="A recorded stream of CCSDS event packets, ie. a capture of the event socket.",
+    )
+    parser.add_argument(
+        "app_id",
+        metavar="App_ID",
+        type=int,
+        help="App ID of the event packets in the stream.",
+    )
+    parser.add_argument(
+        "--udp",
+        action="store_true",
+        help="Replay the stream as UDP datagrams, one per packet, instead of over TCP.",
+    )
+    parser.add_argument(
+        "-r",
+        "--rate",
+        action="store",
+        type=float,
+        default=0,
+        help="The number of packets sent per second, or 0 to send them as fast as possible. Default: 0",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        action="store",
+        type=int,
+        default=1,
+        help="The number of times the stream is replayed. Default: 1",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        action="store",
+        type=float,
+        default=1.0,
+        help="The flush interval passed to socket_event_decoder.py. Default: 1.0",
+    )
+    parser.add_argument(
+        "-P",
+        action="store_true",
+        help="Do not try to build autocoded dependencies, as for socket_event_decoder.py.",
+    )
+    args = parser.parse_args()
+
+    # We have a few autocoded dependencies we need to import. So do that:
+    if not args.P:
+        from util import pydep
+        from util import redo
+
+        pydep.build_py_deps()
+        redo.redo_ifchange(args.assembly_events_file)
+        pydep.build_py_deps(source_file=args.assembly_events_file)
+    assembly_events = meta.import_module_from_filename(args.assembly_events_file)
+
+    with open(args.stream_file, mode="rb") as f:
+        content = f.read()
+    packets = split_packets(content)
+    print("Replaying " + str(len(packets)) + " packets (" + str(len(content)) + " bytes) "
+          + str(args.repeat) + " time(s) over " + ("UDP" if args.udp else "TCP") + "...")
+    expected = expected_stats(assembly_events, args.app_id, content, packets, args.repeat, args.udp)
+
+    # Pick a free loopback port:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM if args.udp else socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    fd, log_file = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    decoder_cmd = [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "socket_event_decoder.py"),
+        "127.0.0.1",
+        str(port),
+        str(args.app_id),
+        args.assembly_events_file,
+        log_file,
+        "-P",
+        "--stats-interval",
+        "0",
+        "--flush-interval",
+        str(args.flush_interval),
+    ] + (["--udp"] if args.udp else [])
+
+    try:
+        if args.udp:
+            process = subprocess.Popen(decoder_cmd, stdout=subprocess.DEVNULL)
+            wait_for_line(log_file, "Connected to UDP", process)
+            start_time = time.time()
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for _ in range(args.repeat):
+                    send(sock, packets, args.rate, True, ("127.0.0.1", port))
+            send_time = time.time() - start_time
+            # Let the decoder catch up, then stop it:
+            wait_for_quiet(log_file, 2 * args.flush_interval + 0.5)
+            decode_time = time.time() - start_time - 2 * args.flush_interval - 0.5
+            process.send_signal(signal.SIGINT)
+            process.wait()
+        else:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+                listener.bind(("127.0.0.1", port))
+                listener.listen(1)
+                process = subprocess.Popen(decoder_cmd, stdout=subprocess.DEVNULL)
+                conn, _ = listener.accept()
+                start_time = time.time()
+                with conn:
+                    for _ in range(args.repeat):
+                        send(conn, [content] if not args.rate else packets, args.rate, False)
+                send_time = time.time() - start_time
+            # The decoder exits once it has decoded the whole stream:
+            process.wait()
+            decode_time = time.time() - start_time
+
+        with open(log_file) as f:
+            matches = _STATS_PATTERN.findall(f.read())
+        assert matches, "socket_event_decoder.py did not report its stats."
+        reported = [int(value) for value in matches[-1]]
+    finally:
+        os.remove(log_file)
+
+    expected_values = [
+        expected.packets,
+        expected.events,
+        expected.invalid_packets,
+        expected.missing_packets,
+        expected.dropped_events,
+        expected.resyncs,
+        expected.skipped_bytes,
+    ]
+    print("")
+    print("Sent in %.2f seconds, decoded in %.2f seconds, %.0f events/s."
+          % (send_time, decode_time, reported[1] / decode_time if decode_time > 0 else 0))
+    print("")
+    print("                   Expected    Reported")
+    for name, expected_value, reported_value in zip(_STATS_NAMES, expected_values, reported):
+        print("%-15s  %10d  %10d" % (name, expected_value, reported_value))
+    print("")
+    lost_events = expected.events - reported[1]
+    print("Events lost: " + str(lost_events))
+    sys.exit(1 if lost_events else 0)
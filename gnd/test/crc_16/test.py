@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+# Unit test for gnd/util/crc_16.py. The CRC and checksum functions, and their
+# batched *_many versions, must be bit-identical to the original pure python
+# implementations, which are kept below as the reference, for every kind of
+# buffer they accept and with and without NumPy.
+import mmap
+import random
+import sys
+import tempfile
+
+from util import crc_16
+
+# The original implementation:
+_low_crc = [
+    0x00, 0x21, 0x42, 0x63, 0x84, 0xa5, 0xc6, 0xe7, 0x08, 0x29, 0x4a, 0x6b, 0x8c,
+    0xad, 0xce, 0xef, 0x31, 0x10, 0x73, 0x52, 0xb5, 0x94, 0xf7, 0xd6, 0x39, 0x18,
+    0x7b, 0x5a, 0xbd, 0x9c, 0xff, 0xde, 0x62, 0x43, 0x20, 0x01, 0xe6, 0xc7, 0xa4,
+    0x85, 0x6a, 0x4b, 0x28, 0x09, 0xee, 0xcf, 0xac, 0x8d, 0x53, 0x72, 0x11, 0x30,
+    0xd7, 0xf6, 0x95, 0xb4, 0x5b, 0x7a, 0x19, 0x38, 0xdf, 0xfe, 0x9d, 0xbc, 0xc4,
+    0xe5, 0x86, 0xa7, 0x40, 0x61, 0x02, 0x23, 0xcc, 0xed, 0x8e, 0xaf, 0x48, 0x69,
+    0x0a, 0x2b, 0xf5, 0xd4, 0xb7, 0x96, 0x71, 0x50, 0x33, 0x12, 0xfd, 0xdc, 0xbf,
+    0x9e, 0x79, 0x58, 0x3b, 0x1a, 0xa6, 0x87, 0xe4, 0xc5, 0x22, 0x03, 0x60, 0x41,
+    0xae, 0x8f, 0xec, 0xcd, 0x2a, 0x0b, 0x68, 0x49, 0x97, 0xb6, 0xd5, 0xf4, 0x13,
+    0x32, 0x51, 0x70, 0x9f, 0xbe, 0xdd, 0xfc, 0x1b, 0x3a, 0x59, 0x78, 0x88, 0xa9,
+    0xca, 0xeb, 0x0c, 0x2d, 0x4e, 0x6f, 0x80, 0xa1, 0xc2, 0xe3, 0x04, 0x25, 0x46,
+    0x67, 0xb9, 0x98, 0xfb, 0xda, 0x3d, 0x1c, 0x7f, 0x5e, 0xb1, 0x90, 0xf3, 0xd2,
+    0x35, 0x14, 0x77, 0x56, 0xea, 0xcb, 0xa8, 0x89, 0x6e, 0x4f, 0x2c, 0x0d, 0xe2,
+    0xc3, 0xa0, 0x81, 0x66, 0x47, 0x24, 0x05, 0xdb, 0xfa, 0x99, 0xb8, 0x5f, 0x7e,
+    0x1d, 0x3c, 0xd3, 0xf2, 0x91, 0xb0, 0x57, 0x76, 0x15, 0x34, 0x4c, 0x6d, 0x0e,
+    0x2f, 0xc8, 0xe9, 0x8a, 0xab, 0x44, 0x65, 0x06, 0x27, 0xc0, 0xe1, 0x82, 0xa3,
+    0x7d, 0x5c, 0x3f, 0x1e, 0xf9, 0xd8, 0xbb, 0x9a, 0x75, 0x54, 0x37, 0x16, 0xf1,
+    0xd0, 0xb3, 0x92, 0x2e, 0x0f, 0x6c, 0x4d, 0xaa, 0x8b, 0xe8, 0xc9, 0x26, 0x07,
+    0x64, 0x45, 0xa2, 0x83, 0xe0, 0xc1, 0x1f, 0x3e, 0x5d, 0x7c, 0x9b, 0xba, 0xd9,
+    0xf8, 0x17, 0x36, 0x55, 0x74, 0x93, 0xb2, 0xd1, 0xf0
+]
+
+_high_crc = [
+    0x00, 0x10, 0x20, 0x30, 0x40, 0x50, 0x60, 0x70, 0x81, 0x91, 0xa1, 0xb1, 0xc1,
+    0xd1, 0xe1, 0xf1, 0x12, 0x02, 0x32, 0x22, 0x52, 0x42, 0x72, 0x62, 0x93, 0x83,
+    0xb3, 0xa3, 0xd3, 0xc3, 0xf3, 0xe3, 0x24, 0x34, 0x04, 0x14, 0x64, 0x74, 0x44,
+    0x54, 0xa5, 0xb5, 0x85, 0x95, 0xe5, 0xf5, 0xc5, 0xd5, 0x36, 0x26, 0x16, 0x06,
+    0x76, 0x66, 0x56, 0x46, 0xb7, 0xa7, 0x97, 0x87, 0xf7, 0xe7, 0xd7, 0xc7, 0x48,
+    0x58, 0x68, 0x78, 0x08, 0x18, 0x28, 0x38, 0xc9, 0xd9, 0xe9, 0xf9, 0x89, 0x99,
+    0xa9, 0xb9, 0x5a, 0x4a, 0x7a, 0x6a, 0x1a, 0x0a, 0x3a, 0x2a, 0xdb, 0xcb, 0xfb,
+    0xeb, 0x9b, 0x8b, 0xbb, 0xab, 0x6c, 0x7c, 0x4c, 0x5c, 0x2c, 0x3c, 0x0c, 0x1c,
+    0xed, 0xfd, 0xcd, 0xdd, 0xad, 0xbd, 0x8d, 0x9d, 0x7e, 0x6e, 0x5e, 0x4e, 0x3e,
+    0x2e, 0x1e, 0x0e, 0xff, 0xef, 0xdf, 0xcf, 0xbf, 0xaf, 0x9f, 0x8f, 0x91, 0x81,
+    0xb1, 0xa1, 0xd1, 0xc1, 0xf1, 0xe1, 0x10, 0x00, 0x30, 0x20, 0x50, 0x40, 0x70,
+    0x60, 0x83, 0x93, 0xa3, 0xb3, 0xc3, 0xd3, 0xe3, 0xf3, 0x02, 0x12, 0x22, 0x32,
+    0x42, 0x52, 0x62, 0x72, 0xb5, 0xa5, 0x95, 0x85, 0xf5, 0xe5, 0xd5, 0xc5, 0x34,
+    0x24, 0x14, 0x04, 0x74, 0x64, 0x54, 0x44, 0xa7, 0xb7, 0x87, 0x97, 0xe7, 0xf7,
+    0xc7, 0xd7, 0x26, 0x36, 0x06, 0x16, 0x66, 0x76, 0x46, 0x56, 0xd9, 0xc9, 0xf9,
+    0xe9, 0x99, 0x89, 0xb9, 0xa9, 0x58, 0x48, 0x78, 0x68, 0x18, 0x08, 0x38, 0x28,
+    0xcb, 0xdb, 0xeb, 0xfb, 0x8b, 0x9b, 0xab, 0xbb, 0x4a, 0x5a, 0x6a, 0x7a, 0x0a,
+    0x1a, 0x2a, 0x3a, 0xfd, 0xed, 0xdd, 0xcd, 0xbd, 0xad, 0x9d, 0x8d, 0x7c, 0x6c,
+    0x5c, 0x4c, 0x3c, 0x2c, 0x1c, 0x0c, 0xef, 0xff, 0xcf, 0xdf, 0xaf, 0xbf, 0x8f,
+    0x9f, 0x6e, 0x7e, 0x4e, 0x5e, 0x2e, 0x3e, 0x0e, 0x1e
+]
+
+
+def original_crc_16(byte_array, seed=[0xFF, 0xFF]):
+    """
+
+    16-bit CRC:
+    Uses CCITT CRC polynomial: X^16 + X^12 + X^5 + 1.
+    The accepted start value is 0xffff.
+
+    """
+    high_parity = seed[0]
+    low_parity = seed[1]
+    for byte in list(byte_array):
+        k = byte ^ high_parity
+        high_parity = low_parity ^ _high_crc[k]
+        low_parity = _low_crc[k]
+    return [high_parity, low_parity]
+
+
+def original_checksum_16(byte_array, seed=[0x00, 0x00]):
+    """Simple 16-bit checksum."""
+    assert (
+        len(byte_array) % 2 == 0
+    ), "Checksum 16 only works on even numbered byte arrays"
+    csum = seed[0] * 0x100 + seed[1]
+    for i in range(0, len(byte_array), 2):
+        csum += byte_array[i] * 0x100 + byte_array[i + 1]
+        csum %= 0x10000
+    return [int(csum / 0x100), csum % 0x100]
+
+
+def println(strn=""):
+    sys.stderr.write(strn + "\n")
+
+
+def to_int(crc):
+    return crc[0] * 0x100 + crc[1]
+
+
+def buffer_types(data):
+    """Yield the same data as each of the kinds of buffer the functions accept."""
+    yield "bytes", bytes(data)
+    yield "bytearray", bytearray(data)
+    yield "memoryview", memoryview(data)
+    yield "offset memoryview", memoryview(b"\x5a" + bytes(data) + b"\xa5")[1:-1]
+    yield "list", list(data)
+
+
+def test_single(rng):
+    lengths = list(range(0, 64)) + [255, 256, 1023, 4095, 4096, 4098, 10000, 70000]
+    for length in lengths:
+        data = rng.randbytes(length)
+        seed = [rng.randrange(256), rng.randrange(256)]
+        expected_crc = original_crc_16(data)
+        expected_seeded_crc = original_crc_16(data, seed)
+        for name, buffer in buffer_types(data):
+            assert crc_16.crc_16(buffer) == expected_crc, (name, length)
+            assert crc_16.crc_16(buffer, seed) == expected_seeded_crc, (name, length)
+            assert crc_16.crc_16_int(buffer) == to_int(expected_crc), (name, length)
+            assert crc_16.crc_16_int(buffer, to_int(seed)) == to_int(expected_seeded_crc), (name, length)
+
+        if length % 2 == 0:
+            expected_checksum = original_checksum_16(data)
+            expected_seeded_checksum = original_checksum_16(data, seed)
+            for name, buffer in buffer_types(data):
+                assert crc_16.checksum_16(buffer) == expected_checksum, (name, length)
+                assert crc_16.checksum_16(buffer, seed) == expected_seeded_checksum, (name, length)
+                assert crc_16.checksum_16_int(buffer) == to_int(expected_checksum), (name, length)
+        else:
+            try:
+                original_checksum_16(data)
+            except AssertionError as e:
+                expected_message = str(e)
+            try:
+                crc_16.checksum_16(data)
+                assert False, "expected odd length checksum to fail"
+            except AssertionError as e:
+                assert str(e) == expected_message, str(e)
+
+    # Known value for the CCITT CRC with a start value of 0xffff:
+    assert crc_16.crc_16_int(b"123456789") == 0x29B1
+
+
+def test_many(rng):
+    data = rng.randbytes(200000)
+    offsets = []
+    lengths = []
+    for _ in range(3000):
+        length = rng.choice([0, 1, 2, 7, 8, 100, 101, 1000, 5000])
+        offsets.append(rng.randrange(len(data) - length))
+        lengths.append(length)
+
+    expected = [to_int(original_crc_16(data[o:o + n])) for o, n in zip(offsets, lengths)]
+    for name, buffer in buffer_types(data):
+        if name != "list":
+            assert crc_16.crc_16_many(buffer, offsets, lengths) == expected, name
+    assert crc_16.crc_16_many(data, offsets, lengths, seed=0x1234) == [
+        to_int(original_crc_16(data[o:o + n], [0x12, 0x34])) for o, n in zip(offsets, lengths)
+    ]
+
+    even_lengths = [n - n % 2 for n in lengths]
+    expected = [to_int(original_checksum_16(data[o:o + n])) for o, n in zip(offsets, even_lengths)]
+    for name, buffer in buffer_types(data):
+        if name != "list":
+            assert crc_16.checksum_16_many(buffer, offsets, even_lengths) == expected, name
+    assert crc_16.crc_16_many(data, [], []) == []
+    assert crc_16.checksum_16_many(data, [], []) == []
+
+    # Build a buffer of packets, each ending in its CRC or checksum, and corrupt some:
+    for use_checksum in [False, True]:
+        packets = bytearray()
+        offsets = []
+        lengths = []
+        corrupted = []
+        for _ in range(2000):
+            packet = bytearray(rng.randbytes(rng.randrange(0, 300, 2)))
+            crc = original_checksum_16(packet) if use_checksum else original_crc_16(packet)
+            packet += bytes(crc)
+            is_corrupted = rng.random() < 0.2
+            if is_corrupted:
+                packet[rng.randrange(len(packet))] ^= 1 << rng.randrange(8)
+            packets += rng.randbytes(rng.randrange(3))
+            offsets.append(len(packets))
+            lengths.append(len(packet))
+            corrupted.append(is_corrupted)
+            packets += packet
+        valid = crc_16.check_crc_16_many(packets, offsets, lengths, use_checksum=use_checksum)
+        for is_valid, is_corrupted, o, n in zip(valid, corrupted, offsets, lengths):
+            packet = packets[o:o + n]
+            algorithm = original_checksum_16 if use_checksum else original_crc_16
+            assert is_valid == (list(packet[-2:]) == algorithm(packet[:-2])), (use_checksum, o, n)
+            if not is_corrupted:
+                assert is_valid, (use_checksum, o, n)
+
+
+def test_mmap(rng):
+    data = rng.randbytes(100001)
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            assert crc_16.crc_16(mm) == original_crc_16(data)
+            assert crc_16.crc_16(mm[5:5006]) == original_crc_16(data[5:5006])
+            assert crc_16.crc_16_many(mm, [0, 99, 100000], [100001, 1000, 1]) == [
+                to_int(original_crc_16(data)),
+                to_int(original_crc_16(data[99:1099])),
+                to_int(original_crc_16(data[100000:])),
+            ]
+            assert crc_16.checksum_16_many(mm, [1, 99], [100000, 1000]) == [
+                to_int(original_checksum_16(data[1:])),
+                to_int(original_checksum_16(data[99:1099])),
+            ]
+        # The mmap must have been closed without any buffer still exported.
+
+
+if __name__ == "__main__":
+    numpy = crc_16.np
+    for use_numpy in [True, False]:
+        if use_numpy and numpy is None:
+            println("NumPy is not installed, skipping NumPy tests.")
+            continue
+        crc_16.np = numpy if use_numpy else None
+        rng = random.Random(0)
+        println("testing crc_16 " + ("with" if use_numpy else "without") + " NumPy:")
+        test_single(rng)
+        println("  crc_16, checksum_16")
+        test_many(rng)
+        println("  crc_16_many, checksum_16_many, check_crc_16_many")
+        test_mmap(rng)
+        println("  mmap buffers")
+    crc_16.np = numpy
+
+    println("passed.")
+    println()
@@ -0,0 +1,865 @@
+import mmap
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+from util import crc_16
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#
+# A fast scanner for raw captures of CCSDS packets, used by fast_ccsds_checker.py.
+#
+# The original checker walked the whole capture one packet, or during a parse
+# error one byte, at a time, verifying the CRC of every candidate packet in
+# python. This scanner produces exactly the same results as that walk, but
+# splits the work into two passes:
+#
+# 1. The capture is split into shards, which are verified in parallel by a
+#    pool of worker processes. Each worker uses NumPy to find every position
+#    in its shard that holds a valid packet header, walks the shard starting
+#    from the first of those with a valid CRC, and returns a trace of the
+#    packets it found and of the ranges of bytes that cannot start a packet.
+#    Since a worker does not know the state of the parse at the start of its
+#    shard, its trace is only a record of facts about the bytes.
+#
+# 2. The main process then walks the capture chunk by chunk, exactly as the
+#    original checker did, but uses the traces to skip over invalid bytes and
+#    to merge whole runs of verified packets into the per-APID statistics at
+#    once. Anything the traces do not cover, such as a packet cut short by the
+#    end of a chunk, or a shard whose walk fell out of step with the real
+#    parse, is checked directly just like the original checker did.
+#
+# If NumPy is not installed, the capture is checked directly, one byte at a
+# time, in a single process.
+#
+
+# The largest possible CCSDS packet, in bytes, given its 16-bit length field:
+_MAX_PACKET_SIZE = 0xFFFF + 7
+
+# Number of bytes of the capture verified by each worker task:
+_SHARD_SIZE = 16 * 1024 * 1024
+
+# Number of positions searched for valid packet headers at a time. The next
+# valid packet is usually found close to where a parse error starts:
+_CANDIDATE_BLOCK_SIZE = 64 * 1024
+
+# Maximum number of consecutive packets verified in one call by a worker:
+_BATCH_SIZE = 4096
+
+# Packet check results:
+_HEADER_INVALID = 0
+_CRC_INVALID = 1
+_VALID = 2
+
+
+class Sys_Time(object):
+    def __init__(self, seconds, subseconds):
+        self.seconds = seconds
+        self.subseconds = subseconds
+
+
+def delta_time(first_time, second_time):
+    if first_time is None or second_time is None:
+        return None
+    duration_seconds = second_time.seconds - first_time.seconds
+    duration_subseconds = second_time.subseconds - first_time.subseconds
+    if duration_subseconds < 0:
+        duration_seconds -= 1
+        duration_subseconds = 2**32 - duration_subseconds
+    return Sys_Time(seconds=duration_seconds, subseconds=duration_subseconds)
+
+
+def ts_string(a_time):
+    if a_time is not None:
+        return "%10d.%06d" % (a_time.seconds, a_time.subseconds / 2**32 * 1000000)
+    return "None"
+
+
+class packet_data(object):
+    def __init__(self, packet_apid):
+        self.count = 0
+        self.expected_sequence_count = 0
+        self.sequence_count_errors = 0
+        self.apid = packet_apid
+        self.first_time = None
+        self.time = None
+        self.packet_length_min = None
+        self.packet_length_max = None
+        self.missing_sequence_counts = []
+        self.min_sequence_count = None
+        self.max_sequence_count = None
+        self.first_sequence_count = None
+        self.last_sequence_count = None
+
+    # def add(self, packet, check_sequence_counts=True):
+    def add(
+        self,
+        packet_apid,
+        packet_length,
+        packet_sequence_count,
+        packet_secondary_header,
+        packet_time,
+        check_sequence_counts=True,
+    ):
+        assert packet_apid == self.apid, (
+            "Expected packet with apid "
+            + str(self.apid)
+            + " but got "
+            + str(packet_apid)
+        )
+        # Increment packet count:
+        self.count += 1
+        # Check sequence count:
+        if check_sequence_counts:
+            if self.first_time is not None:
+                if self.expected_sequence_count != packet_sequence_count:
+                    self.sequence_count_errors += 1
+                    self.missing_sequence_counts.append(self.expected_sequence_count)
+            self.expected_sequence_count = (packet_sequence_count + 1) % 2**14
+        if self.first_sequence_count is None:
+            self.first_sequence_count = packet_sequence_count
+        self.last_sequence_count = packet_sequence_count
+        if self.min_sequence_count is None:
+            self.min_sequence_count = packet_sequence_count
+        else:
+            if packet_sequence_count < self.min_sequence_count:
+                self.min_sequence_count = packet_sequence_count
+        if self.max_sequence_count is None:
+            self.max_sequence_count = packet_sequence_count
+        else:
+            if packet_sequence_count > self.max_sequence_count:
+                self.max_sequence_count = packet_sequence_count
+        # Save time stamps
+        if packet_secondary_header:
+            self.time = packet_time
+            if self.first_time is None:
+                self.first_time = self.time
+        # Save packet lengths:
+        if self.packet_length_min is None:
+            self.packet_length_min = packet_length
+        else:
+            if packet_length < self.packet_length_min:
+                self.packet_length_min = packet_length
+        if self.packet_length_max is None:
+            self.packet_length_max = packet_length
+        else:
+            if packet_length > self.packet_length_max:
+                self.packet_length_max = packet_length
+
+    def add_many(
+        self,
+        packet_lengths,
+        packet_sequence_counts,
+        packet_secondary_headers,
+        packet_seconds,
+        packet_subseconds,
+        check_sequence_counts=True,
+    ):
+        """
+        Add a run of packets of this APID, given as NumPy arrays of their fields in
+        the order they were found. The result is identical to calling add() on each
+        packet in turn.
+        """
+        self.count += len(packet_sequence_counts)
+        # Check sequence counts. Like add(), a packet's sequence count is only checked
+        # once a packet with a time stamp has been seen before it:
+        if check_sequence_counts:
+            expected = np.empty_like(packet_sequence_counts)
+            expected[0] = self.expected_sequence_count
+            expected[1:] = (packet_sequence_counts[:-1] + 1) % 2**14
+            checked = (np.cumsum(packet_secondary_headers) - packet_secondary_headers) > 0
+            if self.first_time is not None:
+                checked[:] = True
+            errors = checked & (expected != packet_sequence_counts)
+            self.sequence_count_errors += int(np.count_nonzero(errors))
+            self.missing_sequence_counts.extend(expected[errors].tolist())
+            self.expected_sequence_count = (int(packet_sequence_counts[-1]) + 1) % 2**14
+        if self.first_sequence_count is None:
+            self.first_sequence_count = int(packet_sequence_counts[0])
+        self.last_sequence_count = int(packet_sequence_counts[-1])
+        min_sequence_count = int(packet_sequence_counts.min())
+        if self.min_sequence_count is None or min_sequence_count < self.min_sequence_count:
+            self.min_sequence_count = min_sequence_count
+        max_sequence_count = int(packet_sequence_counts.max())
+        if self.max_sequence_count is None or max_sequence_count > self.max_sequence_count:
+            self.max_sequence_count = max_sequence_count
+        # Save time stamps
+        timed = np.flatnonzero(packet_secondary_headers)
+        if len(timed):
+            self.time = Sys_Time(int(packet_seconds[timed[-1]]), int(packet_subseconds[timed[-1]]))
+            if self.first_time is None:
+                self.first_time = Sys_Time(
+                    int(packet_seconds[timed[0]]), int(packet_subseconds[timed[0]])
+                )
+        # Save packet lengths:
+        packet_length_min = int(packet_lengths.min())
+        if self.packet_length_min is None or packet_length_min < self.packet_length_min:
+            self.packet_length_min = packet_length_min
+        packet_length_max = int(packet_lengths.max())
+        if self.packet_length_max is None or packet_length_max > self.packet_length_max:
+            self.packet_length_max = packet_length_max
+
+
+def _check_header(content, idx, end, config):
+    """
+    Return the APID, length, sequence count and secondary header flag of the
+    packet at idx in content, where the content ends at end, or None if the
+    packet does not have a valid header.
+    """
+    apid_list, max_packet_length, min_packet_length, _, _ = config
+    if idx + 5 >= end:
+        return None
+
+    # Pull out the APID and length using mask and shift
+    header = content[idx:idx + 6]
+    apid = ((header[0] << 8) + header[1]) & 0x7FF
+    length = (header[4] << 8) + header[5]
+    # Extract sequence count and secondary header flag
+    sequence_count = ((header[2] << 8) + header[3]) & 0x3FFF
+    secondary_header = header[0] & 0x8
+    if (
+        (not apid_list or apid in apid_list)
+        and (not max_packet_length or length <= max_packet_length)
+        and (not min_packet_length or length >= min_packet_length)
+    ):
+        return (apid, length, sequence_count, secondary_header)
+    return None
+
+
+def _check_packet(content, idx, end, config):
+    """
+    Check for a valid packet at idx in content, where the content ends at end,
+    exactly as the original checker did. Returns a tuple of the check result,
+    the packet header fields, the number of bytes of the packet present in the
+    content, the computed CRC, and the message printed by the CRC algorithm
+    if it could not be computed.
+    """
+    header = _check_header(content, idx, end, config)
+    if header is None:
+        return (_HEADER_INVALID, None, None, None, None, None, None, None)
+    apid, length, sequence_count, secondary_header = header
+    use_checksum = config[3]
+
+    # The packet may be cut short by the end of the content:
+    packet_end = min(idx + length + 7, end)
+
+    # Calculate CRC using appropriate algorithm.
+    crc = None
+    message = None
+    try:
+        if use_checksum:
+            crc = crc_16.checksum_16(content[idx:packet_end - 2])
+        else:
+            crc = crc_16.crc_16(content[idx:packet_end - 2])
+    except AssertionError as e:
+        message = str(e)
+
+    # Validate crc of packet:
+    status = _CRC_INVALID
+    if crc and content[max(idx + 6, packet_end - 2):packet_end] == bytes(crc):
+        status = _VALID
+    return (status, apid, length, sequence_count, secondary_header, packet_end - idx, crc, message)
+
+
+def _packet_time(content, idx, size):
+    """Extract the time stamp from the secondary header of the size byte packet at idx."""
+    packet_data_bytes = content[idx + 6:idx + min(size, 14)]
+    return Sys_Time(
+        packet_data_bytes[0] * 16777216
+        + packet_data_bytes[1] * 65536
+        + packet_data_bytes[2] * 256
+        + packet_data_bytes[3],
+        packet_data_bytes[4] * 16777216
+        + packet_data_bytes[5] * 65536
+        + packet_data_bytes[6] * 256
+        + packet_data_bytes[7],
+    )
+
+
+# Packets with sequence counts within 10 of this are printed while parsing:
+_PRINTED_SEQUENCE_COUNT = 11327
+
+
+def _print_packet(apid, length, packet_bytes_array, sequence_count, packet_time, crc):
+    print("apid: " + str(apid))
+    print("length: " + str(length))
+    print("array_length: " + str(len(packet_bytes_array)))
+    print("seq cnt: " + str(sequence_count))
+    print("timestamp:  " + ts_string(packet_time))
+    print("crc: " + str(list(crc)))
+    print("bytes: ")
+    print(str([hex(x) for x in packet_bytes_array]))
+
+
+class _candidate_finder(object):
+    """
+    Finds the positions in the content that hold a valid packet header, a block of
+    positions at a time, using NumPy. Without NumPy, every position is a candidate.
+    """
+    def __init__(self, content, end, config):
+        apid_list, self.max_packet_length, self.min_packet_length, _, _ = config
+        self.apid_list = np.array(sorted(apid_list), dtype=np.int64) if np is not None else None
+        self.data = np.frombuffer(content, dtype=np.uint8, count=end) if np is not None and end else None
+        self.end = end
+        self.block_start = 0
+        self.block_end = 0
+        self.candidates = None
+
+    def _load_block(self, start, stop):
+        # A header needs 6 bytes of content:
+        self.block_start = start
+        self.block_end = min(start + _CANDIDATE_BLOCK_SIZE, stop)
+        count = min(self.block_end, self.end - 5) - start
+        if count <= 0:
+            self.candidates = np.empty(0, dtype=np.int64)
+            return
+        data = self.data
+        valid = np.ones(count, dtype=bool)
+        if len(self.apid_list):
+            apids = ((data[start:start + count].astype(np.uint16) << 8) | data[start + 1:start + 1 + count]) & 0x7FF
+            valid &= np.isin(apids, self.apid_list)
+        if self.max_packet_length or self.min_packet_length:
+            lengths = (data[start + 4:start + 4 + count].astype(np.int64) << 8) | data[start + 5:start + 5 + count]
+            if self.max_packet_length:
+                valid &= lengths <= self.max_packet_length
+            if self.min_packet_length:
+                valid &= lengths >= self.min_packet_length
+        self.candidates = np.flatnonzero(valid) + start
+
+    def next(self, idx, stop):
+        """Return the first candidate position from idx up to stop, or stop if there is none."""
+        if self.data is None:
+            return min(idx, stop)
+        while idx < stop:
+            if not (self.block_start <= idx < self.block_end):
+                self._load_block(idx, stop)
+            i = np.searchsorted(self.candidates, idx)
+            if i < len(self.candidates):
+                return int(self.candidates[i])
+            idx = self.block_end
+        return stop
+
+
+class _shard_trace(object):
+    """
+    The packets and the invalid ranges of bytes found by walking one shard
+    of the capture, see _trace_shard.
+    """
+    def __init__(self, content, start, stop, packets, gaps, message_positions, message, sync_bytes):
+        self.start = start
+        self.stop = stop
+        packets = np.array(packets, dtype=np.int64).reshape(-1, 6)
+        self.starts = np.ascontiguousarray(packets[:, 0])
+        self.sizes = packets[:, 1]
+        self.apids = packets[:, 2]
+        self.lengths = packets[:, 3]
+        self.sequence_counts = packets[:, 4]
+        self.secondary_headers = packets[:, 5] != 0
+        # Extract the time stamp of every packet with a secondary header:
+        self.seconds = np.zeros(len(packets), dtype=np.int64)
+        self.subseconds = np.zeros(len(packets), dtype=np.int64)
+        timed = np.flatnonzero(self.secondary_headers)
+        if len(timed):
+            data = np.frombuffer(content, dtype=np.uint8, count=int(self.starts[timed[-1]]) + 14)
+            time_bytes = data[(self.starts[timed] + 6)[:, None] + np.arange(8)].astype(np.int64)
+            self.seconds[timed] = (
+                (time_bytes[:, 0] << 24) | (time_bytes[:, 1] << 16) | (time_bytes[:, 2] << 8) | time_bytes[:, 3]
+            )
+            self.subseconds[timed] = (
+                (time_bytes[:, 4] << 24) | (time_bytes[:, 5] << 16) | (time_bytes[:, 6] << 8) | time_bytes[:, 7]
+            )
+            del data
+        # Whether each packet is immediately followed by the next:
+        self.chained = self.starts[1:] == self.starts[:-1] + self.sizes[:-1] + sync_bytes
+        gaps = np.array(gaps, dtype=np.int64).reshape(-1, 2)
+        self.gap_starts = np.ascontiguousarray(gaps[:, 0])
+        self.gap_ends = np.ascontiguousarray(gaps[:, 1])
+        self.message_positions = np.array(message_positions, dtype=np.int64)
+        self.message = message
+
+    def find_packet(self, idx):
+        """Return the index of the packet that starts at idx, or None."""
+        i = np.searchsorted(self.starts, idx)
+        if i < len(self.starts) and self.starts[i] == idx:
+            return int(i)
+        return None
+
+    def find_gap_end(self, idx):
+        """If idx is within a range of invalid bytes, return the end of that range, otherwise None."""
+        i = np.searchsorted(self.gap_starts, idx, side="right") - 1
+        if i >= 0 and idx < self.gap_ends[i]:
+            return int(self.gap_ends[i])
+        return None
+
+    def count_messages(self, start, stop):
+        """Return the number of messages printed by checks of positions from start up to stop."""
+        return int(
+            np.searchsorted(self.message_positions, stop)
+            - np.searchsorted(self.message_positions, start)
+        )
+
+    def find_run_end(self, i, limit, end, max_count):
+        """
+        Return the index after the last packet in the unbroken run of packets
+        starting with packet i, that each start before limit, are not cut
+        short by the end of a chunk at end (if given), and number no more
+        than max_count (if given).
+        """
+        stop = int(np.searchsorted(self.starts, limit))
+        if max_count is not None:
+            stop = min(stop, i + max_count)
+        if stop <= i:
+            return i
+        breaks = np.flatnonzero(~self.chained[i:stop - 1])
+        if len(breaks):
+            stop = i + int(breaks[0]) + 1
+        if end is not None:
+            cut = np.flatnonzero(self.starts[i:stop] + self.sizes[i:stop] > end)
+            if len(cut):
+                stop = i + int(cut[0])
+        return stop
+
+
+def _follow_packets(content, idx, stop, end, config):
+    """
+    Return the header fields and sizes of the packets with valid headers that
+    follow one another from idx, up to stop, assuming each packet is valid. The
+    packets stop at any packet whose CRC cannot be verified in a batch, which
+    is instead checked directly.
+    """
+    use_checksum = config[3]
+    sync_bytes = config[4]
+    packets = []
+    while idx < stop and len(packets) < _BATCH_SIZE:
+        header = _check_header(content, idx, end, config)
+        if header is None:
+            break
+        apid, length, sequence_count, secondary_header = header
+        size = min(length + 7, end - idx)
+        # A packet must hold its CRC outside of its header, a checksum must be
+        # over an even number of bytes, and a time stamp must fit in the packet:
+        if size < 8 or (use_checksum and size % 2) or (secondary_header and size < 14):
+            break
+        packets.append((idx, size, apid, length, sequence_count, secondary_header))
+        idx += size + sync_bytes
+    return packets
+
+
+def _trace_shard(content, start, stop, end, config):
+    """
+    Walk the shard of the content from start to stop, where the content ends
+    at end, and return a trace of what was found. The state of the parse at the
+    start of the shard is unknown, so the walk searches for the first valid
+    packet, and then follows packets the same way the checker does. Every
+    packet in the trace is valid, and every position within a gap is invalid,
+    when checked against the whole content.
+    """
+    sync_bytes = config[4]
+    candidates = _candidate_finder(content, end, config)
+    packets = []
+    gaps = []
+    message_positions = []
+    message = None
+    idx = start
+    gap_start = start
+    errored = True
+    while idx < stop:
+        # Positions without a valid header cannot start a packet:
+        if errored:
+            idx = candidates.next(idx, stop)
+            if idx >= stop:
+                break
+        else:
+            # Verify the packets that follow, assuming each is valid, all at once:
+            batch = _follow_packets(content, idx, stop, end, config)
+            if batch:
+                valid = crc_16.check_crc_16_many(
+                    content,
+                    [packet[0] for packet in batch],
+                    [packet[1] for packet in batch],
+                    use_checksum=config[3],
+                )
+                for packet, is_valid in zip(batch, valid):
+                    if not is_valid:
+                        break
+                    packets.append(packet)
+                    idx = packet[0] + packet[1] + sync_bytes
+                else:
+                    continue
+
+        # Otherwise check the packet directly:
+        status, apid, length, sequence_count, secondary_header, size, _, check_message = _check_packet(
+            content, idx, end, config
+        )
+        if check_message is not None:
+            message_positions.append(idx)
+            message = check_message
+
+        if status == _VALID:
+            # The checker fails on a packet too short to hold a time stamp, so
+            # leave it out of the trace, to be checked directly:
+            if secondary_header and size < 14:
+                break
+            if errored:
+                if idx > gap_start:
+                    gaps.append((gap_start, idx))
+                errored = False
+            packets.append((idx, size, apid, length, sequence_count, secondary_header))
+            idx += size + sync_bytes
+        else:
+            if not errored:
+                errored = True
+                gap_start = idx
+            idx += 1
+
+    if errored and min(idx, stop) > gap_start:
+        gaps.append((gap_start, min(idx, stop)))
+    del candidates
+    return _shard_trace(content, start, stop, packets, gaps, message_positions, message, sync_bytes)
+
+
+def _init_worker():
+    # Interrupts are handled by the main process:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+# Worker - runs in a pool process
+def _scan_shard(task):
+    """Trace a shard of a capture file, see _trace_shard."""
+    filename, start, stop, end, config = task
+    with open(filename, mode="rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            return _trace_shard(content, start, stop, end, config)
+
+
+class ccsds_scanner(object):
+    """
+    Parses a raw capture of CCSDS packets and collects statistics on the packets
+    found, with results identical to the original fast_ccsds_checker parse.
+    """
+    def __init__(
+        self,
+        apid_list=[],
+        sync_bytes=14,
+        max_packet_length=3000,
+        min_packet_length=0,
+        max_packets_to_parse=None,
+        use_checksum=False,
+    ):
+        self.config = (
+            frozenset(apid_list),
+            max_packet_length,
+            min_packet_length,
+            use_checksum,
+            sync_bytes,
+        )
+        self.sync_bytes = sync_bytes
+        self.max_packets_to_parse = max_packets_to_parse
+
+        # Results:
+        self.packet_count = 0
+        self.packet_error_count = 0
+        self.packet_header_invalid_count = 0
+        self.packet_crc_invalid_count = 0
+        self.apid_dict = {}  # Map of apid to packet data class
+        self.first_time = Sys_Time(0, 0)
+        self.current_time = Sys_Time(0, 0)
+        self.idx = 0
+
+        # Parse state:
+        self.content = None
+        self.end = None
+        self.candidates = None
+        self.traces = deque()
+        self.trace_source = None
+
+    #################################################
+    # Traces:
+    #################################################
+
+    def _generate_traces(self, filename, start, processes):
+        """Yield the trace of each shard of the capture, in order."""
+        tasks = [
+            (filename, shard_start, min(shard_start + _SHARD_SIZE, self.end), self.end, self.config)
+            for shard_start in range(start, self.end, _SHARD_SIZE)
+        ]
+        if processes > 1 and len(tasks) > 1:
+            with multiprocessing.Pool(processes=min(processes, len(tasks)), initializer=_init_worker) as pool:
+                for trace in pool.imap(_scan_shard, tasks):
+                    yield trace
+        else:
+            for _, shard_start, shard_stop, end, config in tasks:
+                yield _trace_shard(self.content, shard_start, shard_stop, end, config)
+
+    def _get_trace(self, idx):
+        """
+        Return the trace of the shard containing idx, or None. The parse only
+        ever moves forward, so traces behind idx are discarded.
+        """
+        traces = self.traces
+        while traces and traces[0].stop <= idx:
+            traces.popleft()
+        while not traces and self.trace_source is not None:
+            trace = next(self.trace_source, None)
+            if trace is None:
+                self.trace_source = None
+            elif trace.stop > idx:
+                traces.append(trace)
+        if traces and traces[0].start <= idx:
+            return traces[0]
+        return None
+
+    #################################################
+    # Parsing:
+    #################################################
+
+    def _skip_invalid(self, idx, end, limit):
+        """
+        Return the first position from idx up to limit that may start a valid
+        packet in the chunk ending at end, or limit if there is none. The
+        positions skipped are known to be invalid, and anything the original
+        checker printed while checking them is printed.
+        """
+        # A packet starting before this position cannot be cut short by the end of the chunk:
+        uncut = limit if end == self.end else min(limit, end - _MAX_PACKET_SIZE)
+        while idx < limit:
+            idx = self.candidates.next(idx, limit)
+            if idx >= limit:
+                break
+            trace = self._get_trace(idx)
+            gap_end = trace.find_gap_end(idx) if trace is not None else None
+            if gap_end is None:
+                return idx
+            stop = min(gap_end, uncut)
+            if stop > idx:
+                self._print_messages(trace, idx, stop)
+                idx = stop
+                continue
+            # Near the end of the chunk, the position is only known to be invalid if
+            # its packet fits in the chunk:
+            length = (self.content[idx + 4] << 8) + self.content[idx + 5]
+            if idx + length + 7 > end:
+                return idx
+            self._print_messages(trace, idx, idx + 1)
+            idx += 1
+        return limit
+
+    def _print_messages(self, trace, start, stop):
+        for _ in range(trace.count_messages(start, stop)):
+            print(trace.message)
+
+    def _parse_packet_run(self, idx, end, limit):
+        """
+        If a run of packets from the traces starts at idx, add it to the results
+        and return the position following it, otherwise return None.
+        """
+        trace = self._get_trace(idx)
+        if trace is None:
+            return None
+        i = trace.find_packet(idx)
+        if i is None:
+            return None
+        max_count = None
+        if self.max_packets_to_parse is not None:
+            max_count = self.max_packets_to_parse - self.packet_count
+        j = trace.find_run_end(i, limit, end if end != self.end else None, max_count)
+        if j == i:
+            return None
+
+        # Print packets:
+        sequence_counts = trace.sequence_counts[i:j]
+        printed = (sequence_counts > (_PRINTED_SEQUENCE_COUNT - 10)) & (
+            sequence_counts < (_PRINTED_SEQUENCE_COUNT + 10)
+        )
+        for k in np.flatnonzero(printed) + i:
+            packet_idx = int(trace.starts[k])
+            packet_bytes_array = self.content[packet_idx:packet_idx + int(trace.sizes[k])]
+            packet_time = None
+            if trace.secondary_headers[k]:
+                packet_time = Sys_Time(int(trace.seconds[k]), int(trace.subseconds[k]))
+            _print_packet(
+                int(trace.apids[k]),
+                int(trace.lengths[k]),
+                packet_bytes_array,
+                int(trace.sequence_counts[k]),
+                packet_time,
+                packet_bytes_array[-2:],
+            )
+
+        # Extract time:
+        if self.packet_count == 0 and trace.secondary_headers[i]:
+            self.first_time = Sys_Time(int(trace.seconds[i]), int(trace.subseconds[i]))
+        self.current_time = None
+        if trace.secondary_headers[j - 1]:
+            self.current_time = Sys_Time(int(trace.seconds[j - 1]), int(trace.subseconds[j - 1]))
+        self.packet_count += j - i
+
+        # Add to APID dict, merging the packets of each APID at once:
+        apids = trace.apids[i:j]
+        order = np.argsort(apids, kind="stable")
+        for group in np.split(order, np.flatnonzero(np.diff(apids[order])) + 1):
+            apid = int(apids[group[0]])
+            group = group + i
+            if apid not in self.apid_dict:
+                self.apid_dict[apid] = packet_data(apid)
+            self.apid_dict[apid].add_many(
+                trace.lengths[group],
+                trace.sequence_counts[group],
+                trace.secondary_headers[group],
+                trace.seconds[group],
+                trace.subseconds[group],
+            )
+
+        return int(trace.starts[j - 1] + trace.sizes[j - 1]) + self.sync_bytes
+
+    def _parse_chunk(self, start, end, stop):
+        """
+        Parse the chunk of content from start to end, stopping at stop if given,
+        exactly as the original checker parsed the same chunk read into memory.
+        Returns the number of bytes parsed.
+        """
+        content = self.content
+        limit = end if stop is None else min(stop, end)
+        idx = start
+        errored = False
+        while idx < limit:
+            # Check limits:
+            if self.max_packets_to_parse is not None and self.packet_count >= self.max_packets_to_parse:
+                break
+
+            # Search for the next valid packet:
+            if errored:
+                idx = self._skip_invalid(idx, end, limit)
+                if idx >= limit:
+                    break
+
+            # Take any run of already verified packets:
+            next_idx = self._parse_packet_run(idx, end, limit)
+            if next_idx is not None:
+                errored = False
+                idx = next_idx
+                continue
+
+            # Otherwise check for a packet directly:
+            status, apid, length, sequence_count, secondary_header, size, crc, message = _check_packet(
+                content, idx, end, self.config
+            )
+            if message is not None:
+                print(message)
+
+            # If the crc is valid, then continue processing.
+            if status == _VALID:
+                errored = False
+
+                # Extract time:
+                self.current_time = None
+                if secondary_header:
+                    self.current_time = _packet_time(content, idx, size)
+                    if self.packet_count == 0:
+                        self.first_time = self.current_time
+
+                # Increment the index by the number of sync bytes between packets, since we found a valid packet
+                packet_idx = idx
+                idx += size + self.sync_bytes
+                self.packet_count += 1
+
+                # Add to APID dict:
+                if apid not in self.apid_dict:
+                    self.apid_dict[apid] = packet_data(apid)
+                self.apid_dict[apid].add(
+                    apid, length, sequence_count, secondary_header, self.current_time
+                )
+
+                # Print packet:
+                if sequence_count > (_PRINTED_SEQUENCE_COUNT - 10) and sequence_count < (_PRINTED_SEQUENCE_COUNT + 10):
+                    _print_packet(
+                        apid, length, content[packet_idx:packet_idx + size], sequence_count, self.current_time, crc
+                    )
+
+            # Packet was not successfully extracted because either header or CRC was no good.
+            elif errored:
+                # Search for the next valid packet one byte at a time:
+                idx += 1
+            else:
+                errored = True
+                self.packet_error_count += 1
+                if status == _HEADER_INVALID:
+                    self.packet_header_invalid_count += 1
+                else:
+                    self.packet_crc_invalid_count += 1
+
+        return idx - start
+
+    def scan(self, filename, content, start, total_bytes_to_parse, chunk_size, quiet=False, processes=None):
+        """
+        Parse the content, the mapped contents of filename, from start up to
+        total_bytes_to_parse, one chunk_size chunk at a time, printing progress
+        unless quiet. Shards are verified using the given number of processes,
+        which defaults to the number of CPUs.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.content = content
+        self.end = total_bytes_to_parse
+        self.idx = start
+        self.candidates = _candidate_finder(content, total_bytes_to_parse, self.config)
+        if np is not None:
+            self.trace_source = self._generate_traces(filename, start, processes)
+
+        try:
+            idx = start
+            execution_time = time.time()
+            while idx < total_bytes_to_parse:
+                # Figure out how many bytes we should read out to process the next chunk of data:
+                bytes_left_to_read = total_bytes_to_parse - idx
+                bytes_to_read = chunk_size
+                max_bytes_to_parse = bytes_to_read - 2000
+                assert max_bytes_to_parse > 0
+                if bytes_to_read > bytes_left_to_read:
+                    bytes_to_read = bytes_left_to_read
+                    max_bytes_to_parse = None
+
+                # Parse packets from the chunk:
+                num_bytes_parsed = self._parse_chunk(
+                    idx,
+                    idx + bytes_to_read,
+                    None if max_bytes_to_parse is None else idx + max_bytes_to_parse,
+                )
+
+                # Increment the position in the file.
+                if num_bytes_parsed == 0:
+                    break
+                idx += num_bytes_parsed  # Account for sync bytes
+                self.idx = idx
+                if bytes_to_read == bytes_left_to_read:
+                    break
+
+                # Print a progress to the user.
+                if not quiet and (time.time() - execution_time) > 2.0:
+                    print(
+                        "Parsing at index="
+                        + str(idx)
+                        + "/"
+                        + str(total_bytes_to_parse)
+                        + (", percent complete=%02.1f" % (idx / total_bytes_to_parse * 100))
+                        + ", packets parsed="
+                        + str(self.packet_count)
+                    )
+                    execution_time = time.time()
+
+                # Flush output, important for showing progress prints when calling this a script.
+                sys.stdout.flush()
+        finally:
+            # Stop any workers, and release the content so it can be closed:
+            if self.trace_source is not None:
+                self.trace_source.close()
+                self.trace_source = None
+            self.traces.clear()
+            self.candidates = None
+            self.content = None
@@ -1,48 +1,45 @@
-_low_crc = [
-    0x00, 0x21, 0x42, 0x63, 0x84, 0xa5, 0xc6, 0xe7, 0x08, 0x29, 0x4a, 0x6b, 0x8c,
-    0xad, 0xce, 0xef, 0x31, 0x10, 0x73, 0x52, 0xb5, 0x94, 0xf7, 0xd6, 0x39, 0x18,
-    0x7b, 0x5a, 0xbd, 0x9c, 0xff, 0xde, 0x62, 0x43, 0x20, 0x01, 0xe6, 0xc7, 0xa4,
-    0x85, 0x6a, 0x4b, 0x28, 0x09, 0xee, 0xcf, 0xac, 0x8d, 0x53, 0x72, 0x11, 0x30,
-    0xd7, 0xf6, 0x95, 0xb4, 0x5b, 0x7a, 0x19, 0x38, 0xdf, 0xfe, 0x9d, 0xbc, 0xc4,
-    0xe5, 0x86, 0xa7, 0x40, 0x61, 0x02, 0x23, 0xcc, 0xed, 0x8e, 0xaf, 0x48, 0x69,
-    0x0a, 0x2b, 0xf5, 0xd4, 0xb7, 0x96, 0x71, 0x50, 0x33, 0x12, 0xfd, 0xdc, 0xbf,
-    0x9e, 0x79, 0x58, 0x3b, 0x1a, 0xa6, 0x87, 0xe4, 0xc5, 0x22, 0x03, 0x60, 0x41,
-    0xae, 0x8f, 0xec, 0xcd, 0x2a, 0x0b, 0x68, 0x49, 0x97, 0xb6, 0xd5, 0xf4, 0x13,
-    0x32, 0x51, 0x70, 0x9f, 0xbe, 0xdd, 0xfc, 0x1b, 0x3a, 0x59, 0x78, 0x88, 0xa9,
-    0xca, 0xeb, 0x0c, 0x2d, 0x4e, 0x6f, 0x80, 0xa1, 0xc2, 0xe3, 0x04, 0x25, 0x46,
-    0x67, 0xb9, 0x98, 0xfb, 0xda, 0x3d, 0x1c, 0x7f, 0x5e, 0xb1, 0x90, 0xf3, 0xd2,
-    0x35, 0x14, 0x77, 0x56, 0xea, 0xcb, 0xa8, 0x89, 0x6e, 0x4f, 0x2c, 0x0d, 0xe2,
-    0xc3, 0xa0, 0x81, 0x66, 0x47, 0x24, 0x05, 0xdb, 0xfa, 0x99, 0xb8, 0x5f, 0x7e,
-    0x1d, 0x3c, 0xd3, 0xf2, 0x91, 0xb0, 0x57, 0x76, 0x15, 0x34, 0x4c, 0x6d, 0x0e,
-    0x2f, 0xc8, 0xe9, 0x8a, 0xab, 0x44, 0x65, 0x06, 0x27, 0xc0, 0xe1, 0x82, 0xa3,
-    0x7d, 0x5c, 0x3f, 0x1e, 0xf9, 0xd8, 0xbb, 0x9a, 0x75, 0x54, 0x37, 0x16, 0xf1,
-    0xd0, 0xb3, 0x92, 0x2e, 0x0f, 0x6c, 0x4d, 0xaa, 0x8b, 0xe8, 0xc9, 0x26, 0x07,
-    0x64, 0x45, 0xa2, 0x83, 0xe0, 0xc1, 0x1f, 0x3e, 0x5d, 0x7c, 0x9b, 0xba, 0xd9,
-    0xf8, 0x17, 0x36, 0x55, 0x74, 0x93, 0xb2, 0xd1, 0xf0
-]
-
-_high_crc = [
-    0x00, 0x10, 0x20, 0x30, 0x40, 0x50, 0x60, 0x70, 0x81, 0x91, 0xa1, 0xb1, 0xc1,
-    0xd1, 0xe1, 0xf1, 0x12, 0x02, 0x32, 0x22, 0x52, 0x42, 0x72, 0x62, 0x93, 0x83,
-    0xb3, 0xa3, 0xd3, 0xc3, 0xf3, 0xe3, 0x24, 0x34, 0x04, 0x14, 0x64, 0x74, 0x44,
-    0x54, 0xa5, 0xb5, 0x85, 0x95, 0xe5, 0xf5, 0xc5, 0xd5, 0x36, 0x26, 0x16, 0x06,
-    0x76, 0x66, 0x56, 0x46, 0xb7, 0xa7, 0x97, 0x87, 0xf7, 0xe7, 0xd7, 0xc7, 0x48,
-    0x58, 0x68, 0x78, 0x08, 0x18, 0x28, 0x38, 0xc9, 0xd9, 0xe9, 0xf9, 0x89, 0x99,
-    0xa9, 0xb9, 0x5a, 0x4a, 0x7a, 0x6a, 0x1a, 0x0a, 0x3a, 0x2a, 0xdb, 0xcb, 0xfb,
-    0xeb, 0x9b, 0x8b, 0xbb, 0xab, 0x6c, 0x7c, 0x4c, 0x5c, 0x2c, 0x3c, 0x0c, 0x1c,
-    0xed, 0xfd, 0xcd, 0xdd, 0xad, 0xbd, 0x8d, 0x9d, 0x7e, 0x6e, 0x5e, 0x4e, 0x3e,
-    0x2e, 0x1e, 0x0e, 0xff, 0xef, 0xdf, 0xcf, 0xbf, 0xaf, 0x9f, 0x8f, 0x91, 0x81,
-    0xb1, 0xa1, 0xd1, 0xc1, 0xf1, 0xe1, 0x10, 0x00, 0x30, 0x20, 0x50, 0x40, 0x70,
-    0x60, 0x83, 0x93, 0xa3, 0xb3, 0xc3, 0xd3, 0xe3, 0xf3, 0x02, 0x12, 0x22, 0x32,
-    0x42, 0x52, 0x62, 0x72, 0xb5, 0xa5, 0x95, 0x85, 0xf5, 0xe5, 0xd5, 0xc5, 0x34,
-    0x24, 0x14, 0x04, 0x74, 0x64, 0x54, 0x44, 0xa7, 0xb7, 0x87, 0x97, 0xe7, 0xf7,
-    0xc7, 0xd7, 0x26, 0x36, 0x06, 0x16, 0x66, 0x76, 0x46, 0x56, 0xd9, 0xc9, 0xf9,
-    0xe9, 0x99, 0x89, 0xb9, 0xa9, 0x58, 0x48, 0x78, 0x68, 0x18, 0x08, 0x38, 0x28,
-    0xcb, 0xdb, 0xeb, 0xfb, 0x8b, 0x9b, 0xab, 0xbb, 0x4a, 0x5a, 0x6a, 0x7a, 0x0a,
-    0x1a, 0x2a, 0x3a, 0xfd, 0xed, 0xdd, 0xcd, 0xbd, 0xad, 0x9d, 0x8d, 0x7c, 0x6c,
-    0x5c, 0x4c, 0x3c, 0x2c, 0x1c, 0x0c, 0xef, 0xff, 0xcf, 0xdf, 0xaf, 0xbf, 0x8f,
-    0x9f, 0x6e, 0x7e, 0x4e, 0x5e, 0x2e, 0x3e, 0x0e, 0x1e
-]
+import binascii
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#
+# 16-bit CRC and checksum algorithms used to verify packets.
+#
+# The CRC is computed by binascii.crc_hqx from the python standard library,
+# which is a table-driven implementation of the same CCITT CRC in C. It works
+# directly on bytes, bytearray, memoryview, mmap or any other bytes-like
+# object, without copying, and is bit-identical to the original byte-at-a-time
+# python implementation, which it replaces.
+#
+# The *_many functions check many packets held in one buffer in a single call,
+# and use NumPy, when it is installed, to do so.
+#
+
+# Buffers at least this long have their checksum computed with NumPy, if it
+# is installed:
+_NUMPY_MIN_LENGTH = 4096
+
+
+def _as_buffer(byte_array):
+    """Return the byte_array as a bytes-like object, copying it only if it is not one already."""
+    try:
+        return memoryview(byte_array).cast("B")
+    except TypeError:
+        return bytes(byte_array)
+
+
+def crc_16_int(byte_array, seed=0xFFFF):
+    """
+
+    16-bit CRC as an integer:
+    Uses CCITT CRC polynomial: X^16 + X^12 + X^5 + 1.
+    The accepted start value is 0xffff.
+
+    """
+    return binascii.crc_hqx(_as_buffer(byte_array), seed)
 
 
 def crc_16(byte_array, seed=[0xFF, 0xFF]):
@@ -53,22 +50,96 @@ def crc_16(byte_array, seed=[0xFF, 0xFF]):
     The accepted start value is 0xffff.
 
     """
-    high_parity = seed[0]
-    low_parity = seed[1]
-    for byte in list(byte_array):
-        k = byte ^ high_parity
-        high_parity = low_parity ^ _high_crc[k]
-        low_parity = _low_crc[k]
-    return [high_parity, low_parity]
+    crc = binascii.crc_hqx(_as_buffer(byte_array), seed[0] * 0x100 + seed[1])
+    return [crc >> 8, crc & 0xFF]
 
 
-def checksum_16(byte_array, seed=[0x00, 0x00]):
-    """Simple 16-bit checksum."""
+def _sum_16(buffer):
+    """Return the sum of the big endian 16-bit words in an even length bytes-like object."""
+    if np is not None and len(buffer) >= _NUMPY_MIN_LENGTH:
+        return int(np.frombuffer(buffer, dtype=">u2").sum(dtype=np.uint64))
+    return sum(buffer[0::2]) * 0x100 + sum(buffer[1::2])
+
+
+def checksum_16_int(byte_array, seed=0x0000):
+    """Simple 16-bit checksum as an integer."""
     assert (
         len(byte_array) % 2 == 0
     ), "Checksum 16 only works on even numbered byte arrays"
-    csum = seed[0] * 0x100 + seed[1]
-    for i in range(0, len(byte_array), 2):
-        csum += byte_array[i] * 0x100 + byte_array[i + 1]
-        csum %= 0x10000
-    return [int(csum / 0x100), csum % 0x100]
+    return (seed + _sum_16(_as_buffer(byte_array))) % 0x10000
+
+
+def checksum_16(byte_array, seed=[0x00, 0x00]):
+    """Simple 16-bit checksum."""
+    csum = checksum_16_int(byte_array, seed[0] * 0x100 + seed[1])
+    return [csum >> 8, csum & 0xFF]
+
+
+def crc_16_many(buffer, offsets, lengths, seed=0xFFFF):
+    """
+    Return the 16-bit CRC, as an integer, of each of the byte ranges of the
+    buffer given by offsets and lengths.
+    """
+    view = _as_buffer(buffer)
+    crc_hqx = binascii.crc_hqx
+    if np is not None:
+        offsets = np.asarray(offsets).tolist()
+        lengths = np.asarray(lengths).tolist()
+    return [crc_hqx(view[offset:offset + length], seed) for offset, length in zip(offsets, lengths)]
+
+
+def checksum_16_many(buffer, offsets, lengths, seed=0x0000):
+    """
+    Return the simple 16-bit checksum, as an integer, of each of the byte ranges
+    of the buffer given by offsets and lengths.
+    """
+    assert all(
+        length % 2 == 0 for length in lengths
+    ), "Checksum 16 only works on even numbered byte arrays"
+    view = _as_buffer(buffer)
+    if np is None:
+        return [(seed + _sum_16(view[offset:offset + length])) % 0x10000 for offset, length in zip(offsets, lengths)]
+
+    # Sum the high and the low bytes of every range at once:
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if len(offsets) == 0:
+        return []
+    data = np.frombuffer(view, dtype=np.uint8)
+    words = np.zeros(len(offsets), dtype=np.int64)
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        # Gather the bytes of every range, in order, and sum each range's half of them:
+        starts = offsets[nonempty]
+        counts = lengths[nonempty]
+        boundaries = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.repeat(starts - boundaries, counts) + np.arange(int(counts.sum()))
+        values = data[positions].astype(np.int64)
+        values[0::2] <<= 8
+        words[nonempty] = np.add.reduceat(values, boundaries)
+    return ((seed + words) % 0x10000).tolist()
+
+
+def check_crc_16_many(buffer, offsets, lengths, use_checksum=False):
+    """
+    Return whether each of the packets in the buffer, given by offsets and
+    lengths, ends in a valid 16-bit CRC (or simple 16-bit checksum) of the
+    rest of the packet, as a list of booleans. Each length includes the
+    two CRC bytes at the end of the packet.
+    """
+    algorithm = checksum_16_many if use_checksum else crc_16_many
+    view = _as_buffer(buffer)
+    if np is None:
+        crcs = algorithm(view, offsets, [length - 2 for length in lengths])
+        return [
+            crc == (view[offset + length - 2] << 8) + view[offset + length - 1]
+            for offset, length, crc in zip(offsets, lengths, crcs)
+        ]
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    crcs = np.array(algorithm(view, offsets, lengths - 2), dtype=np.int64)
+    data = np.frombuffer(view, dtype=np.uint8)
+    ends = offsets + lengths
+    stored = (data[ends - 2].astype(np.int64) << 8) | data[ends - 1]
+    return (stored == crcs).tolist()
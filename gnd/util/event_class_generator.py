@@ -1,3 +1,9 @@
+from bitstring import ReadError
+
+# Marks an event parameter that has been received but not decoded yet:
+_UNDECODED = object()
+
+
 def create_event_cls(component_instance_name, event_name, param_type_cls, description=""):
     """
     This function is a class constructor (via closure). It creates an event class
@@ -5,8 +11,13 @@ def create_event_cls(component_instance_name, event_name, param_type_cls, descri
     by the component's name, the event's name, the parameter class (which
     is usually an autocoded python class inheriting from PackedTypeBase),
     and an optional description string.
+
+    Events decoded from bytes decode their header right away, but only decode
+    their parameter the first time Param is accessed, so that events can be
+    filtered or counted by their header cheaply.
     """
     from event import Event
+    from event_header import Event_Header
 
     class SpecificEvent(Event):
         def __init__(self, Header=None, Param=None):
@@ -36,6 +47,28 @@ def create_event_cls(component_instance_name, event_name, param_type_cls, descri
                 Header=Header, Param_Buffer=param_buffer
             )
 
+        @property
+        def Param(self):
+            """
+            The event parameter. A parameter received in the param_buffer is
+            decoded into our specific parameter type when first accessed.
+            """
+            if self._param is _UNDECODED:
+                self._param = param_type_cls.create_from_byte_array(
+                    bytes(self.Param_Buffer)
+                )
+            return self._param
+
+        @Param.setter
+        def Param(self, value):
+            self._param = value
+
+        def _receive_param_buffer(self):
+            # Decode the param_buffer into our specific parameter type later, if
+            # it is ever needed:
+            if self.Param_Buffer and param_type_cls is not None:
+                self._param = _UNDECODED
+
         def _from_byte_array(self, stream):
             """
             Override the _from_byte_array method so that we can also
@@ -43,12 +76,25 @@ def create_event_cls(component_instance_name, event_name, param_type_cls, descri
             """
             # First call the base class decoder:
             super(SpecificEvent, self)._from_byte_array(stream)
+            self._receive_param_buffer()
 
-            # Now use the param_buffer to decode into our specific parameter type:
-            if self.Param_Buffer:
-                self.Param = param_type_cls.create_from_byte_array(
-                    bytes(self.Param_Buffer)
+        def from_byte_array(self, byte_array, offset=0):
+            """
+            Override the from_byte_array method to decode the header with its
+            struct codec, and to take the param_buffer straight from the bytes.
+            Returns the number of bytes consumed.
+            """
+            header, header_length = Event_Header.decode_from(byte_array, offset)
+            start = offset + header_length
+            param_buffer = list(memoryview(byte_array)[start:start + header.Param_Buffer_Length])
+            if len(param_buffer) < header.Param_Buffer_Length:
+                raise ReadError(
+                    "Expected a param_buffer of " + str(header.Param_Buffer_Length)
+                    + " bytes, but only " + str(len(param_buffer)) + " were available."
                 )
+            Event.__init__(self, Header=header, Param_Buffer=param_buffer)
+            self._receive_param_buffer()
+            return header_length + len(param_buffer)
 
         def pretty_print_string(self):
             seconds = 0
@@ -88,6 +134,40 @@ def create_event_cls(component_instance_name, event_name, param_type_cls, descri
     return SpecificEvent
 
 
+def dispatch_table(event_id_cls_dict):
+    """
+    Return a tuple, indexed by event ID, of the event classes in an assembly's
+    event_id_cls_dict, with None for the IDs that are not used. Autocoded
+    assembly events files provide this as event_id_cls_table.
+    """
+    table = [None] * (max(event_id_cls_dict, default=-1) + 1)
+    for event_id, event_cls in event_id_cls_dict.items():
+        table[event_id] = event_cls
+    return tuple(table)
+
+
+def event_headers(byte_array, offset=0, end=None):
+    """
+    Yield the offset and header of each of the consecutive events in a bytes-like
+    object, from offset up to end, without decoding anything else. Use it to
+    filter or count events by their header, and decode only the events needed
+    with the event class from the dispatch table, ie.
+
+      for offset, header in event_headers(data):
+          if header.Id == wanted_id:
+              event = event_id_cls_table[header.Id].create_from_byte_array(data, offset)
+    """
+    from event_header import Event_Header
+
+    view = memoryview(byte_array)
+    if end is None:
+        end = len(view)
+    while offset < end:
+        header, header_length = Event_Header.decode_from(view, offset)
+        yield offset, header
+        offset += header_length + header.Param_Buffer_Length
+
+
 # Testing code:
 if __name__ == "__main__":
     # Build our dependencies using the build system.
@@ -0,0 +1,332 @@
+import asyncio
+import socket
+import sys
+import time
+from util import crc_16
+
+#
+# Asyncio event decoding for socket_event_decoder.py.
+#
+# Events are decoded from CCSDS packets received on any number of TCP and UDP
+# endpoints at once, on a single event loop. Decoded events are written by a
+# batched_writer, which collects lines and writes them out at an interval,
+# rather than writing and flushing each line as it is decoded.
+#
+# A TCP connection is a stream of bytes, so packets are framed using the length
+# in their headers. If a packet of the app ID has an invalid CRC, the stream has
+# lost sync, and the decoder skips ahead, one byte at a time, to the next packet
+# of the app ID with a valid CRC. A UDP datagram holds whole packets, so a packet
+# with an invalid CRC is just dropped. The number of packets and events dropped,
+# and the number of times a stream lost sync, are kept for each endpoint.
+#
+
+# The length of a CCSDS primary header, in bytes:
+_HEADER_LENGTH = 6
+
+# The number of bytes in a packet that are not counted in its packet length field:
+_PACKET_LENGTH_OFFSET = 7
+
+# The number of bytes read from a TCP connection at a time:
+_READ_SIZE = 64 * 1024
+
+
+def parse_endpoint(spec):
+    """
+    Parse an endpoint given as protocol:host:port, ie. tcp:192.168.1.2:3001 or
+    udp:0.0.0.0:3002, into a (protocol, host, port) tuple.
+    """
+    protocol, _, address = spec.partition(":")
+    host, _, port = address.rpartition(":")
+    protocol = protocol.lower()
+    assert protocol in ("tcp", "udp") and host and port.isdigit(), (
+        "Endpoint '" + spec + "' must be given as tcp:host:port or udp:host:port."
+    )
+    return (protocol, host, int(port))
+
+
+class batched_writer(object):
+    """
+    Writes lines to stdout and to a log file in batches, every flush_interval
+    seconds, or sooner once max_lines are waiting.
+    """
+    def __init__(self, log_file, flush_interval=1.0, max_lines=10000, echo=True):
+        self.flush_interval = flush_interval
+        self.max_lines = max_lines
+        self.echo = echo
+        self._file = open(log_file, "a") if log_file else None
+        self._lines = []
+
+    def write(self, line):
+        self._lines.append(line)
+        if len(self._lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        text = "\n".join(self._lines) + "\n"
+        self._lines = []
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        if self._file:
+            self._file.write(text)
+            self._file.flush()
+
+    async def run(self):
+        """Flush the writer every flush_interval seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class endpoint_stats(object):
+    """The decoding state and counts of a single endpoint."""
+    def __init__(self, name):
+        self.name = name
+        self.packets = 0  # Packets of the app ID decoded.
+        self.events = 0  # Events decoded.
+        self.invalid_packets = 0  # Packets of the app ID with an invalid CRC.
+        self.missing_packets = 0  # Packets of the app ID missing from the sequence counts.
+        self.dropped_events = 0  # Events that could not be decoded.
+        self.resyncs = 0  # Times the stream lost sync.
+        self.skipped_bytes = 0  # Bytes that were not part of a packet.
+        self.error = None  # The error that stopped the endpoint, if any.
+        self.synchronized = True
+        self.sequence_count = None
+
+    def to_string(self):
+        return (
+            "Endpoint " + self.name
+            + " | packets: " + str(self.packets)
+            + " | events: " + str(self.events)
+            + " | invalid packets: " + str(self.invalid_packets)
+            + " | missing packets: " + str(self.missing_packets)
+            + " | dropped events: " + str(self.dropped_events)
+            + " | resyncs: " + str(self.resyncs)
+            + " | skipped bytes: " + str(self.skipped_bytes)
+        )
+
+
+class event_stream_decoder(object):
+    def __init__(self, event_id_cls_table, app_id, writer):
+        # These are autocoded, so are only imported once they have been built:
+        from ccsds_space_packet import Ccsds_Space_Packet
+        from event_header import Event_Header
+        from sys_time import Sys_Time
+
+        self.app_id = app_id
+        self.writer = writer
+        self.max_packet_length = Ccsds_Space_Packet()._max_serialized_length
+        self._event_header_cls = Event_Header
+        self._time_length = Sys_Time().serialized_length()
+        self._table = event_id_cls_table
+
+    def _is_valid(self, view, idx, length):
+        """Return True if the length bytes at idx end in a valid CRC of the rest of them."""
+        end = idx + length
+        return crc_16.crc_16_int(view[idx:end - 2]) == (view[end - 2] << 8) | view[end - 1]
+
+    def decode(self, buffer, stats, framed=False):
+        """
+        Decode the packets at the start of the buffer, writing out their events.
+        Returns the number of bytes consumed. A packet that has not been received
+        in full is left in the buffer, unless the buffer is framed, ie. a UDP
+        datagram, in which case its bytes are skipped.
+        """
+        with memoryview(buffer) as view:
+            idx = 0
+            end = len(view)
+            while end - idx >= _HEADER_LENGTH:
+                apid = ((view[idx] & 0x07) << 8) | view[idx + 1]
+                length = ((view[idx + 4] << 8) | view[idx + 5]) + _PACKET_LENGTH_OFFSET
+
+                if not stats.synchronized:
+                    # Search for the next packet of the app ID with a valid CRC:
+                    if apid == self.app_id and view[idx] & 0xE0 == 0 and length <= self.max_packet_length:
+                        if end - idx < length:
+                            break
+                        if self._is_valid(view, idx, length):
+                            stats.synchronized = True
+                            continue
+                    idx += 1
+                    stats.skipped_bytes += 1
+                    continue
+
+                if length > self.max_packet_length:
+                    # This cannot be a packet, so the stream has lost sync:
+                    if framed:
+                        break
+                    stats.synchronized = False
+                    stats.resyncs += 1
+                    continue
+                if end - idx < length:
+                    break
+
+                if apid == self.app_id:
+                    if self._is_valid(view, idx, length):
+                        sequence_count = ((view[idx + 2] & 0x3F) << 8) | view[idx + 3]
+                        if stats.sequence_count is not None:
+                            stats.missing_packets += (sequence_count - stats.sequence_count - 1) % 0x4000
+                        stats.sequence_count = sequence_count
+                        stats.packets += 1
+                        self._decode_events(
+                            view[idx + _HEADER_LENGTH + self._time_length:idx + length - 2], stats
+                        )
+                    else:
+                        stats.invalid_packets += 1
+                        self.writer.write(
+                            "Could not parse INVALID CCSDS packet with id:%s sequence count:%s and length:%s"
+                            % (str(apid), str(((view[idx + 2] & 0x3F) << 8) | view[idx + 3]),
+                               str(length - _PACKET_LENGTH_OFFSET))
+                        )
+                        # The packet length cannot be trusted in a stream:
+                        if not framed:
+                            stats.synchronized = False
+                            stats.resyncs += 1
+                            continue
+                idx += length
+
+            if framed:
+                stats.skipped_bytes += end - idx
+                return end
+            return idx
+
+    def _decode_events(self, data, stats):
+        """Decode and write out the events in the data of a packet."""
+        idx = 0
+        while idx < len(data):
+            try:
+                header, header_length = self._event_header_cls.decode_from(data, idx)
+            except Exception as e:
+                self.writer.write("Error encountered while parsing event header:\n" + str(e))
+                stats.dropped_events += 1
+                return
+
+            event_id = header.Id
+            event_cls = self._table[event_id] if event_id < len(self._table) else None
+            if event_cls is None:
+                self.writer.write("Received unrecognized event with id: " + str(event_id))
+                stats.dropped_events += 1
+            else:
+                try:
+                    event = event_cls.create_from_byte_array(data, idx)
+                    self.writer.write(event.pretty_print_string())
+                    stats.events += 1
+                except Exception as e:
+                    self.writer.write(
+                        "Error encountered while parsing event with id: " + str(event_id) + "\n" + str(e)
+                    )
+                    stats.dropped_events += 1
+
+            # Increment the index by the length of the event:
+            idx += header_length + header.Param_Buffer_Length
+
+
+class _datagram_protocol(asyncio.DatagramProtocol):
+    def __init__(self, decoder, stats):
+        self.decoder = decoder
+        self.stats = stats
+
+    def datagram_received(self, data, addr):
+        self.decoder.decode(data, self.stats, framed=True)
+
+    def error_received(self, exc):
+        self.decoder.writer.write("Socket error occurred on " + self.stats.name + ": " + str(exc))
+
+
+async def _receive_tcp(decoder, stats, host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    decoder.writer.write("Connected to TCP at:" + str((host, port)))
+    buffer = bytearray()
+    try:
+        while True:
+            chunk = await reader.read(_READ_SIZE)
+            if not chunk:
+                decoder.writer.write("Connection closed by " + stats.name)
+                return
+            buffer += chunk
+            consumed = decoder.decode(buffer, stats)
+            if consumed:
+                del buffer[:consumed]
+    finally:
+        writer.close()
+
+
+async def _receive_udp(decoder, stats, host, port, receive_buffer_size):
+    # Bind the socket ourselves, so that we can ask for a large receive buffer.
+    # This lets the socket absorb bursts of packets without dropping them:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    if receive_buffer_size:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+    sock.bind((host, port))
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: _datagram_protocol(decoder, stats), sock=sock
+    )
+    decoder.writer.write("Connected to UDP at:" + str((host, port)))
+    try:
+        # Datagrams are received until the decoder is stopped:
+        await asyncio.Future()
+    finally:
+        transport.close()
+
+
+def _timestamp_str():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def run(decoder, endpoints, stats_interval=0, receive_buffer_size=0):
+    """
+    Decode events from a list of (protocol, host, port) endpoints until every
+    endpoint has closed, or an endpoint fails. Returns the endpoint_stats of each
+    endpoint. The stats are written out every stats_interval seconds, if set, and
+    when decoding ends.
+    """
+    writer = decoder.writer
+    all_stats = [endpoint_stats(protocol + ":" + host + ":" + str(port)) for protocol, host, port in endpoints]
+    receivers = [
+        asyncio.ensure_future(
+            _receive_tcp(decoder, stats, host, port) if protocol == "tcp"
+            else _receive_udp(decoder, stats, host, port, receive_buffer_size)
+        )
+        for (protocol, host, port), stats in zip(endpoints, all_stats)
+    ]
+    flusher = asyncio.ensure_future(writer.run())
+
+    async def report():
+        while True:
+            await asyncio.sleep(stats_interval)
+            for stats in all_stats:
+                writer.write(stats.to_string())
+
+    reporter = asyncio.ensure_future(report()) if stats_interval else None
+    try:
+        writer.write("Starting event logging at " + _timestamp_str() + ":")
+        pending = set(receivers)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for receiver in done:
+                stats = all_stats[receivers.index(receiver)]
+                if not receiver.cancelled() and receiver.exception() is not None:
+                    stats.error = receiver.exception()
+                    writer.write(
+                        "Socket error occurred on " + stats.name + ": " + str(stats.error)
+                        + " | Exiting at " + _timestamp_str()
+                    )
+                    # Stop the other endpoints too:
+                    for other in pending:
+                        other.cancel()
+    finally:
+        for task in receivers + [flusher, reporter]:
+            if task is not None:
+                task.cancel()
+        for stats in all_stats:
+            writer.write(stats.to_string())
+        writer.flush()
+    return all_stats
@@ -0,0 +1,66 @@
+#
+# A reader that decodes packed types, in order, from a stream of bytes that
+# arrives in chunks, ie. the payloads of consecutive packets in a capture, as
+# if the chunks had been joined into one buffer. Used by the event decoders in
+# bin/ to decode events that may be split across packets.
+#
+# Only the bytes that have not been decoded yet are kept, so memory use does not
+# grow with the length of the stream, and each object is decoded in place from
+# the reader's buffer rather than from a copy of the rest of the stream.
+#
+
+
+class stream_reader(object):
+    def __init__(self, chunks, window):
+        """
+        Read from an iterable of bytes-like chunks. The window is the length, in
+        bytes, of the largest object that will be decoded.
+        """
+        self.position = 0  # Position in the stream of the next byte to decode.
+        self._chunks = iter(chunks)
+        self._window = window
+        self._buffer = bytearray()
+        self._start = 0  # Position in the stream of the first byte in the buffer.
+        self._exhausted = False
+
+    def _drop(self):
+        # Drop the bytes before the current position once there are enough of
+        # them, so that the buffer is not moved every time an object is decoded:
+        unused = min(self.position - self._start, len(self._buffer))
+        if unused > 0 and (unused >= self._window or unused == len(self._buffer)):
+            del self._buffer[:unused]
+            self._start += unused
+
+    def _fill(self, end):
+        """Read chunks until the buffer holds the stream up to end, or the stream ends."""
+        self._drop()
+        while not self._exhausted and self._start + len(self._buffer) < end:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._exhausted = True
+            elif not self._buffer and self._start + len(chunk) <= self.position:
+                # The whole chunk is before the current position, so skip it:
+                self._start += len(chunk)
+            else:
+                self._buffer += chunk
+                self._drop()
+
+    def at_end(self):
+        """Return True if there are no bytes left in the stream at the current position."""
+        self._fill(self.position + 1)
+        return self.position >= self._start + len(self._buffer)
+
+    def seek(self, position):
+        """Move forward to a position in the stream."""
+        assert position >= self.position, "A stream reader can only move forward."
+        self.position = position
+
+    def decode(self, cls):
+        """
+        Decode an instance of the packed type cls at the current position, without
+        moving past it. Returns the object and the number of bytes it was decoded
+        from, see PackedTypeBase.decode_from.
+        """
+        self._fill(self.position + self._window)
+        with memoryview(self._buffer) as view:
+            return cls.decode_from(view, self.position - self._start)
@@ -32,12 +32,19 @@ class _build_path(OrderedDict):
     precedence over same-named things in the core framework.
     ie. src/core/stuff.h in a project specific directory will be
     built/used instead of a src/core/stuff.h in a framework dir
+
+    While searching the search roots, the unit test models (*.tests.yaml)
+    found are also collected in unit_test_models, since they are usually
+    not in the build path, along with the roots searched in search_roots.
     """
     def __init__(self, search_roots=[], targets=["all"], additional_path=[]):
         """
         Upon init construct the entire build path. This is the only
         public method of the class.
         """
+        self.search_roots = list(search_roots)
+        self.unit_test_models = []
+
         # If search roots were given then form a build path from each
         # of the roots:
         if search_roots:
@@ -98,7 +105,18 @@ class _build_path(OrderedDict):
         # make sure the _Test target includes the regular target path files. This automagic was confusing and now
         # no longer exists.
 
-        for root, dirnames, filenames in filesystem.recurse_through_repo(search_root):
+        # The search is done using the persistent directory index, so that only
+        # directories that have changed since the last search are listed:
+        from database.persistent_target_cache import (
+            load_directory_index,
+            save_directory_index,
+        )
+
+        index = load_directory_index(search_root)
+        new_index = {}
+        for root, dirnames, filenames in filesystem.recurse_through_repo_indexed(
+            search_root, index, new_index
+        ):
             # sys.stderr.write("root: " + str(root) + " dirnames: " + str(dirnames) + \
             #                  " filenames: " + str(filenames) + "\n")
             # If a filename of .all_path or .target_path is found, then save that directory:
@@ -106,6 +124,12 @@ class _build_path(OrderedDict):
                 if path_filename in filenames:
                     self._add_to_path(root, filenames)
                     break
+            # Save any unit test models found in the directory:
+            for filename in filenames:
+                if filename.endswith(".tests.yaml") and filename[0] != ".":
+                    self.unit_test_models.append(os.path.join(root, filename))
+        if new_index != index:
+            save_directory_index(search_root, new_index)
 
 
 def _get_git_root(path):
@@ -407,9 +431,22 @@ def _setup(redo_1, redo_2, redo_3, sandbox=False):
             "COMPUTED_BUILD_PATH = " + str(_get_path_from_env("COMPUTED_BUILD_PATH"))
         )
 
-    # Create the database:
-    from database.create import create
-    create(path)
+    # Create the database. If an earlier session created the databases from
+    # the same build path, target, and build system code, then copy its
+    # snapshot of the databases instead of recreating them:
+    from database import persistent_target_cache
+
+    snapshot_key = persistent_target_cache.get_database_snapshot_key(path, build_target)
+    if snapshot_key and persistent_target_cache.restore_database_snapshot(
+        snapshot_key, db_dir
+    ):
+        debug.debug_print("Restored database snapshot " + snapshot_key)
+    else:
+        from database.create import create
+
+        create(path)
+        if snapshot_key:
+            persistent_target_cache.save_database_snapshot(snapshot_key, db_dir)
 
 
 def _cleanup():
@@ -7,6 +7,79 @@ from util import target
 import os.path
 
 
+def source_key(source_filename):
+    """Return the database key (the lower case basename without extension) of a source file."""
+    return redo_arg.get_base_no_ext(source_filename).lower()
+
+
+def add_source_to_record(record, source_filename, model_filename=None):
+    """
+    Add a source file (and the associated model file, if there is one) to
+    a C/C++ source database record, creating the record if it is None, and
+    return the updated record. This errors if the source file conflicts with
+    the sources already in the record, see c_source_database.insert_source.
+    """
+    # Error functions:
+    def _duplicate_source_error(file1, file2):
+        error.error_abort(
+            "All C/C++ source in the build path must have unique file names. The following two files conflict: ["
+            + file1
+            + ", "
+            + file2
+            + "]"
+        )
+
+    def _duplicate_model_error(file1, file2):
+        error.error_abort(
+            "All models in the build path must produce C/C++ file names. The following two files conflict: ["
+            + file1
+            + ", "
+            + file2
+            + "]"
+        )
+
+    basename = redo_arg.get_base_no_ext(source_filename)
+
+    # If the record already exists, we need to be very careful about adding another source
+    # file. It must be the complement to the source file that already exists. For example,
+    # if hello.c exists, we can add hello.h, but nothing else. If we find another piece of
+    # source, then we potentially have two different packages named the same thing, and we
+    # should warn the user.
+    if record:
+        # Make sure that the models don't conflict:
+        existing_model = record[1]
+        if existing_model and model_filename and existing_model != model_filename:
+            _duplicate_model_error(existing_model, model_filename)
+
+        # Check the source to make sure we are able to insert it.
+        _, ext = os.path.splitext(source_filename)
+        should_not_exist = [basename + ext]
+        if ext.endswith("pp"):
+            should_not_exist.append(basename + ext[:-2])
+        else:
+            should_not_exist.append(basename + ext + "pp")
+
+        existing_source = record[0]
+        for source in existing_source:
+            source_base = os.path.basename(source)
+            if source != source_filename and source_base in should_not_exist:
+                # We have a specific conflict:
+                _duplicate_source_error(source_filename, source)
+
+        # If this happens, we have some other weird conflict that we
+        # definitely want to catch
+        if len(existing_source) >= 2:
+            _duplicate_source_error(source_filename, str(existing_source))
+    else:
+        record = [[], None]
+
+    # OK, everything is good, let's go ahead and insert the source and model:
+    record[0].append(source_filename)
+    if model_filename:
+        record[1] = model_filename
+    return record
+
+
 class c_source_database(database):
     """
     This database is responsible for storing C/C++ source files found in
@@ -43,70 +116,10 @@ class c_source_database(database):
         restriction of coding in C/C++ within Adamant do to the Ada interface.
         """
 
-        # Error functions:
-        def _duplicate_source_error(file1, file2):
-            error.error_abort(
-                "All C/C++ source in the build path must have unique file names. The following two files conflict: ["
-                + file1
-                + ", "
-                + file2
-                + "]"
-            )
-
-        def _duplicate_model_error(file1, file2):
-            error.error_abort(
-                "All models in the build path must produce C/C++ file names. The following two files conflict: ["
-                + file1
-                + ", "
-                + file2
-                + "]"
-            )
-
-        # Get a basename from the filename and try to
-        # fetch a record if it exists.
-        basename = redo_arg.get_base_no_ext(source_filename)
-        key = basename.lower()
-        record = self.try_fetch(key)
-
-        # If the record already exists, we need to be very careful about adding another source
-        # file. It must be the complement to the source file that already exists. For example,
-        # if hello.c exists, we can add hello.h, but nothing else. If we find another piece of
-        # source, then we potentially have two different packages named the same thing, and we
-        # should warn the user.
-        if record:
-            # Make sure that the models don't conflict:
-            existing_model = record[1]
-            if existing_model and model_filename and existing_model != model_filename:
-                _duplicate_model_error(existing_model, model_filename)
-
-            # Check the source to make sure we are able to insert it.
-            _, ext = os.path.splitext(source_filename)
-            should_not_exist = [basename + ext]
-            if ext.endswith("pp"):
-                should_not_exist.append(basename + ext[:-2])
-            else:
-                should_not_exist.append(basename + ext + "pp")
-
-            existing_source = record[0]
-            for source in existing_source:
-                source_base = os.path.basename(source)
-                if source != source_filename and source_base in should_not_exist:
-                    # We have a specific conflict:
-                    _duplicate_source_error(source_filename, source)
-
-            # If this happens, we have some other weird conflict that we
-            # definitely want to catch
-            if len(existing_source) >= 2:
-                _duplicate_source_error(source_filename, str(existing_source))
-        else:
-            record = [[], None]
-
-        # OK, everything is good, let's go ahead and insert the source and model:
-        record[0].append(source_filename)
-        if model_filename:
-            record[1] = model_filename
-
-        # Insert record into database:
+        key = source_key(source_filename)
+        record = add_source_to_record(
+            self.try_fetch(key), source_filename, model_filename
+        )
         self.store(key, record)
 
     def get_source(self, basename):
@@ -4,7 +4,6 @@ from util import error
 from util import redo_arg
 from util import target
 from util import meta
-from util import ada
 import re
 import inspect
 
@@ -19,6 +18,11 @@ from database.redo_target_database import redo_target_database
 from database.build_target_database import build_target_database
 import database.model_cache_database
 from database.model_database import model_database
+import database.model_database
+import database.source_database
+import database.c_source_database
+import database.py_source_database
+import database.generator_database
 
 # Base class imports:
 from base_classes.build_target_base import build_target_base
@@ -249,6 +253,66 @@ def _is_py_source_file(filename):
     return ext == ".py"
 
 
+def _insert_model(model_records, model_filename):
+    """
+    Insert a model file into an in-memory model database dictionary
+    and return the model name it was stored under.
+    """
+    model_name, _, _ = database.model_database.split_model_file_name(model_filename)
+    model_records[model_name] = database.model_database.add_model_to_record(
+        model_records.get(model_name), model_filename
+    )
+    return model_name
+
+
+def _insert_unit_test(unit_test_records, unit_test_filename):
+    """
+    Insert a unit test model file into an in-memory dictionary mapping
+    unit test keys to lists of unit test model files.
+    """
+    # The model under test is named by the last field before ".tests.yaml":
+    model_name = os.path.basename(unit_test_filename)[: -len(".tests.yaml")].split(".")[-1]
+    if model_name:
+        key = database.model_database.get_unit_tests_key(model_name)
+        unit_test_records.setdefault(key, []).append(unit_test_filename)
+
+
+def _insert_source(source_records, source_module, source_filename, model_filename=None):
+    """
+    Insert a source file into an in-memory source database dictionary using
+    the record rules of the source database module provided, ie.
+    database.source_database or database.c_source_database.
+    """
+    key = source_module.source_key(source_filename)
+    source_records[key] = source_module.add_source_to_record(
+        source_records.get(key), source_filename, model_filename
+    )
+
+
+def _has_source(source_records, source_module, source_filename):
+    """
+    Return True if the source file is already in the record for its key
+    in an in-memory source database dictionary.
+    """
+    record = source_records.get(source_module.source_key(source_filename))
+    return record is not None and source_filename in record[0]
+
+
+def _insert_generator(generator_records, output_filename, *generator_info):
+    """
+    Insert generator information for an output file into an in-memory
+    generator database dictionary. Only a single entry is allowed for
+    each output file.
+    """
+    to_store = database.generator_database.generator_record(*generator_info)
+    assert (
+        output_filename not in generator_records
+    ), database.generator_database.duplicate_generator_message(
+        output_filename, generator_records.get(output_filename), to_store
+    )
+    generator_records[output_filename] = to_store
+
+
 #####################################################
 # Private classes:
 #####################################################
@@ -372,153 +436,199 @@ def create(build_path):
     yaml_file_regex = re.compile(r".*\.yaml$")
     c_source_regex = re.compile(r".*\.(h|hpp|c|cpp|S|s)$")
 
+    # The source, model, and generator databases are first built up in these
+    # dictionaries, which map database keys to records. Each database is then
+    # written in a single bulk pass, instead of fetching and storing a growing
+    # record from the database for every file that is inserted.
+    model_records = {}
+    source_records = {}
+    c_source_records = {}
+    py_source_records = {}
+    generator_records = {}
+
     # Search first for model files, and create the model database. This
     # may be needed by generators, so we need to build it first.
+    model_files = []
+    # Iterate through every directory in the build path:
+    for directory, files in build_path.items():
+        # Search for model files and add them to the model files
+        # list:
+        for filename in _filter_by_regex(yaml_file_regex, files):
+            model_files.append(filename)
+            _insert_model(model_records, filename)
+    # Add the unit test models found while searching for the build path, so
+    # that components can look up their unit tests without searching the
+    # filesystem themselves:
+    unit_test_records = {}
+    for filename in build_path.unit_test_models:
+        _insert_unit_test(unit_test_records, filename)
+    unit_test_records[database.model_database.unit_test_roots_key] = (
+        build_path.search_roots
+    )
     with model_database(mode=DATABASE_MODE.CREATE) as model_db:
-        # Iterate through every directory in the build path:
-        model_files = []
-        for directory, files in build_path.items():
-            # Search for model files and add them to the model files
-            # list:
-            for filename in _filter_by_regex(yaml_file_regex, files):
-                model_files.append(filename)
-                model_db.insert_model(filename)
-
-    # Open all the source and generator databases that will be populated
-    # when we iterate through the build path.
-    with source_database(mode=DATABASE_MODE.CREATE) as source_db, c_source_database(
-        mode=DATABASE_MODE.CREATE
-    ) as c_source_db, py_source_database(
-        mode=DATABASE_MODE.CREATE
-    ) as py_source_db, generator_database(
-        mode=DATABASE_MODE.CREATE
-    ) as generator_db:
-        def compute_generated_files(all_input_files):
-            """
-            Using the generator regexes, add any autogenerated source
-            to the source database. Add output_file -> generator map
-            to the generator database.
-            """
-            def _compute_generated_files(input_files):
-                generated_models = []
-                for regex_string, (cregex, generators) in generator_regex_dict.items():
-                    for input_filename in _filter_by_regex(cregex, input_files):
-                        for generator in generators:
-                            # Grab the output filename from the generator:
-                            try:
-                                output_filename = generator.output_filename_(
-                                    input_filename
-                                )
-                            except Exception as e:
-                                _output_filename_error(e, generator, input_filename)
-
-                            # If the output name is valid, add it to the generator database and
-                            # the redo target dictionary:
-                            if output_filename:
-                                output_filename = _format_output_filename(
-                                    output_filename, generator
-                                )
-                                generator_db.insert_generator(
-                                    output_filename,
-                                    input_filename,
-                                    generator.__module__,
-                                    generator.generate.__self__.__class__.__name__,
-                                    inspect.getfile(generator.__class__),
-                                )
-                                redo_target_dict.add_target(directory, output_filename)
-
-                                # Make sure that this source file is actually in the build path. This
-                                # if statement prevents things like autogenerated files found in "template",
-                                # which are not in the build path, from being added to this dictionary:
-                                output_dir = os.path.dirname(output_filename)
-                                output_dir_name = os.path.basename(output_dir)
-                                if output_dir_name == "src":
-                                    if _is_ada_source_file(output_filename):
-                                        source_db.insert_source(
-                                            output_filename, input_filename
-                                        )
-                                    if _is_c_source_file(output_filename):
-                                        c_source_db.insert_source(
-                                            output_filename, input_filename
-                                        )
-                                    # Add this directory to the source build path:
-                                    source_build_path.append(output_dir)
-                                elif output_dir_name == "py":
-                                    if _is_py_source_file(output_filename):
-                                        py_source_db.insert_source(
-                                            output_filename, input_filename
-                                        )
-                                # If the output file of the generator is yaml, then add it do the models
-                                # dictionary:
-                                elif output_dir_name == "yaml":
-                                    if _is_yaml_source_file(output_filename):
-                                        generated_models.append(output_filename)
-
-                # Add all generated models to the model database, and return them:
+        model_db.store_many(model_records)
+        model_db.store_many(unit_test_records)
+
+    def compute_generated_files(all_input_files):
+        """
+        Using the generator regexes, add any autogenerated source
+        to the source dictionaries. Add output_file -> generator map
+        to the generator dictionary.
+        """
+        def _compute_generated_files(input_files):
+            generated_models = []
+            for regex_string, (cregex, generators) in generator_regex_dict.items():
+                for input_filename in _filter_by_regex(cregex, input_files):
+                    for generator in generators:
+                        # Grab the output filename from the generator:
+                        try:
+                            output_filename = generator.output_filename_(
+                                input_filename
+                            )
+                        except Exception as e:
+                            _output_filename_error(e, generator, input_filename)
+
+                        # If the output name is valid, add it to the generator database and
+                        # the redo target dictionary:
+                        if output_filename:
+                            output_filename = _format_output_filename(
+                                output_filename, generator
+                            )
+                            _insert_generator(
+                                generator_records,
+                                output_filename,
+                                input_filename,
+                                generator.__module__,
+                                generator.generate.__self__.__class__.__name__,
+                                inspect.getfile(generator.__class__),
+                            )
+                            redo_target_dict.add_target(directory, output_filename)
+
+                            # Make sure that this source file is actually in the build path. This
+                            # if statement prevents things like autogenerated files found in "template",
+                            # which are not in the build path, from being added to this dictionary:
+                            output_dir = os.path.dirname(output_filename)
+                            output_dir_name = os.path.basename(output_dir)
+                            if output_dir_name == "src":
+                                if _is_ada_source_file(output_filename):
+                                    _insert_source(
+                                        source_records,
+                                        database.source_database,
+                                        output_filename,
+                                        input_filename,
+                                    )
+                                if _is_c_source_file(output_filename):
+                                    _insert_source(
+                                        c_source_records,
+                                        database.c_source_database,
+                                        output_filename,
+                                        input_filename,
+                                    )
+                                # Add this directory to the source build path:
+                                source_build_path.append(output_dir)
+                            elif output_dir_name == "py":
+                                if _is_py_source_file(output_filename):
+                                    _insert_source(
+                                        py_source_records,
+                                        database.py_source_database,
+                                        output_filename,
+                                        input_filename,
+                                    )
+                            # If the output file of the generator is yaml, then add it do the models
+                            # dictionary:
+                            elif output_dir_name == "yaml":
+                                if _is_yaml_source_file(output_filename):
+                                    generated_models.append(output_filename)
+
+            # Add all generated models to the model database, and return them. Generators
+            # run on the next pass may look these models up, so the model database on
+            # disk is kept up to date, but it is only opened if there is something to add:
+            if generated_models:
+                updated_models = {
+                    _insert_model(model_records, model_file)
+                    for model_file in generated_models
+                }
                 with model_database(mode=DATABASE_MODE.READ_WRITE) as model_db:
-                    for model_file in generated_models:
-                        model_db.insert_model(model_file)
-                return generated_models
-
-            # Continue to run this function on all generated files until there is
-            # no more generated files found.
-            next_input_files = all_input_files
-            while next_input_files:
-                next_input_files = _compute_generated_files(
-                    input_files=next_input_files
-                )
-
-        # Iterate through every directory in the build path:
-        for directory, files in build_path.items():
-            # sys.stderr.write(directory + " " + str(files) + "\n")
-
-            # Add existing Ada source files to database:
-            for filename in _filter_by_regex(ada_source_regex, files):
-                source_db.insert_source(filename)
-
-            # Add existing C and C++ source files to database:
-            for filename in _filter_by_regex(c_source_regex, files):
-                c_source_db.insert_source(filename)
-
-            # Find any special .do files. Ignore default .do files:
-            for filename in _filter_by_regex(do_file_regex, files):
-                # If it is a default.do ignore it.
-                basename = os.path.basename(filename)
-                if not basename.startswith("default."):
-                    do_target = filename[:-3]
-                    # Add the do target to the redo_targets:
-                    redo_target_dict.add_target(directory, do_target)
-                    # If this do file builds an source file add it to the
-                    # source database if it is not already in the source database
-                    if _is_ada_source_file(
-                        do_target
-                    ) and do_target not in source_db.try_get_source(
-                        ada.file_name_to_package_name(do_target)
-                    ):
-                        source_db.insert_source(do_target)
-                    if _is_c_source_file(
-                        do_target
-                    ) and do_target not in c_source_db.try_get_source(
-                        redo_arg.get_base_no_ext(do_target)
-                    ):
-                        c_source_db.insert_source(do_target)
-                    if _is_py_source_file(
-                        do_target
-                    ) and do_target not in py_source_db.try_get_source(
-                        redo_arg.get_base_no_ext(do_target)
-                    ):
-                        py_source_db.insert_source(do_target)
-
-            # Using the generator regexes, add any autogenerated source
-            # to the source database. Add output_file -> generator map
-            # to the generator database.
-            compute_generated_files(files)
-
-            # Using the rule regexes, add any autogenerated files to the
-            # redo target dictionary:
-            for regex_string, (cregex, do_cregex, rules) in rule_regex_dict.items():
-                for input_filename in _filter_by_regex(cregex, files):
-                    for rule in rules:
+                    model_db.store_many(
+                        {name: model_records[name] for name in updated_models}
+                    )
+            return generated_models
+
+        # Continue to run this function on all generated files until there is
+        # no more generated files found.
+        next_input_files = all_input_files
+        while next_input_files:
+            next_input_files = _compute_generated_files(
+                input_files=next_input_files
+            )
+
+    # Iterate through every directory in the build path:
+    for directory, files in build_path.items():
+        # sys.stderr.write(directory + " " + str(files) + "\n")
+
+        # Add existing Ada source files to database:
+        for filename in _filter_by_regex(ada_source_regex, files):
+            _insert_source(source_records, database.source_database, filename)
+
+        # Add existing C and C++ source files to database:
+        for filename in _filter_by_regex(c_source_regex, files):
+            _insert_source(c_source_records, database.c_source_database, filename)
+
+        # Find any special .do files. Ignore default .do files:
+        for filename in _filter_by_regex(do_file_regex, files):
+            # If it is a default.do ignore it.
+            basename = os.path.basename(filename)
+            if not basename.startswith("default."):
+                do_target = filename[:-3]
+                # Add the do target to the redo_targets:
+                redo_target_dict.add_target(directory, do_target)
+                # If this do file builds an source file add it to the
+                # source database if it is not already in the source database
+                if _is_ada_source_file(do_target) and not _has_source(
+                    source_records, database.source_database, do_target
+                ):
+                    _insert_source(source_records, database.source_database, do_target)
+                if _is_c_source_file(do_target) and not _has_source(
+                    c_source_records, database.c_source_database, do_target
+                ):
+                    _insert_source(
+                        c_source_records, database.c_source_database, do_target
+                    )
+                if _is_py_source_file(do_target) and not _has_source(
+                    py_source_records, database.py_source_database, do_target
+                ):
+                    _insert_source(
+                        py_source_records, database.py_source_database, do_target
+                    )
+
+        # Using the generator regexes, add any autogenerated source
+        # to the source database. Add output_file -> generator map
+        # to the generator database.
+        compute_generated_files(files)
+
+        # Using the rule regexes, add any autogenerated files to the
+        # redo target dictionary:
+        for regex_string, (cregex, do_cregex, rules) in rule_regex_dict.items():
+            for input_filename in _filter_by_regex(cregex, files):
+                for rule in rules:
+                    # Grab the output filename from the rule:
+                    try:
+                        output_filename = rule.output_filename(input_filename)
+                    except Exception as e:
+                        _output_filename_error(e, rule, input_filename)
+
+                    if output_filename:
+                        output_filename = _format_output_filename(
+                            output_filename, rule
+                        )
+                        redo_target_dict.add_target(directory, output_filename)
+
+            # Using the rule regexes applied to special .do files, add any
+            # autogenerated files to the redo target dictionary:
+            for input_filename in _filter_by_regex(do_cregex, files):
+                for rule in rules:
+                    if not basename.startswith("default."):
+                        input_filename = input_filename[:-3]
                         # Grab the output filename from the rule:
                         try:
                             output_filename = rule.output_filename(input_filename)
@@ -531,23 +641,15 @@ def create(build_path):
                             )
                             redo_target_dict.add_target(directory, output_filename)
 
-                # Using the rule regexes applied to special .do files, add any
-                # autogenerated files to the redo target dictionary:
-                for input_filename in _filter_by_regex(do_cregex, files):
-                    for rule in rules:
-                        if not basename.startswith("default."):
-                            input_filename = input_filename[:-3]
-                            # Grab the output filename from the rule:
-                            try:
-                                output_filename = rule.output_filename(input_filename)
-                            except Exception as e:
-                                _output_filename_error(e, rule, input_filename)
-
-                            if output_filename:
-                                output_filename = _format_output_filename(
-                                    output_filename, rule
-                                )
-                                redo_target_dict.add_target(directory, output_filename)
+    # Write the source and generator databases in one pass each:
+    with source_database(mode=DATABASE_MODE.CREATE) as source_db:
+        source_db.store_many(source_records)
+    with c_source_database(mode=DATABASE_MODE.CREATE) as c_source_db:
+        c_source_db.store_many(c_source_records)
+    with py_source_database(mode=DATABASE_MODE.CREATE) as py_source_db:
+        py_source_db.store_many(py_source_records)
+    with generator_database(mode=DATABASE_MODE.CREATE) as generator_db:
+        generator_db.store_many(generator_records)
 
     ###########################################
     # Discover targets in doc/ subdirectories:
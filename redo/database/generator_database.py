@@ -3,6 +3,39 @@ from database.database import DATABASE_MODE
 from database import util
 
 
+def generator_record(
+    input_filename,
+    generator_module_name,
+    generator_module_file_name,
+    generator_class_name,
+):
+    """Return the generator database record for a generator and input file."""
+    return (
+        generator_module_name,
+        generator_module_file_name,
+        generator_class_name,
+        input_filename,
+    )
+
+
+def duplicate_generator_message(output_filename, existing_record, new_record):
+    """
+    Return the error message used when a second generator record is
+    registered for an output file.
+    """
+    return (
+        "Only ONE input file and generator can be registered to generate the outputfile: "
+        + output_filename
+        + "\n"
+        + "    "
+        + str(existing_record)
+        + " is already registered.\n"
+        + "    "
+        + str(new_record)
+        + " cannot be registered.\n"
+    )
+
+
 class generator_database(database):
     """
     This database is responsible for storing information for all the
@@ -44,27 +77,15 @@ class generator_database(database):
         detected, an error message will be thrown so that the user can
         resolve the problem.
         """
-        to_store = (
+        to_store = generator_record(
+            input_filename,
             generator_module_name,
             generator_module_file_name,
             generator_class_name,
-            input_filename,
         )
-
-        def error_message():
-            return (
-                "Only ONE input file and generator can be registered to generate the outputfile: "
-                + output_filename
-                + "\n"
-                + "    "
-                + str(self.fetch(output_filename))
-                + " is already registered.\n"
-                + "    "
-                + str(to_store)
-                + " cannot be registered.\n"
-            )
-
-        assert not self.does_key_exist(output_filename), error_message()
+        assert not self.does_key_exist(output_filename), duplicate_generator_message(
+            output_filename, self.fetch(output_filename), to_store
+        )
         self.store(output_filename, to_store)
 
     def get_generator(self, output_filename):
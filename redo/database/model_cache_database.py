@@ -1,9 +1,11 @@
 from database.database import database
 from database.database import DATABASE_MODE
-from time import time as curr_time
 from os import environ, sep
 from util import model_loader
+from util import redo_arg
 from database.util import get_database_file
+import hashlib
+import os
 
 # The purpose of the model cache is to save off YAML file model load
 # data structures after they have been read from a file, validated, and
@@ -11,20 +13,117 @@ from database.util import get_database_file
 # process, and many models are used more than once during a redo build.
 # So saving off these loaded objects into a database for quick load later
 # saves us a lot of time during autocoding.
+#
+# A cached model is only valid if everything it was loaded from is
+# unchanged. Alongside each model, the cache stores the model's dependency
+# edges: the content hash of the model's YAML file, its schema, and every
+# file returned by get_dependencies() (which includes the project
+# configuration when the YAML uses Jinja directives), each recorded at the
+# time the model was cached. A signature of the python model source code is
+# stored too, along with the context the model was loaded in: the path and
+# content hash of the active project configuration, which Jinja directives
+# in a model file are rendered with, and the build target and build path
+# settings, which determine what model names resolve to. A cached model is
+# valid when it was loaded in the current context, all its edges still hash
+# to the recorded values, and every dependency that is itself a cached model
+# is valid, which is determined in a single walk of the dependency graph.
+
+
+# Memo of file content hashes for this process, mapping a filename to
+# (mtime_ns, size, hash), so that each file is only read once unless it
+# changes on disk:
+_file_hashes = {}
+
+# Signature of the python model source code, computed once per process:
+_code_signature = None
+
+
+def get_file_hash(filename):
+    """
+    Return a hash of the contents of a file, or None if the file
+    cannot be read.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    memo = _file_hashes.get(filename)
+    if memo and memo[0] == stat.st_mtime_ns and memo[1] == stat.st_size:
+        return memo[2]
+    try:
+        with open(filename, "rb") as f:
+            file_hash = hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+    _file_hashes[filename] = (stat.st_mtime_ns, stat.st_size, file_hash)
+    return file_hash
+
+
+def get_code_signature():
+    """
+    Return a hash of the python source of every module in the "models"
+    package (across all of the directories it spans in the python path).
+    A model cached by different model code is never considered valid.
+    """
+    global _code_signature
+    if _code_signature is None:
+        import models
+
+        signature = hashlib.sha1()
+        for directory in sorted(models.__path__):
+            for root, dirnames, filenames in os.walk(directory):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith(".py"):
+                        full_filename = os.path.join(root, filename)
+                        signature.update(
+                            (full_filename + ":" + str(get_file_hash(full_filename)) + "\n").encode()
+                        )
+        _code_signature = signature.hexdigest()
+    return _code_signature
+
+
+def get_context():
+    """
+    Return the context that models are currently loaded in. A cached model
+    is only valid in the same context that it was loaded in.
+    """
+    from util import target
+
+    config_file = model_loader.get_project_configuration_filename()
+    return (
+        config_file,
+        get_file_hash(config_file),
+        target.get_default_target(),
+        tuple(
+            environ.get(var, "")
+            for var in [
+                "COMPUTED_BUILD_ROOTS",
+                "BUILD_PATH",
+                "EXTRA_BUILD_PATH",
+                "REMOVE_BUILD_PATH",
+            ]
+        ),
+    )
 
 
 def get_model_cache_filename():
-    # Decide whether or not to use a persistent or non-persistent model cache.
-    # A persistent model cache that lasts over calls to redo is faster, but
-    # is not stable and potentially buggy. persistent model cache is disabled
-    # by default.
-    if "ENABLE_PERSISTENT_MODEL_CACHE" in environ:
+    # The model cache is persistent over calls to redo by default, since
+    # cached models are validated against the content of everything they
+    # were loaded from. Set DISABLE_PERSISTENT_MODEL_CACHE to recreate the
+    # model cache for each call to redo instead.
+    if "DISABLE_PERSISTENT_MODEL_CACHE" in environ:
+        # Model cache is recreated for each call to redo:
+        return get_database_file("model_cache")
+    else:
         # Model cache is persistent over calls to redo (faster):
         cache_file = environ["ADAMANT_TMP_DIR"] + sep + "model_cache.db"
         return cache_file
-    else:
-        # Model cache is recreated for each call to redo (safer):
-        return get_database_file("model_cache")
+
+
+def _get_submodel_paths(model_file):
+    _, _, model_name, _, _ = redo_arg.split_model_filename(model_file)
+    return model_loader._get_model_file_paths(model_name)
 
 
 class model_cache_database(database):
@@ -34,35 +133,78 @@ class model_cache_database(database):
 
     def store_model(self, model_file, model_object):
         """
-        Store cached version of model object along with timestamp of save and session ID
-        for save.
+        Store cached version of model object along with the dependency edges
+        used to determine whether the cached model is still valid.
         """
-        self.store(model_file, model_object)
-        self.store(model_file + "_time@st@@", curr_time())
-        self.store(model_file + "_sess@id@@", environ["ADAMANT_SESSION_ID"])
+        edge_files = [model_file]
+        if getattr(model_object, "full_schema", None):
+            edge_files.append(model_object.full_schema)
+        edge_files.extend(model_object.get_dependencies())
+        record = {
+            "code": get_code_signature(),
+            "context": get_context(),
+            "edges": {filename: get_file_hash(filename) for filename in edge_files},
+            "submodels": None,
+        }
         if model_object.submodels is not None:
-            submodel_paths = model_loader._get_model_file_paths(model_object.model_name)
-            self.store(model_file + "_submod@paths@@", submodel_paths)
+            record["submodels"] = _get_submodel_paths(model_file)
+        self.store_many({model_file: model_object, model_file + "_edges@@": record})
+
+    def get_model(self, model_file):
+        """Getter for cached model."""
+        return self.try_fetch(model_file)
 
-    def mark_cached_model_up_to_date_for_session(self, model_file):
+    def get_model_edges(self, model_file):
+        """Getter for the dependency edges record of a cached model."""
+        return self.try_fetch(model_file + "_edges@@")
+
+    def is_model_valid(self, model_file, visited=None):
         """
-        Update the session ID for a model. We use this to indicate that a model has been
-        fully validated (ie. not outdated) for this redo session.
+        Return True if the cached model for a file exists and is up to date
+        with the files it was loaded from, recursively. visited maps the
+        model files already checked during this walk to their result.
         """
-        self.store(model_file + "_sess@id@@", environ["ADAMANT_SESSION_ID"])
+        if visited is None:
+            visited = {}
+        if model_file in visited:
+            return visited[model_file]
+        # A model that is already being visited further up the walk is assumed
+        # valid here. Its own edges are still checked where it is being visited,
+        # so a dependency cycle cannot hide a change.
+        visited[model_file] = True
+        visited[model_file] = self._check_model_edges(model_file, visited)
+        return visited[model_file]
 
-    def get_model(self, model_file):
-        """Getters for cached model, session id of save, and time of save"""
-        return self.try_fetch(model_file)
+    def _check_model_edges(self, model_file, visited):
+        record = self.get_model_edges(model_file)
+        if record is None or record["code"] != get_code_signature():
+            return False
 
-    def get_model_session_id(self, model_file):
-        return self.try_fetch(model_file + "_sess@id@@")
+        # A model loaded with a different project configuration, target or build
+        # path may have rendered different Jinja values or resolved model names
+        # to different files:
+        if record.get("context") != get_context():
+            return False
 
-    def get_model_time_stamp(self, model_file):
-        return self.try_fetch(model_file + "_time@st@@")
+        # If this model has submodels, we need to make sure a new submodel
+        # has not been created. For example, if a name.events.yaml for name.component.yaml
+        # gets created on disk, this means the cached entry for name.component.yaml is
+        # invalid.
+        if record["submodels"] is not None and record["submodels"] != _get_submodel_paths(
+            model_file
+        ):
+            return False
 
-    def get_model_submodels(self, model_file):
-        return self.try_fetch(model_file + "_submod@paths@@")
+        # Every file this model was loaded from must be unchanged, and any
+        # dependency that is itself a cached model must also be valid, since
+        # this model may contain data that was loaded from it:
+        for filename, file_hash in record["edges"].items():
+            if file_hash is None or get_file_hash(filename) != file_hash:
+                return False
+            if filename != model_file and self.does_key_exist(filename + "_edges@@"):
+                if not self.is_model_valid(filename, visited):
+                    return False
+        return True
 
 
 def touch_model_cache_database():
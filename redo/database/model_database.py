@@ -56,6 +56,63 @@ def split_model_file_name(model_filename):
     return model_name, model_type, specific_name
 
 
+def add_model_to_record(record, model_filename):
+    """
+    Add a model file to a model database record, creating the record
+    if it is None, and return the updated record. The record is stored
+    under the model name returned by split_model_file_name.
+    """
+    model_name, model_type, specific_name = split_model_file_name(model_filename)
+
+    # If record does not exist, create a blank one:
+    if not record:
+        record = {}
+
+    # Add new information to the record:
+    try:
+        record[model_type].append(model_filename)
+    except KeyError:
+        record[model_type] = [model_filename]
+    return record
+
+
+# Unit test models (*.tests.yaml) are usually not in the build path, since
+# each unit test directory has its own environment. Instead, the unit test
+# models found while searching the build roots for the build path are
+# stored in the model database under their own keys, which start with a "."
+# so that they can never collide with a model name. Each unit test key maps
+# the name of the model under test to the list of its unit test model
+# files, and the roots key maps to the list of build roots searched.
+_unit_tests_key_prefix = ".unit_tests."
+unit_test_roots_key = ".unit_test_roots"
+
+
+def get_unit_tests_key(model_name):
+    """Return the model database key for the unit tests of a model name."""
+    return _unit_tests_key_prefix + model_name.lower()
+
+
+# The number of times the model database has been written to by this process:
+_num_writes = 0
+
+
+def get_generation():
+    """
+    Return the generation of the model database, a value that changes
+    whenever the database is recreated or written to, or None if the
+    database does not exist. The database is only written to during
+    setup, so its generation is the identity of its file (its path,
+    inode, modification time and size) along with the number of times
+    this process has written to it.
+    """
+    filename = util.get_database_file("models")
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (filename, stat.st_ino, stat.st_mtime_ns, stat.st_size, _num_writes)
+
+
 class model_database(database):
     """
     This database is responsible for storing model files found in
@@ -72,29 +129,22 @@ class model_database(database):
     """
     def __init__(self, mode=DATABASE_MODE.READ_ONLY):
         """Initialize the database."""
+        self.writable = mode != DATABASE_MODE.READ_ONLY
         super(model_database, self).__init__(util.get_database_file("models"), mode)
 
+    def close(self):
+        """Close the database, starting a new generation if it was writable."""
+        global _num_writes
+        super(model_database, self).close()
+        if self.writable:
+            _num_writes += 1
+
     def insert_model(self, model_filename):
         """Insert a new model into the database."""
-        def _add_to_list_entry(dic, key, value):
-            try:
-                dic[key].append(value)
-            except Exception:
-                dic[key] = [value]
-
-        # Fetch the record for this model:
-        model_name, model_type, specific_name = split_model_file_name(model_filename)
-        record = self.try_fetch(model_name)
-
-        # If record does not exist, create a blank one:
-        if not record:
-            record = {}
-
-        # Add new information to the record:
-        _add_to_list_entry(record, model_type, model_filename)
-
-        # Store the updated record:
-        self.store(model_name, record)
+        model_name, _, _ = split_model_file_name(model_filename)
+        self.store(
+            model_name, add_model_to_record(self.try_fetch(model_name), model_filename)
+        )
 
     def get_model_paths(self, model_name, model_type):
         """Given a model name and type return the full path."""
@@ -111,10 +161,22 @@ class model_database(database):
             return record
         return {}
 
+    def get_unit_test_paths(self, model_name):
+        """
+        Given a model name, return the unit test model files found for it
+        while searching the build roots, and the build roots that were searched.
+        """
+        roots = self.try_fetch(unit_test_roots_key)
+        unit_test_paths = self.try_fetch(get_unit_tests_key(model_name))
+        return roots or [], unit_test_paths or []
+
     def get_all_models(self):
         """Return a flat list of all (unique) yaml files stored in the database."""
         models = []
         for key in self.keys():
+            # Skip the unit test keys:
+            if key.startswith("."):
+                continue
             record = self.fetch(key)
             for record_key, model_list in record.items():
                 models.extend(model_list)
@@ -7,11 +7,30 @@ rebuilding. The cache is keyed by project root path.
 
 Can also be invoked directly to build the full target DB:
     python3 -m database.persistent_target_cache
+
+When invoked directly, the time taken to set up the build system
+databases is reported on stderr, which is useful for measuring the
+performance of database creation.
+
+The same cache directory also holds the state that lets a new redo
+session skip most of the database setup work:
+
+  * A directory index, which maps each directory found while searching
+    the build roots to its modification time and listing. A new session
+    only lists the directories whose modification time has changed.
+  * A snapshot of the build path databases created by the last session,
+    keyed by a hash of everything those databases are derived from. If
+    the build path, target and build system code are unchanged, the
+    snapshot is copied into the new session instead of being recreated.
+
+Set ADAMANT_DISABLE_DATABASE_SNAPSHOT to always recreate the databases.
 """
 import hashlib
 import os
 import os.path
 import shutil
+import sys
+import time
 
 from database.database import database, DATABASE_MODE
 
@@ -75,6 +94,186 @@ def get_persistent_db_path():
     return os.path.join(cache_dir, "redo_target.db")
 
 
+def get_directory_index_path():
+    """
+    Return the path to the persistent directory index used when searching
+    the build roots for the build path.
+    """
+    return os.path.join(get_cache_dir(), "directory_index.db")
+
+
+def get_ada_source_index_path():
+    """
+    Return the path to the persistent index of Ada source file scans, see
+    util/ada.py.
+    """
+    return os.path.join(get_cache_dir(), "ada_source_index.db")
+
+
+def load_directory_index(search_root):
+    """
+    Return the directory index saved for a build root, or an empty index
+    if none exists or the cache is unavailable.
+    """
+    try:
+        index_path = get_directory_index_path()
+        if os.path.isfile(index_path):
+            with database(index_path, DATABASE_MODE.READ_ONLY) as db:
+                index = db.try_fetch(search_root)
+                if index:
+                    return index
+    except Exception:
+        pass
+    return {}
+
+
+def save_directory_index(search_root, index):
+    """
+    Save the directory index for a build root. Failures are ignored, since
+    the index only exists to speed up the next search.
+    """
+    try:
+        index_path = get_directory_index_path()
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        mode = DATABASE_MODE.READ_WRITE if os.path.isfile(index_path) else DATABASE_MODE.CREATE
+        with database(index_path, mode) as db:
+            db.store(search_root, index)
+    except Exception:
+        pass
+
+
+# The session databases that are derived entirely from the build path, and
+# so can be reused by any session with the same build path:
+_SNAPSHOT_DATABASES = [
+    "source",
+    "c_source",
+    "py_source",
+    "generator",
+    "models",
+    "utility",
+    "redo_target",
+]
+
+
+def get_database_snapshot_key(build_path, build_target):
+    """
+    Return a key identifying the inputs that the build path databases are
+    created from: the build path and the files in it, the build target, the
+    listings of the doc/ directories that are scanned for targets, the build
+    roots searched and the unit test models found in them, and the
+    modification times of the build system code (generators, rules, targets
+    and everything they import) that has been loaded. None is returned if
+    snapshots are disabled or the cache is unavailable.
+    """
+    if os.environ.get("ADAMANT_DISABLE_DATABASE_SNAPSHOT"):
+        return None
+    try:
+        _get_project_key()
+    except EnvironmentError:
+        return None
+
+    key = hashlib.md5()
+    key.update(build_target.encode())
+    for directory, files in build_path.items():
+        key.update(("\0" + directory + "\0" + "\0".join(files)).encode())
+        doc_dir = os.path.join(directory, "doc")
+        if doc_dir not in build_path and os.path.isdir(doc_dir):
+            key.update(("\0doc\0" + "\0".join(sorted(os.listdir(doc_dir)))).encode())
+    key.update(("\0roots\0" + "\0".join(build_path.search_roots)).encode())
+    key.update(("\0tests\0" + "\0".join(build_path.unit_test_models)).encode())
+    code_files = []
+    for module in list(sys.modules.values()):
+        filename = getattr(module, "__file__", None)
+        if filename and filename.endswith(".py"):
+            code_files.append(filename)
+    for filename in sorted(set(code_files)):
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            mtime = 0
+        key.update(("\0" + filename + ":" + str(mtime)).encode())
+    return key.hexdigest()
+
+
+def _get_snapshot_dir(snapshot_key):
+    return os.path.join(get_cache_dir(), "db_snapshot", snapshot_key)
+
+
+def restore_database_snapshot(snapshot_key, db_dir):
+    """
+    Copy the database snapshot saved under a key into a session database
+    directory. Returns True if the snapshot existed and was restored.
+    """
+    try:
+        snapshot_dir = _get_snapshot_dir(snapshot_key)
+        if not os.path.isdir(snapshot_dir):
+            return False
+        for name in _SNAPSHOT_DATABASES:
+            shutil.copy2(
+                os.path.join(snapshot_dir, name + ".db"),
+                os.path.join(db_dir, name + ".db"),
+            )
+        return True
+    except Exception:
+        return False
+
+
+def save_database_snapshot(snapshot_key, db_dir):
+    """
+    Save the build path databases in a session database directory as the
+    snapshot for a key. Snapshots for other keys are removed, since they
+    describe an older state of the project.
+    """
+    try:
+        snapshot_root = os.path.dirname(_get_snapshot_dir(snapshot_key))
+        os.makedirs(snapshot_root, exist_ok=True)
+        # Copy into a temporary directory and rename it into place, so that
+        # a concurrent session never sees a partial snapshot:
+        tmp_dir = os.path.join(
+            snapshot_root, ".tmp-{pid}".format(pid=os.getpid())
+        )
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name in _SNAPSHOT_DATABASES:
+            shutil.copy2(
+                os.path.join(db_dir, name + ".db"), os.path.join(tmp_dir, name + ".db")
+            )
+        try:
+            os.rename(tmp_dir, _get_snapshot_dir(snapshot_key))
+        except OSError:
+            # Another session saved this snapshot first.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        for other_key in os.listdir(snapshot_root):
+            if other_key != snapshot_key and not other_key.startswith("."):
+                shutil.rmtree(os.path.join(snapshot_root, other_key), ignore_errors=True)
+    except Exception:
+        pass
+
+
+def clear_database_snapshots():
+    """
+    Remove the directory index, the Ada source index and all database
+    snapshots, so that the next session searches the build roots, scans
+    Ada sources and creates the databases from scratch. Returns the list
+    of paths removed.
+    """
+    removed = []
+    try:
+        index_paths = [get_directory_index_path(), get_ada_source_index_path()]
+        snapshot_root = os.path.dirname(_get_snapshot_dir("none"))
+    except EnvironmentError:
+        return removed
+    for index_path in index_paths:
+        if os.path.isfile(index_path):
+            with database(index_path, DATABASE_MODE.READ_WRITE) as db:
+                db.destroy()
+            removed.append(index_path)
+    if os.path.isdir(snapshot_root):
+        shutil.rmtree(snapshot_root, ignore_errors=True)
+        removed.append(snapshot_root)
+    return removed
+
+
 def update_persistent_db_targets(directory, targets):
     """
     Write a directory's targets directly into the persistent DB.
@@ -217,7 +416,9 @@ def build_full_target_cache():
     redo_2 = os.path.join(project_root, "_cache_warmup.tmp")
     redo_3 = os.path.join(project_root, "_cache_warmup.base")
 
+    start_time = time.time()
     did_setup = database.setup.setup(redo_1, redo_2, redo_3)
+    setup_time = time.time() - start_time
     if did_setup:
         # The setup populated the session target DB, save it
         from database._setup import _get_session_dir
@@ -229,8 +430,10 @@ def build_full_target_cache():
         generate_text_caches()
         # Clean up
         database.setup.cleanup(redo_1, redo_2, redo_3)
+    return setup_time
 
 
 # If called directly, this module will build the target cache from scratch.
 if __name__ == "__main__":
-    build_full_target_cache()
+    setup_time = build_full_target_cache()
+    sys.stderr.write("Database setup took {:.3f} seconds.\n".format(setup_time))
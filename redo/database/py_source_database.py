@@ -5,6 +5,59 @@ from util import error
 import os.path
 
 
+def source_key(source_filename):
+    """Return the database key (the python module name) of a source file."""
+    return os.path.splitext(os.path.basename(source_filename))[0]
+
+
+def add_source_to_record(record, source_filename, model_filename=None):
+    """
+    Add a source file (and the associated model file, if there is one) to
+    a python source database record, creating the record if it is None, and
+    return the updated record. This errors if a record for the module
+    already exists, see py_source_database.insert_source.
+    """
+    # Error functions:
+    def _duplicate_source_error(file1, file2):
+        error.error_abort(
+            ("All python source in the build path must have unique module and file names. "
+             "The following two source files conflict: [")
+            + file1
+            + ", "
+            + file2
+            + "]"
+        )
+
+    def _duplicate_model_error(file1, file2):
+        error.error_abort(
+            ("All models in the build path must produce unique module and file names. "
+             "The following two model files conflict: [")
+            + file1
+            + ", "
+            + file2
+            + "] because they both produce a file called '"
+            + os.path.basename(source_filename)
+            + "'"
+        )
+
+    # If the record already exists, we need to be very careful about adding another source
+    # file. It must be the complement to the source file that already exists. For example,
+    # if hello.adb exists, we can add hello.ads, but nothing else. If we find another piece of
+    # source, then we potentially have two different modules named the same thing, and we
+    # should warn the user.
+    if record:
+        # Make sure that the models don't conflict:
+        existing_model = record[1]
+        if existing_model and model_filename and existing_model != model_filename:
+            _duplicate_model_error(existing_model, model_filename)
+
+        # We have a specific conflict:
+        _duplicate_source_error(source_filename, record[0])
+    else:
+        record = [source_filename, model_filename]
+    return record
+
+
 class py_source_database(database):
     """
     This database is responsible for storing python source files found in
@@ -35,51 +88,10 @@ class py_source_database(database):
         that every source in the build path must have a unique filename, and thus a
         unique model name.
         """
-        # Error functions:
-        def _duplicate_source_error(file1, file2):
-            error.error_abort(
-                ("All python source in the build path must have unique module and file names. "
-                 "The following two source files conflict: [")
-                + file1
-                + ", "
-                + file2
-                + "]"
-            )
-
-        def _duplicate_model_error(file1, file2):
-            error.error_abort(
-                ("All models in the build path must produce unique module and file names. "
-                 "The following two model files conflict: [")
-                + file1
-                + ", "
-                + file2
-                + "] because they both produce a file called '"
-                + os.path.basename(source_filename)
-                + "'"
-            )
-
-        # Get the module name from the filename and try to
-        # fetch a record if it exists.
-        module_name = os.path.splitext(os.path.basename(source_filename))[0]
-        record = self.try_fetch(module_name)
-
-        # If the record already exists, we need to be very careful about adding another source
-        # file. It must be the complement to the source file that already exists. For example,
-        # if hello.adb exists, we can add hello.ads, but nothing else. If we find another piece of
-        # source, then we potentially have two different modules named the same thing, and we
-        # should warn the user.
-        if record:
-            # Make sure that the models don't conflict:
-            existing_model = record[1]
-            if existing_model and model_filename and existing_model != model_filename:
-                _duplicate_model_error(existing_model, model_filename)
-
-            # We have a specific conflict:
-            _duplicate_source_error(source_filename, record[0])
-        else:
-            record = [source_filename, model_filename]
-
-        # Insert record into database:
+        module_name = source_key(source_filename)
+        record = add_source_to_record(
+            self.try_fetch(module_name), source_filename, model_filename
+        )
         self.store(module_name, record)
 
     def get_source(self, module_name):
@@ -8,6 +8,74 @@ from util import error
 import os.path
 
 
+def source_key(source_filename):
+    """Return the database key (the lower case Ada package name) of a source file."""
+    return ada.file_name_to_package_name(source_filename).lower()
+
+
+def add_source_to_record(record, source_filename, model_filename=None):
+    """
+    Add a source file (and the associated model file, if there is one) to
+    a source database record, creating the record if it is None, and return
+    the updated record. This errors if the source file conflicts with the
+    sources already in the record, see source_database.insert_source.
+    """
+    # Error functions:
+    def _duplicate_source_error(file1, file2):
+        error.error_abort(
+            ("All Ada source in the build path must have unique package and file names. "
+             "The following two source files conflict: [")
+            + file1
+            + ", "
+            + file2
+            + "]"
+        )
+
+    def _duplicate_model_error(file1, file2):
+        error.error_abort(
+            ("All models in the build path must produce unique package and file names. "
+             "The following two model files conflict: [")
+            + file1
+            + ", "
+            + file2
+            + "] because they both produce a file called '"
+            + os.path.basename(source_filename)
+            + "'"
+        )
+
+    # If the record already exists, we need to be very careful about adding another source
+    # file. It must be the complement to the source file that already exists. For example,
+    # if hello.adb exists, we can add hello.ads, but nothing else. If we find another piece of
+    # source, then we potentially have two different packages named the same thing, and we
+    # should warn the user.
+    if record:
+        # Make sure that the models don't conflict:
+        existing_model = record[1]
+        if existing_model and model_filename and existing_model != model_filename:
+            _duplicate_model_error(existing_model, model_filename)
+
+        # Check the source to make sure we are able to insert it.
+        basename = os.path.basename(source_filename)
+        existing_source = record[0]
+        for source in existing_source:
+            if source.endswith(basename):
+                # We have a specific conflict:
+                _duplicate_source_error(source_filename, source)
+
+        # If this happens, we have some other weird conflict that we
+        # definitely want to catch
+        if len(existing_source) >= 2:
+            _duplicate_source_error(source_filename, str(existing_source))
+    else:
+        record = [[], None]
+
+    # OK, everything is good, let's go ahead and insert the source and model:
+    record[0].append(source_filename)
+    if model_filename:
+        record[1] = model_filename
+    return record
+
+
 class source_database(database):
     """
     This database is responsible for storing ada source files found in
@@ -37,66 +105,10 @@ class source_database(database):
         that every source in the build path must have a unique filename, and thus a
         unique package name.
         """
-        # Error functions:
-        def _duplicate_source_error(file1, file2):
-            error.error_abort(
-                ("All Ada source in the build path must have unique package and file names. "
-                 "The following two source files conflict: [")
-                + file1
-                + ", "
-                + file2
-                + "]"
-            )
-
-        def _duplicate_model_error(file1, file2):
-            error.error_abort(
-                ("All models in the build path must produce unique package and file names. "
-                 "The following two model files conflict: [")
-                + file1
-                + ", "
-                + file2
-                + "] because they both produce a file called '"
-                + os.path.basename(source_filename)
-                + "'"
-            )
-
-        # Get the Ada package name from the filename and try to
-        # fetch a record if it exists.
-        package_name = ada.file_name_to_package_name(source_filename).lower()
-        record = self.try_fetch(package_name)
-
-        # If the record already exists, we need to be very careful about adding another source
-        # file. It must be the complement to the source file that already exists. For example,
-        # if hello.adb exists, we can add hello.ads, but nothing else. If we find another piece of
-        # source, then we potentially have two different packages named the same thing, and we
-        # should warn the user.
-        if record:
-            # Make sure that the models don't conflict:
-            existing_model = record[1]
-            if existing_model and model_filename and existing_model != model_filename:
-                _duplicate_model_error(existing_model, model_filename)
-
-            # Check the source to make sure we are able to insert it.
-            basename = os.path.basename(source_filename)
-            existing_source = record[0]
-            for source in existing_source:
-                if source.endswith(basename):
-                    # We have a specific conflict:
-                    _duplicate_source_error(source_filename, source)
-
-            # If this happens, we have some other weird conflict that we
-            # definitely want to catch
-            if len(existing_source) >= 2:
-                _duplicate_source_error(source_filename, str(existing_source))
-        else:
-            record = [[], None]
-
-        # OK, everything is good, let's go ahead and insert the source and model:
-        record[0].append(source_filename)
-        if model_filename:
-            record[1] = model_filename
-
-        # Insert record into database:
+        package_name = source_key(source_filename)
+        record = add_source_to_record(
+            self.try_fetch(package_name), source_filename, model_filename
+        )
         self.store(package_name, record)
 
     def get_source(self, package_name):
@@ -1,11 +1,10 @@
 import os
 import os.path
 import sys
-from util import redo
 from util import error
 from util import filesystem
+from util.job_scheduler import run_all, redo_job, save_logs
 from base_classes.build_rule_base import build_rule_base
-from shutil import copytree
 
 # Definitions for producing colored text on the terminal
 NO_COLOR = "\033[0m"
@@ -32,10 +31,11 @@ class build_analyze_all(build_rule_base):
     """
     This build rule looks for unit tests in the directory
     it is passed and recursively below. It then runs static
-    analysis (redo analyze) on all the tests in sequence and
-    prints an analysis report to the terminal as the analysis
-    is run. Tests are matched by finding either a "test.adb"
-    file or a "test.do" file in a directory.
+    analysis (redo analyze) on all the tests in parallel (see
+    job_scheduler.py) and prints an analysis report to the
+    terminal as the analysis of each test finishes. Tests are
+    matched by finding either a "test.adb" file or a "test.do"
+    file in a directory.
 
     Environment Variables:
         REDO_ANALYZE_MODE: If set, passes --mode=<VALUE> to gnatsas commands.
@@ -56,8 +56,6 @@ class build_analyze_all(build_rule_base):
         # for analyze_all
 
     def build(self, redo_1, redo_2, redo_3):
-        import database.setup
-
         # Figure out build directory location
         directory = os.path.abspath(os.path.dirname(redo_1))
 
@@ -109,53 +107,32 @@ class build_analyze_all(build_rule_base):
         if fail_level not in ["HIGH", "MEDIUM", "LOW", "ERROR"]:
             fail_level = "HIGH"  # Default to HIGH if invalid value
 
-        # Track results for exit code determination
-        results = []
-
-        # Run static analysis:
-        exit_code = 0
-        self._write_to_both("\nAnalyzing...\n")
-        for number, test in enumerate(tests):
-            rel_test = os.path.relpath(test, directory)
-            self._write_to_both(
-                "{0:80}   ".format(
-                    (("%02d" % (number + 1)) + "/" + num_tests + " " + rel_test)[:80]
-                )
-            )
-            database.setup.reset()
+        def run_analyze(test, env):
             try:
-                analysis_log = os.path.join(log_dir, rel_test.replace(os.sep, "_") + ".log")
-                redo.redo([os.path.join(test, "analyze"), "1>&2", "2>" + analysis_log])
+                redo_job(test, directory, "analyze", log_dir, env)
 
                 # Parse the analysis report to determine severity
                 report_path = os.path.join(test, "build", "analyze", "report.txt")
                 severity = self._parse_analysis_report(report_path)
-                results.append(severity)
-
-                if severity == "HIGH":
-                    self._write_to_both(" " + HIGH + "\n")
-                elif severity == "MEDIUM":
-                    self._write_to_both(" " + MEDIUM + "\n")
-                elif severity == "LOW":
-                    self._write_to_both(" " + LOW + "\n")
-                elif severity == "NONE":
-                    self._write_to_both(" " + NONE + "\n")
-                else:
-                    self._write_to_both(" " + ERROR + "\n")
-
             except BaseException:
-                results.append("ERROR")
-                self._write_to_both(" " + ERROR + "\n")
+                severity = "ERROR"
 
-            # After analysis, save off the analysis logs for inspection. This is
-            # especially useful on a remote CI server.
-            try:
-                copytree(
-                    os.path.join(test, "build" + os.sep + "analyze"),
-                    os.path.join(log_dir, rel_test.replace(os.sep, "_"))
-                )
-            except BaseException:
-                pass
+            # After analysis, save off the analysis logs for inspection:
+            save_logs(
+                os.path.join(test, "build" + os.sep + "analyze"),
+                os.path.join(log_dir, os.path.relpath(test, directory).replace(os.sep, "_"))
+            )
+            return severity
+
+        severity_strings = {"HIGH": HIGH, "MEDIUM": MEDIUM, "LOW": LOW, "NONE": NONE}
+
+        # Run static analysis, reporting each as it finishes:
+        self._write_to_both("\nAnalyzing...\n")
+        results = run_all(
+            redo_1, redo_2, redo_3, directory, tests, run_analyze,
+            lambda severity: severity_strings.get(severity, ERROR), self.summary_file,
+            os.path.join(build_dir, "analyze_all_durations.yaml")
+        )
 
         # Determine exit code based on results and fail level
         exit_code = self._determine_exit_code(results, fail_level)
@@ -2,12 +2,17 @@ import os.path
 from os import environ
 from base_classes.build_rule_base import build_rule_base
 from database.model_cache_database import model_cache_database
+from database.persistent_target_cache import clear_database_snapshots
+from util.jinja import clear_template_cache
 
 
 class build_clear_cache(build_rule_base):
     """
     This build rule remove the model cache from the filesystem
     so it will need to be recreated from scratch for the next build.
+    The persistent directory index and database snapshots are removed
+    too, so the build system databases are also recreated, as is the
+    compiled Jinja template cache.
     This can be useful if an output is not generating correctly, and
     a dependency is missing to the yaml file being modified.
     """
@@ -29,6 +34,11 @@ class build_clear_cache(build_rule_base):
             db.destroy()
             import sys
             sys.stderr.write("Removed " + fname + "\n")
+        for fname in clear_database_snapshots():
+            sys.stderr.write("Removed " + fname + "\n")
+        fname = clear_template_cache()
+        if fname:
+            sys.stderr.write("Removed " + fname + "\n")
 
     # No need to provide these for "redo clear_cache"
     # def input_file_regex(self): pass
@@ -36,6 +36,72 @@ def _get_build_target_instance(target_name):
         return instance, filename
 
 
+def _is_fast_compile():
+    """
+    Returns True if only spec files (.ads) of withed packages, plus the bodies
+    that are required by should_depend_on_adb, should be depended on. See the
+    description in _build_all_ada_dependencies below.
+    """
+    return not environ.get("SAFE_COMPILE")
+
+
+def _get_matching_adb_sources(ads_source, adb_sources):
+    """
+    Find the adb sources matching an ads source in a list of adb sources. They
+    could be in a different directory than the ads file, so match on the
+    file name.
+    """
+    adb_basename = os.path.basename(ads_source)[:-1] + "b"
+    return [adb_source for adb_source in adb_sources if os.path.basename(adb_source) == adb_basename]
+
+
+def _get_binded_c_sources(ads_sources):
+    """
+    Return the C/C++ sources bound by any generated Ada binding specs in the
+    list of ads sources. See _build_all_ada_dependencies below.
+    """
+    c_sources = []
+    for source in ads_sources:
+        if source.endswith("_h.ads"):
+            with c_source_database() as db:
+                binded_sources = db.try_get_sources([os.path.basename(source[:-6])])
+                if binded_sources:
+                    c_sources.extend(binded_sources)
+        if source.endswith("_hpp.ads"):
+            with c_source_database() as db:
+                binded_sources = db.try_get_sources([os.path.basename(source[:-8])])
+                if binded_sources:
+                    c_sources.extend(binded_sources)
+    return c_sources
+
+
+def _get_immediate_ada_dependencies(source_files, source_db):
+    """
+    Return the ads and adb sources of all of the packages withed by a list of
+    source files.
+    """
+    # Get dependencies for these source files. Scan them all up front, so
+    # that any that have not been scanned before are read together:
+    ada.scan_sources(
+        [source_file for source_file in source_files if source_file.endswith((".ads", ".adb"))]
+    )
+    dependency_packages = []
+    for source_file in source_files:
+        if source_file.endswith(".ads") or source_file.endswith(".adb"):
+            dependency_packages.extend(ada.get_source_dependencies(source_file))
+    dependency_packages = filter(bool, dependency_packages)
+    dependency_packages = list(dict.fromkeys(dependency_packages))
+
+    # Get all the source files that correspond to these packages:
+    sources = source_db.try_get_sources(dependency_packages)
+
+    # Split up adb and ads sources:
+    ads_sources = [source for source in sources if source.endswith(".ads")]
+    adb_sources = [source for source in sources if source.endswith(".adb")]
+
+    return ads_sources, adb_sources
+
+
 def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
     """
     Given a list of source files, redo-ifchange on all dependency
@@ -75,36 +141,19 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
     # cases the build system automatically switches fast compilation off to support
     # these functions.
     #
-    fast_compile = True
-    if environ.get("SAFE_COMPILE"):
-        fast_compile = False
+    fast_compile = _is_fast_compile()
 
-    def _get_immediate_dependencies(source_files):
-        # Get dependencies for these source files:
-        dependency_packages = []
-        for source_file in source_files:
-            if source_file.endswith(".ads") or source_file.endswith(".adb"):
-                dependency_packages.extend(ada.get_source_dependencies(source_file))
-        dependency_packages = filter(bool, dependency_packages)
-        dependency_packages = list(dict.fromkeys(dependency_packages))
-
-        # Get all the source files that correspond to these packages:
-        sources = source_db.try_get_sources(dependency_packages)
-
-        # Split up adb and ads sources:
-        ads_sources = [source for source in sources if source.endswith(".ads")]
-        adb_sources = [source for source in sources if source.endswith(".adb")]
-
-        return ads_sources, adb_sources
+    # Set of the sources in deps, for fast membership checks:
+    deps_set = set()
 
     def _get_all_dependencies(source_files):
-        ads_sources, adb_sources = _get_immediate_dependencies(source_files)
+        ads_sources, adb_sources = _get_immediate_ada_dependencies(source_files, source_db)
         # Filter out sources that are already in the deps:
         new_ads_sources = [
-            source for source in ads_sources if source not in deps
+            source for source in ads_sources if source not in deps_set
         ]
         new_adb_sources = [
-            source for source in adb_sources if source not in deps
+            source for source in adb_sources if source not in deps_set
         ]
 
         # Special handling to make sure we build C-objects for which we have
@@ -119,22 +168,12 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
         # dependencies of the Ada binding .ads files. By declaring this dependency,
         # this will ensure the C/C++ object will be compiled and be included at
         # link time.
-        c_sources = []
-        for source in new_ads_sources:
-            if source.endswith("_h.ads"):
-                with c_source_database() as db:
-                    binded_sources = db.try_get_sources([os.path.basename(source[:-6])])
-                    if binded_sources:
-                        c_sources.extend(binded_sources)
-            if source.endswith("_hpp.ads"):
-                with c_source_database() as db:
-                    binded_sources = db.try_get_sources([os.path.basename(source[:-8])])
-                    if binded_sources:
-                        c_sources.extend(binded_sources)
+        c_sources = _get_binded_c_sources(new_ads_sources)
         if c_sources:
             if not dry_run:
                 redo.redo_ifchange(c_sources)
             deps.extend(c_sources)
+            deps_set.update(c_sources)
 
         if new_ads_sources:
             if fast_compile:
@@ -144,6 +183,7 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
 
                 # Add them to the overall dependency list:
                 deps.extend(new_ads_sources)
+                deps_set.update(new_ads_sources)
 
                 # If we are in fast_compile mode, we have not yet depended on any
                 # adb files. We need to do this now that the ads files are created.
@@ -153,16 +193,13 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
                 #   https://gcc.gnu.org/onlinedocs/gcc-4.9.2/gnat_ugn/Source-Dependencies.html
                 # which is implemented by the should_depend_on_adb function call below.
                 required_adb_sources = []
+                ada.scan_sources(new_ads_sources)
                 for ads_source in new_ads_sources:
                     if ada.should_depend_on_adb(ads_source):
                         # Find the matching adb source in the adb sources list. It could
                         # be in a different directory than the ads file, so we need to actually
                         # look it up.
-                        ads_basename = os.path.basename(ads_source)
-                        adb_basename = ads_basename[:-1] + "b"
-                        for adb_source in new_adb_sources:
-                            if adb_source.endswith(adb_basename):
-                                required_adb_sources.append(adb_source)
+                        required_adb_sources.extend(_get_matching_adb_sources(ads_source, new_adb_sources))
 
                 # Depend on adb sources via pregeneration and redo-done:
                 if not dry_run:
@@ -170,6 +207,7 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
 
                 # Add them to the overall dependency list:
                 deps.extend(required_adb_sources)
+                deps_set.update(required_adb_sources)
 
                 # Add the adbs to the new_sources list:
                 new_sources = new_ads_sources + required_adb_sources
@@ -185,6 +223,7 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
 
                 # Add them to the overall dependency list:
                 deps.extend(new_sources)
+                deps_set.update(new_sources)
 
             # Get the dependencies of the new sources:
             _get_all_dependencies(new_sources)
@@ -193,6 +232,117 @@ def _build_all_ada_dependencies(ada_source_files, source_db, dry_run=False):
     return deps
 
 
+class _ada_dependency_graph(object):
+    """
+    A memoized graph of Ada source dependencies, shared by all of the objects
+    registered in a build, where each object's transitive dependencies would
+    otherwise be found from scratch by _build_all_ada_dependencies, even though
+    most objects share most of them.
+
+    The edges of a source are the sources that _build_all_ada_dependencies would
+    add for it: the specs of the packages it withs, the bodies of those specs
+    that should_depend_on_adb requires (or all bodies if fast compile is off),
+    and any C/C++ sources bound by those specs. The transitive closure of each
+    source is computed once, one strongly connected component at a time, since
+    Ada units can depend on each other in a cycle. The dependencies of a list of
+    sources are then the union of their memoized closures.
+
+    The graph only reads the sources, so they must already exist on disk. Use
+    it for dry runs, after all of the dependencies have been built.
+    """
+    def __init__(self, source_db, fast_compile=None):
+        import threading
+
+        self.source_db = source_db
+        self.fast_compile = _is_fast_compile() if fast_compile is None else fast_compile
+        self.edges = {}
+        self.closures = {}
+        # Objects may be registered from multiple threads:
+        self.lock = threading.Lock()
+
+    def _get_edges(self, source_file):
+        edges = self.edges.get(source_file)
+        if edges is None:
+            edges = []
+            if source_file.endswith(".ads") or source_file.endswith(".adb"):
+                ads_sources, adb_sources = _get_immediate_ada_dependencies([source_file], self.source_db)
+                edges.extend(_get_binded_c_sources(ads_sources))
+                edges.extend(ads_sources)
+                if self.fast_compile:
+                    for ads_source in ads_sources:
+                        if ada.should_depend_on_adb(ads_source):
+                            edges.extend(_get_matching_adb_sources(ads_source, adb_sources))
+                else:
+                    edges.extend(adb_sources)
+            self.edges[source_file] = edges
+        return edges
+
+    def _compute_closures(self, root):
+        """
+        Compute the closure of root, and of every source reachable from it, using
+        an iterative version of Tarjan's strongly connected components algorithm.
+        """
+        index = {root: 0}
+        low = {root: 0}
+        stack = [root]
+        on_stack = {root}
+        work = [(root, iter(self._get_edges(root)))]
+        while work:
+            source, edges = work[-1]
+            descended = False
+            for dep in edges:
+                if dep in self.closures:
+                    continue
+                if dep not in index:
+                    index[dep] = low[dep] = len(index)
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(self._get_edges(dep))))
+                    descended = True
+                    break
+                elif dep in on_stack:
+                    low[source] = min(low[source], index[dep])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[source])
+
+            # If this source is the root of a strongly connected component, then
+            # all sources in the component share the same closure:
+            if low[source] == index[source]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == source:
+                        break
+                members = set(component)
+                closure = set()
+                for member in component:
+                    for dep in self._get_edges(member):
+                        closure.add(dep)
+                        if dep not in members:
+                            closure.update(self.closures[dep])
+                closure = frozenset(closure)
+                for member in component:
+                    self.closures[member] = closure
+
+    def get_dependencies(self, source_files):
+        """Return the sorted transitive dependencies of a list of sources."""
+        with self.lock:
+            ada.scan_sources([source_file for source_file in source_files if source_file.endswith((".ads", ".adb"))])
+            dependencies = set()
+            for source_file in source_files:
+                if source_file not in self.closures:
+                    self._compute_closures(source_file)
+                dependencies.update(self.closures[source_file])
+        return sorted(dependencies)
+
+
 def get_c_source_dependencies(source_file, build_target_instance, c_source_db=None):
     """
     Given a C/C++ source file, use g++ to determine the dependencies that the
@@ -247,6 +397,7 @@ def _build_all_c_dependencies(
     c_source_files, c_source_db, build_target_instance, dry_run=False
 ):
     deps = []
+    deps_set = set()
 
     def _get_immediate_dependencies(source_files):
         all_deps = []
@@ -259,7 +410,7 @@ def _build_all_c_dependencies(
     def _get_all_dependencies(source_files):
         sources = _get_immediate_dependencies(source_files)
         # Filter out sources that are already in the deps:
-        new_sources = [source for source in sources if source not in deps]
+        new_sources = [source for source in sources if source not in deps_set]
         # If there are new sources, add them to the dependency list
         # and see if those sources have any dependencies:
         if new_sources:
@@ -268,6 +419,7 @@ def _build_all_c_dependencies(
                 redo.redo_ifchange(new_sources)
             # Add them to the overall dependency list:
             deps.extend(new_sources)
+            deps_set.update(new_sources)
             # Get the dependencies of the new sources:
             _get_all_dependencies(new_sources)
 
@@ -382,7 +534,7 @@ def _get_object_sources(object_file):
     return source_to_compile, source_files
 
 
-def _build_all_ada_and_c_dependencies_for_object(object_files, dry_run=False):
+def _build_all_ada_and_c_dependencies_for_object(object_files, dry_run=False, ada_dependency_graph=None):
     # Make sure all objects have the same target
     build_target = redo_arg.get_target(object_files[0])
     for obj_file in object_files:
@@ -413,7 +565,11 @@ def _build_all_ada_and_c_dependencies_for_object(object_files, dry_run=False):
                            dep.endswith('.hpp') or dep.endswith('.cpp')]
 
     # Discover and build all Ada dependencies for this object recursively.
-    if ada_sources_to_depend:
+    # On a dry run, a memoized dependency graph can be used instead, if
+    # one is shared by the caller.
+    if ada_sources_to_depend and dry_run and ada_dependency_graph:
+        sources_to_depend.extend(ada_dependency_graph.get_dependencies(ada_sources_to_depend))
+    elif ada_sources_to_depend:
         with source_database() as db:
             sources_to_depend.extend(
                 _build_all_ada_dependencies(
@@ -436,11 +592,12 @@ def _build_all_ada_and_c_dependencies_for_object(object_files, dry_run=False):
     return sources_to_compile, [build_target_file, __file__] + sources_to_depend, build_target_instance
 
 
-def _register_precompiled_object(temp_object_dir, obj_file):
+def _register_precompiled_object(temp_object_dir, ada_dependency_graph, obj_file):
     """
     Move a compiled object to its final location, resolve its
     transitive dependencies, write the .deps file, and register
-    with redo-done. Designed to run in parallel across objects.
+    with redo-done. Designed to run in parallel across objects,
+    sharing a single Ada dependency graph.
     """
     temp_object_file = os.path.join(temp_object_dir, os.path.basename(obj_file))
     if not os.path.isfile(temp_object_file):
@@ -458,7 +615,9 @@ def _register_precompiled_object(temp_object_dir, obj_file):
             move(f, os.path.join(build_dir, os.path.basename(f)))
 
     # Discover the correct per-object transitive dependencies.
-    _, obj_sources_to_depend, _ = _build_all_ada_and_c_dependencies_for_object([obj_file], dry_run=True)
+    _, obj_sources_to_depend, _ = _build_all_ada_and_c_dependencies_for_object(
+        [obj_file], dry_run=True, ada_dependency_graph=ada_dependency_graph
+    )
 
     # Write .deps file listing source dependencies for this object.
     with open(obj_file + ".deps", "w") as f:
@@ -480,8 +639,9 @@ def _precompile_objects(object_files):
     result with redo-done so that redo treats them as up-to-date.
 
     For each object, per-object transitive dependencies are resolved via
-    _build_all_ada_and_c_dependencies_for_object(dry_run=True) and passed
-    to redo-done, ensuring correct incremental rebuild behavior.
+    _build_all_ada_and_c_dependencies_for_object(dry_run=True), using an
+    Ada dependency graph shared by all of the objects, and passed to
+    redo-done, ensuring correct incremental rebuild behavior.
 
     After registration, redo will not invoke individual .do scripts for
     these objects unless their dependencies change. The old per-object
@@ -530,14 +690,18 @@ def _precompile_objects(object_files):
     from concurrent.futures import ThreadPoolExecutor
     from functools import partial
     import multiprocessing
-    register_fn = partial(_register_precompiled_object, temp_object_dir)
-    num_workers = min(multiprocessing.cpu_count(), len(object_files))
-    if num_workers > 1:
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            list(executor.map(register_fn, object_files))
-    else:
-        for obj_file in object_files:
-            register_fn(obj_file)
+    #
+    # All objects share one memoized Ada dependency graph, so the transitive
+    # dependencies shared by many objects are only found once.
+    with source_database() as db:
+        register_fn = partial(_register_precompiled_object, temp_object_dir, _ada_dependency_graph(db))
+        num_workers = min(multiprocessing.cpu_count(), len(object_files))
+        if num_workers > 1:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                list(executor.map(register_fn, object_files))
+        else:
+            for obj_file in object_files:
+                register_fn(obj_file)
 
 
 def _handle_prebuilt_object(redo_1, redo_2, redo_3):
@@ -1,11 +1,10 @@
 import os.path
 import re
 import sys
-from util import redo
 from util import error
 from util import filesystem
+from util.job_scheduler import run_all, redo_job, save_logs
 from base_classes.build_rule_base import build_rule_base
-from shutil import copytree
 
 # Definitions for producing colored text on the terminal
 NO_COLOR = "\033[0m"
@@ -65,8 +64,6 @@ class build_prove_all(build_rule_base):
         # for prove_all
 
     def build(self, redo_1, redo_2, redo_3):
-        import database.setup
-
         # Figure out build directory location
         directory = os.path.abspath(os.path.dirname(redo_1))
 
@@ -118,34 +115,26 @@ class build_prove_all(build_rule_base):
         filesystem.safe_makedir(failed_prove_log_dir)
         filesystem.safe_makedir(log_dir)
 
-        # Run proofs:
-        exit_code = 0
-        self._write_to_both("\nProving...\n")
-        for number, prove_dir in enumerate(prove_dirs):
-            rel_dir = os.path.relpath(prove_dir, directory)
-            self._write_to_both(
-                "{0:80}   ".format(
-                    (("%02d" % (number + 1)) + "/" + num_dirs + " " + rel_dir)[:80]
-                )
-            )
-            database.setup.reset()
+        def run_prove(prove_dir, env):
             try:
-                prove_log = os.path.join(log_dir, rel_dir.replace(os.sep, "_") + ".log")
-                redo.redo([os.path.join(prove_dir, "prove"), "1>&2", "2>" + prove_log])
-                self._write_to_both(" " + PASSED + "\n")
+                redo_job(prove_dir, directory, "prove", log_dir, env)
+                return True
             except BaseException:
-                exit_code = 1
-                self._write_to_both(" " + FAILED + "\n")
-
-                # On a failed proof, save off the prove logs for inspection. This is
-                # especially useful on a remote CI server.
-                try:
-                    copytree(
-                        os.path.join(prove_dir, "build" + os.sep + "prove"),
-                        os.path.join(failed_prove_log_dir, prove_dir.replace(os.sep, "_"))
-                    )
-                except BaseException:
-                    pass
+                # On a failed proof, save off the prove logs for inspection:
+                save_logs(
+                    os.path.join(prove_dir, "build" + os.sep + "prove"),
+                    os.path.join(failed_prove_log_dir, prove_dir.replace(os.sep, "_"))
+                )
+                return False
+
+        # Run proofs, reporting each as it finishes:
+        self._write_to_both("\nProving...\n")
+        results = run_all(
+            redo_1, redo_2, redo_3, directory, prove_dirs, run_prove,
+            lambda passed: PASSED if passed else FAILED, self.summary_file,
+            os.path.join(build_dir, "prove_all_durations.yaml")
+        )
+        exit_code = 0 if all(results) else 1
 
         self.summary_file.close()
         error.abort(exit_code)
@@ -1,10 +1,9 @@
 import os.path
 import sys
-from util import redo
 from util import error
 from util import filesystem
+from util.job_scheduler import run_all, redo_job, save_logs
 from base_classes.build_rule_base import build_rule_base
-from shutil import copytree
 
 # Definitions for producing colored text on the terminal
 NO_COLOR = "\033[0m"
@@ -23,7 +22,8 @@ class build_style_all(build_rule_base):
     """
     This build rule looks for source code in the directory
     it is passed and recursively below. It then runs redo style
-    prints a report to the terminal as the style checks are run.
+    in each directory, in parallel (see job_scheduler.py), and
+    prints a report to the terminal as the style checks finish.
     """
 
     def _write_to_both(self, message):
@@ -38,8 +38,6 @@ class build_style_all(build_rule_base):
         # for style
 
     def build(self, redo_1, redo_2, redo_3):
-        import database.setup
-
         # Figure out build directory location
         directory = os.path.abspath(os.path.dirname(redo_1))
 
@@ -98,53 +96,32 @@ class build_style_all(build_rule_base):
         filesystem.safe_makedir(failed_style_log_dir)
         filesystem.safe_makedir(log_dir)
 
-        # Run tests:
-        exit_code = 0
-        self._write_to_both("\nChecking style...\n")
-        for number, test in enumerate(tests):
-            rel_test = os.path.relpath(test, directory)
-            self._write_to_both(
-                "{0:80}   ".format(
-                    (("%02d" % (number + 1)) + "/" + num_tests + " " + rel_test)[:80]
-                )
-            )
-            database.setup.reset()
+        def run_style(test, env):
+            style_dir = os.path.join(os.path.join(test, "build"), "style")
             try:
-                style_run_log = os.path.join(log_dir, rel_test.replace(os.sep, "_") + ".log")
-                redo.redo([os.path.join(test, "style"), "1>&2", "2>" + style_run_log])
+                redo_job(test, directory, "style", log_dir, env)
 
                 # See if there is anything in the log file:
-                style_log = os.path.join(
-                    os.path.join(os.path.join(test, "build"), "style"), "style.log"
-                )
+                style_log = os.path.join(style_dir, "style.log")
                 if os.path.isfile(style_log) and os.path.getsize(style_log) > 0:
-                    self._write_to_both(" " + FAILED + "\n")
-                    exit_code = 1
-
-                    # On a failed style, save off the logs for inspection. This is
-                    # especially useful on a remote CI server.
-                    try:
-                        copytree(
-                            os.path.join(os.path.join(test, "build"), "style"),
-                            os.path.join(failed_style_log_dir, test.replace(os.sep, "_"))
-                        )
-                    except BaseException:
-                        pass
+                    # On a failed style, save off the logs for inspection:
+                    save_logs(style_dir, os.path.join(failed_style_log_dir, test.replace(os.sep, "_")))
+                    return False
                 else:
-                    self._write_to_both(" " + PASSED + "\n")
+                    return True
             except Exception:
-                self._write_to_both(" " + FAILED + "\n")
-                exit_code = 1
-
-                # On a failed style, save off the logs for inspection. This is
-                # especially useful on a remote CI server.
-                try:
-                    copytree(
-                        os.path.join(os.path.join(test, "build"), "style"),
-                        os.path.join(failed_style_log_dir, test.replace(os.sep, "_") + "_style")
-                    )
-                except BaseException:
-                    pass
+                # On a failed style, save off the logs for inspection:
+                save_logs(style_dir, os.path.join(failed_style_log_dir, test.replace(os.sep, "_") + "_style"))
+                return False
+
+        # Run style checks, reporting each as it finishes:
+        self._write_to_both("\nChecking style...\n")
+        results = run_all(
+            redo_1, redo_2, redo_3, directory, tests, run_style,
+            lambda passed: PASSED if passed else FAILED, self.summary_file,
+            os.path.join(build_dir, "style_all_durations.yaml")
+        )
+        exit_code = 0 if all(results) else 1
 
         self.summary_file.close()
         error.abort(exit_code)
@@ -1,10 +1,9 @@
 import os.path
 import sys
-from util import redo
 from util import error
 from util import filesystem
+from util.job_scheduler import run_all, redo_job, save_logs
 from base_classes.build_rule_base import build_rule_base
-from shutil import copytree
 
 # Definitions for producing colored text on the terminal
 NO_COLOR = "\033[0m"
@@ -23,9 +22,10 @@ class build_test_all(build_rule_base):
     """
     This build rule looks for unit tests in the directory
     it is passed and recursively below. It then runs all the
-    tests in sequence and prints a test report to the terminal
-    as the tests are run. Tests are matched by finding either a
-    "test.adb" file or a "test.do" file a directory.
+    tests, in parallel (see job_scheduler.py), and prints a test
+    report to the terminal as the tests finish. Tests are matched
+    by finding either a "test.adb" file or a "test.do" file a
+    directory.
     """
 
     def _write_to_both(self, message):
@@ -40,8 +40,6 @@ class build_test_all(build_rule_base):
         # for test_all
 
     def build(self, redo_1, redo_2, redo_3):
-        import database.setup
-
         # Figure out build directory location
         directory = os.path.abspath(os.path.dirname(redo_1))
 
@@ -88,34 +86,26 @@ class build_test_all(build_rule_base):
         filesystem.safe_makedir(failed_test_log_dir)
         filesystem.safe_makedir(log_dir)
 
-        # Run tests:
-        exit_code = 0
-        self._write_to_both("\nTesting...\n")
-        for number, test in enumerate(tests):
-            rel_test = os.path.relpath(test, directory)
-            self._write_to_both(
-                "{0:80}   ".format(
-                    (("%02d" % (number + 1)) + "/" + num_tests + " " + rel_test)[:80]
-                )
-            )
-            database.setup.reset()
+        def run_test(test, env):
             try:
-                test_log = os.path.join(log_dir, rel_test.replace(os.sep, "_") + ".log")
-                redo.redo([os.path.join(test, "test"), "1>&2", "2>" + test_log])
-                self._write_to_both(" " + PASSED + "\n")
+                redo_job(test, directory, "test", log_dir, env)
+                return True
             except BaseException:
-                exit_code = 1
-                self._write_to_both(" " + FAILED + "\n")
-
-                # On a failed test, save off the test logs for inspection. This is
-                # especially useful on a remote CI server.
-                try:
-                    copytree(
-                        os.path.join(test, "build" + os.sep + "log"),
-                        os.path.join(failed_test_log_dir, test.replace(os.sep, "_"))
-                    )
-                except BaseException:
-                    pass
+                # On a failed test, save off the test logs for inspection:
+                save_logs(
+                    os.path.join(test, "build" + os.sep + "log"),
+                    os.path.join(failed_test_log_dir, test.replace(os.sep, "_"))
+                )
+                return False
+
+        # Run tests, reporting each as it finishes:
+        self._write_to_both("\nTesting...\n")
+        results = run_all(
+            redo_1, redo_2, redo_3, directory, tests, run_test,
+            lambda passed: PASSED if passed else FAILED, self.summary_file,
+            os.path.join(build_dir, "test_all_durations.yaml")
+        )
+        exit_code = 0 if all(results) else 1
 
         self.summary_file.close()
         error.abort(exit_code)
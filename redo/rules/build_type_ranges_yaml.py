@@ -6,55 +6,148 @@ from util import shell
 from util import redo_arg
 from util import target
 from base_classes.build_rule_base import build_rule_base
+from models import packed_type
 import database.model_database
 import platform
 
 
+def _get_type_ranges_elf(directory, name):
+    """Return the type ranges .elf file with the given name for a directory."""
+    the_target = target.try_get_target()
+    build_for = platform.system()
+    if the_target:
+        if the_target.endswith("_Test"):
+            build_for += "_Test"
+        if the_target.endswith("_Deprecated"):
+            build_for += "_Deprecated"
+    return (
+        directory
+        + os.sep
+        + "build"
+        + os.sep
+        + "bin"
+        + os.sep
+        + build_for
+        + os.sep
+        + name
+        + "_type_ranges.elf"
+    )
+
+
+def _run_type_ranges_elf(elf):
+    """Build and run a type ranges .elf file, and return what it printed."""
+    # Build the elf file if it doesn't already exist:
+    redo.redo_ifchange(elf)
+
+    # Run the binary:
+    rc, stdout, stderr = shell.try_run_command_capture_output(elf)
+    if rc != 0:
+        error.error_abort("Error running '" + elf + "'.")
+        error.error_abort(stderr, code=rc)
+    return stdout
+
+
+def _try_run_batch_elf(elf):
+    """
+    Build and run the batched type ranges .elf file for a directory, and
+    return what it printed. If it fails to build or to run, for example
+    because one of the packed types in the directory does not compile,
+    return nothing, so that each packed type is built from its own .elf file
+    instead.
+    """
+    if not redo.try_redo_ifchange(elf):
+        error.warning_print(
+            "Could not build '" + elf + "', building the type ranges of each packed type separately."
+        )
+        return ""
+
+    rc, stdout, stderr = shell.try_run_command_capture_output(elf)
+    if rc != 0:
+        error.warning_print(
+            "Error running '" + elf + "', building the type ranges of each packed type separately."
+        )
+        return ""
+    return stdout
+
+
+def _split_batch_output(stdout, marker):
+    """
+    Split the output of a batched type ranges program into a dictionary that
+    maps each model name to the type ranges yaml printed for it.
+    """
+    outputs = {}
+    model_name = None
+    lines = []
+    for line in stdout.splitlines(keepends=True):
+        if line.startswith(marker):
+            if model_name:
+                outputs[model_name] = "".join(lines)
+            model_name = line[len(marker):].strip()
+            lines = []
+        else:
+            lines.append(line)
+    if model_name:
+        outputs[model_name] = "".join(lines)
+    return outputs
+
+
+def _get_batch_output(directory, batch_name):
+    """
+    Return the file that holds the output of the batched type ranges program
+    for a directory.
+    """
+    return os.path.join(
+        directory, "build" + os.sep + "yaml" + os.sep + batch_name + ".type_ranges.txt"
+    )
+
+
 class build_type_ranges_yaml(build_rule_base):
     """
-    This build rule runs a binary file. It matches any binary files
-    that are produced with the name "main.elf" and is able to
-    execute them.
+    This build rule builds the type ranges yaml file for a packed
+    record or array by running a binary that prints the ranges of
+    its types. The type ranges of all the packed records and arrays
+    in a directory are printed by a single batched binary (see
+    type_ranges_batch_adb in gen/generators/packed_types.py). Its
+    output is built once per directory, as "<batch>.type_ranges.txt"
+    by this rule, and the type ranges yaml file of each packed type
+    is its own section of that output. A packed type that is not in
+    the batched binary, or whose batched binary failed to build or run,
+    is built from its own "<model>_type_ranges.elf".
     """
     def _build(self, redo_1, redo_2, redo_3):
-        # Find the .elf file that will be used to produce this yaml file.
         directory = redo_arg.get_src_dir(redo_1)
+        yaml_dir = os.path.dirname(redo_1)
+        filesystem.safe_makedir(yaml_dir)
+        batch_name, models = packed_type.type_ranges_batch(directory)
+
+        # Build the output of the batched binary for the directory:
+        if redo_1.endswith(".type_ranges.txt"):
+            print(_try_run_batch_elf(_get_type_ranges_elf(directory, batch_name)), end="")
+            return
+
         (
             model_name,
             model_type,
             specific_name,
         ) = database.model_database.split_model_file_name(redo_1)
-        the_target = target.try_get_target()
-        build_for = platform.system()
-        if the_target:
-            if the_target.endswith("_Test"):
-                build_for += "_Test"
-            if the_target.endswith("_Deprecated"):
-                build_for += "_Deprecated"
-        elf = (
-            directory
-            + os.sep
-            + "build"
-            + os.sep
-            + "bin"
-            + os.sep
-            + build_for
-            + os.sep
-            + model_name
-            + "_type_ranges.elf"
-        )
+        model_name = model_name.lower()
 
-        # Build the elf file if it doesn't already exist:
-        redo.redo_ifchange(elf)
+        # Get this packed type's section of the output of the batched binary
+        # for the directory, if it is in it:
+        outputs = {}
+        if model_name in models:
+            batch_output = _get_batch_output(directory, batch_name)
+            redo.redo_ifchange(batch_output)
+            with open(batch_output, "r") as f:
+                outputs = _split_batch_output(f.read(), packed_type.type_ranges_batch_marker)
 
-        # Run the binary:
-        rc, stdout, stderr = shell.try_run_command_capture_output(elf)
-        if rc != 0:
-            error.error_abort("Error running '" + elf + "'.")
-            error.error_abort(stderr, code=rc)
+        if model_name in outputs:
+            stdout = outputs[model_name]
+        else:
+            # Build and run the binary for this packed type alone:
+            stdout = _run_type_ranges_elf(_get_type_ranges_elf(directory, model_name))
 
         # Print the output:
-        filesystem.safe_makedir(os.path.dirname(redo_1))
         print(stdout)
 
     def input_file_regex(self):
@@ -70,12 +163,15 @@ class build_type_ranges_yaml(build_rule_base):
         """
         base = redo_arg.get_base_no_ext(input_filename)
         directory = redo_arg.get_src_dir(input_filename)
+        name = base.replace("_type_ranges", "")
+        if name == packed_type.type_ranges_batch(directory)[0]:
+            return _get_batch_output(directory, name)
         return os.path.join(
             directory,
             "build"
             + os.sep
             + "yaml"
             + os.sep
-            + base.replace("_type_ranges", "")
+            + name
             + ".type_ranges.yaml",
         )
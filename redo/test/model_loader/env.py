@@ -0,0 +1,12 @@
+from environments import test, modify_build_path  # noqa: F401
+import os
+
+this_dir = os.path.dirname(os.path.realpath(__file__))
+example_dir = os.path.realpath(
+    os.path.join(
+        this_dir, ".." + os.sep + ".." + os.sep + ".." + os.sep + "doc" + os.sep + "example_architecture"
+    )
+)
+modify_build_path.add_to_build_path(
+    [this_dir, example_dir, os.path.join(example_dir, "queued_component")]
+)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+# Profiling test for the model name lookups in redo/util/model_loader.py.
+# Loading an assembly looks up thousands of models by name. This test
+# counts how many times the model database is opened during the load of
+# an example assembly, with and without the memo of model database
+# records, and makes sure that the memo is cleared when a new generation
+# of the model database is written. It also checks that the unit test
+# models of a component are found from the model database.
+import os
+import sys
+
+# Set up the build system, so that the example assemblies can be loaded:
+import database.setup
+
+this_file = os.path.realpath(__file__)
+database.setup.setup(this_file, os.path.splitext(this_file)[0], this_file + ".out")
+
+import database.model_database
+from database.database import DATABASE_MODE
+from models import base
+from util import model_loader
+
+
+def println(strn=""):
+    sys.stderr.write(strn + "\n")
+
+
+# Count the opens of the model database:
+num_opens = 0
+model_database_init = database.model_database.model_database.__init__
+
+
+def counting_model_database_init(self, *args, **kwargs):
+    global num_opens
+    num_opens += 1
+    model_database_init(self, *args, **kwargs)
+
+
+database.model_database.model_database.__init__ = counting_model_database_init
+
+# Load every model from its yaml file, so that each load makes the same
+# lookups, whatever is in the model cache:
+base.base.load_from_cache = lambda cls, filename: None
+
+
+def load_assembly():
+    """Load the example assembly, returning the number of model database opens."""
+    global num_opens
+    num_opens = 0
+    assm = model_loader.try_load_model_by_name("science_assembly", model_types="assembly")
+    assert assm, "Could not load assembly 'science_assembly'."
+    return num_opens
+
+
+println("testing model database opens for an assembly load:")
+# Without the memo, the model database is opened for every lookup:
+get_model_dict = model_loader._get_model_dict
+
+
+def get_model_dict_unmemoized(model_name):
+    model_loader._model_dicts.clear()
+    return get_model_dict(model_name)
+
+
+def clear_memos():
+    model_loader._model_dicts.clear()
+    model_loader._unit_test_paths.clear()
+
+
+clear_memos()
+model_loader._get_model_dict = get_model_dict_unmemoized
+opens_before = load_assembly()
+model_loader._get_model_dict = get_model_dict
+
+# With the memo, the model database is opened once per model name, and once
+# per component for its unit tests:
+clear_memos()
+opens_after = load_assembly()
+num_names = len(model_loader._model_dicts) + len(model_loader._unit_test_paths)
+println("  model database opens without memo: " + str(opens_before))
+println("  model database opens with memo:    " + str(opens_after))
+assert opens_after == num_names, (opens_after, num_names)
+assert opens_after < opens_before, (opens_after, opens_before)
+
+# Loading the assembly again does not open the model database at all:
+assert load_assembly() == 0
+println("passed.")
+
+println("testing model database generations:")
+records = dict(model_loader._model_dicts)
+unit_test_records = dict(model_loader._unit_test_paths)
+assert records and unit_test_records
+generation = database.model_database.get_generation()
+assert generation == database.model_database.get_generation()
+with database.model_database.model_database(mode=DATABASE_MODE.READ_WRITE):
+    pass
+assert database.model_database.get_generation() != generation
+# A new generation clears the memo, so the records are fetched again:
+assert load_assembly() == opens_after
+assert model_loader._model_dicts == records
+assert model_loader._unit_test_paths == unit_test_records
+println("passed.")
+
+println("testing unit test lookups:")
+# Unit test models are found from the model database, without searching the
+# filesystem, and are only loaded when asked for:
+example_dir = os.path.realpath(
+    os.path.join(os.path.dirname(this_file), "..", "..", "..", "doc", "example_architecture")
+)
+roots, unit_test_files = model_loader.get_unit_test_file_paths("queued_component")
+assert roots, roots
+assert sorted(unit_test_files) == [
+    os.path.join(example_dir, "queued_component", test_dir, "queued_component.tests.yaml")
+    for test_dir in ["test", "test2"]
+], unit_test_files
+comp = model_loader.try_load_model_by_name(
+    "queued_component", model_types="component", ignore_cache=True
+)
+assert comp.unit_test_files == unit_test_files, comp.unit_test_files
+assert not comp.unit_tests
+comp.load_unit_tests()
+assert [t.full_filename for t in comp.unit_tests] == unit_test_files
+assert model_loader.get_unit_test_file_paths("not_a_model") == (roots, [])
+# A component in a directory that was not searched for the build path falls
+# back to searching the filesystem, and finds the same unit test models:
+model_loader._unit_test_paths["queued_component"] = ([], [])
+comp = model_loader.try_load_model_by_name(
+    "queued_component", model_types="component", ignore_cache=True
+)
+assert comp.unit_test_files == unit_test_files, comp.unit_test_files
+println("passed.")
+
+database.setup.cleanup(this_file, os.path.splitext(this_file)[0], this_file + ".out")
+println("All tests passed.")
@@ -123,10 +123,30 @@ def _source_statements(content):
     return [" ".join(s.split()) for s in "\n".join(lines).split(";")]
 
 
-def get_source_dependencies(source_filename):
+# Regular expressions used to scan Ada source statements, see _scan_statements:
+_WITH_CLAUSE_REGEX = re.compile(r"^\s*(private\s+)?(limited\s+)?with\s+.*$", re.IGNORECASE)
+_NOT_WITH_CLAUSE_REGEX = re.compile(
+    r".*is\s+new\s+.*"
+    r"|.*with\s+package\s+.*"
+    r"|.*with\s+function\s+.*"
+    r"|.*with\s+procedure\s+.*"
+    r"|.*with\s+.*=>",
+    re.IGNORECASE,
+)
+_PACKAGE_REGEX = re.compile(
+    r"^\s*(?:private\s+)?package\s+(?:body\s+)?([A-Za-z][\w.]*)",
+    re.IGNORECASE,
+)
+_GENERIC_REGEX = re.compile(r"^\s*generic\b", re.IGNORECASE)
+_INLINE_ASPECT_REGEX = re.compile(r"^.*\bwith\b.*\binline.*$", re.IGNORECASE)
+_INLINE_PRAGMA_REGEX = re.compile(r"^.*pragma\s+inline.*$", re.IGNORECASE)
+
+
+def _scan_statements(statements, is_spec):
     """
-    Simple function which reads the "with" dependencies from
-    an ada program and then returns them in a list.
+    Scan the statements of an Ada source file, returning a tuple of the list
+    of packages the source depends on (see get_source_dependencies) and, for a
+    spec, whether it requires depending on its body (see should_depend_on_adb).
     """
     from itertools import chain
 
@@ -135,6 +155,239 @@ def get_source_dependencies(source_filename):
             return text[len(prefix):]
         return text
 
+    # Find all with statements, ordered by kind: "with", "limited with",
+    # "private with", and "private limited with":
+    with_statements = ([], [], [], [])
+    for statement in filter(_WITH_CLAUSE_REGEX.match, statements):
+        match = _WITH_CLAUSE_REGEX.match(statement)
+        with_statements[2 * bool(match.group(1)) + bool(match.group(2))].append(statement)
+
+    # Find the package names right after the "package" keyword:
+    packages = [match.group(1) for match in map(_PACKAGE_REGEX.match, statements) if match]
+
+    # See if any statement begins a generic unit. The keyword can stand alone
+    # ahead of the formal part, or introduce the unit directly when there are
+    # no formals ("generic package G is ..."). Then see if any statement specifies
+    # inlining. The aspect may be given without an argument ("with Inline",
+    # equivalent to "=> True"), with one and any spacing ("with Inline=>True"),
+    # or alongside other aspects. Matching the aspect name loosely errs toward
+    # depending on the body, which is the safe direction: a missed dependency
+    # means a stale object under -gnatn. This only applies to specs.
+    depends_on_body = None
+    if is_spec:
+        depends_on_body = (
+            any(map(_GENERIC_REGEX.match, statements))
+            or any(map(_INLINE_ASPECT_REGEX.match, statements))
+            or any(map(_INLINE_PRAGMA_REGEX.match, statements))
+        )
+
+    # Filter things out that are not regular with statements:
+    with_statements = [
+        item for item in chain.from_iterable(with_statements) if not _NOT_WITH_CLAUSE_REGEX.match(item)
+    ]
+
+    # Remove the "with":
+    includes = [
+        remove_prefix(x.strip(), "private").strip() for x in with_statements
+    ]
+    includes = [remove_prefix(x.strip(), "limited").strip() for x in includes]
+    includes = [remove_prefix(x.strip(), "with").strip() for x in includes]
+
+    # Account for commas:
+    includes = list(chain.from_iterable([x.split(",") for x in includes]))
+    includes = [x.strip() for x in includes]
+
+    # If package has a parent package, that is an implicit include. Match the
+    # package name right after the "package" keyword instead of requiring the
+    # trailing "is" on the same line -- an aspect specification (e.g.
+    # "with SPARK_Mode => On") or a line break can separate the name from its
+    # "is", and private child packages carry a leading "private" keyword.
+    # Matching statements rather than raw text keeps a declaration that
+    # follows another on the same line (after a semicolon) in scope, and
+    # keeps commented-out text out of it.
+    parents = []
+    for package in packages:
+        split_package = package.split(".")
+        if len(split_package) > 1:
+            parents.append(".".join(split_package[:-1]))
+
+    # Print the results:
+    includes.extend(parents)
+    includes = list(dict.fromkeys(includes))
+    # Any include that is not a single word is probably in a "generic" statement and we
+    # should filter it out. This also drops the empty strings left behind by trailing
+    # separators.
+    includes = [x for x in includes if len(x.split()) == 1]
+    return includes, depends_on_body
+
+
+def _scan_content(content, source_filename):
+    """Scan the content of an Ada source file, see _scan_statements."""
+    # Split the file into statements and remove comments:
+    return _scan_statements(_source_statements(content), source_filename.endswith(".ads"))
+
+
+def _scan_source_file(source_filename):
+    """Read and scan an Ada source file, see _scan_statements."""
+    with open(source_filename, "r") as f:
+        return _scan_content(f.read(), source_filename)
+
+
+# Scans of Ada source files for this process, mapping a filename to a tuple of
+# ((mtime_ns, size), scan), where scan is the result of _scan_statements:
+_source_scans = {}
+
+# Use a thread pool to read at least this many unscanned source files:
+_MIN_THREAD_POOL_READ = 8
+
+# Hash of the source of this module, which holds the scanner, computed once
+# per process. It is stored with each persistent index entry, so a change to
+# the scanner ignores the scans made by the old one:
+_scanner_version = None
+
+
+def _get_scanner_version():
+    """Return a hash of the source code of the scanner in this module."""
+    global _scanner_version
+    if _scanner_version is None:
+        import hashlib
+
+        with open(os.path.splitext(__file__)[0] + ".py", "rb") as f:
+            _scanner_version = hashlib.sha1(f.read()).hexdigest()
+    return _scanner_version
+
+
+def _load_indexed_scans(source_filenames):
+    """
+    Return the persistent index entries that exist for the given source files
+    and were made by this version of the scanner. Failures are ignored, since
+    the index only exists to avoid rescanning.
+    """
+    try:
+        from database.database import database, DATABASE_MODE
+        from database.persistent_target_cache import get_ada_source_index_path
+
+        index_path = get_ada_source_index_path()
+        if os.path.isfile(index_path):
+            version = _get_scanner_version()
+            with database(index_path, DATABASE_MODE.READ_ONLY) as db:
+                entries = db.try_fetch_many(source_filenames)
+            return {
+                source_filename: (entry[0], entry[1])
+                for source_filename, entry in entries.items()
+                if len(entry) == 3 and entry[2] == version
+            }
+    except Exception:
+        pass
+    return {}
+
+
+def _save_indexed_scans(scans):
+    """
+    Save new scans to the persistent index, along with the version of the
+    scanner that made them. Failures are ignored, since the index only exists
+    to avoid rescanning.
+    """
+    try:
+        from database.database import database, DATABASE_MODE
+        from database.persistent_target_cache import get_ada_source_index_path
+
+        index_path = get_ada_source_index_path()
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        mode = DATABASE_MODE.READ_WRITE if os.path.isfile(index_path) else DATABASE_MODE.CREATE
+        version = _get_scanner_version()
+        entries = {
+            source_filename: (stat_key, scan, version)
+            for source_filename, (stat_key, scan) in scans.items()
+        }
+        with database(index_path, mode) as db:
+            db.store_many(entries)
+    except Exception:
+        pass
+
+
+def scan_sources(source_filenames):
+    """
+    Scan a list of Ada source files ahead of calls to get_source_dependencies
+    and should_depend_on_adb, so that each file is only read and parsed once.
+    Scans are kept in memory for this process and in a persistent index on
+    disk, both keyed by file modification time and size, so unchanged files are
+    never rescanned. Index entries made by another version of the scanner are
+    ignored. Files that are not in either are read in a thread pool.
+    Files that cannot be read are skipped here, and report their error when
+    they are used.
+    """
+    stats = {}
+    for source_filename in dict.fromkeys(source_filenames):
+        try:
+            stat = os.stat(source_filename)
+        except OSError:
+            continue
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        scan = _source_scans.get(source_filename)
+        if not scan or scan[0] != stat_key:
+            stats[source_filename] = stat_key
+    if not stats:
+        return
+
+    # Use any up to date scans from the persistent index:
+    indexed_scans = _load_indexed_scans(list(stats))
+    to_scan = []
+    for source_filename, stat_key in stats.items():
+        scan = indexed_scans.get(source_filename)
+        if scan and scan[0] == stat_key:
+            _source_scans[source_filename] = scan
+        else:
+            to_scan.append(source_filename)
+    if not to_scan:
+        return
+
+    # Scan the rest, saving them to the index. Reading the files is done on a
+    # thread pool, since that is where the waiting is on a cold file system
+    # cache. The scanning itself is pure python, which threads would not speed up.
+    def try_read_source_file(source_filename):
+        try:
+            with open(source_filename, "r") as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    if len(to_scan) >= _MIN_THREAD_POOL_READ:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor() as executor:
+            contents = list(executor.map(try_read_source_file, to_scan))
+    else:
+        contents = [try_read_source_file(source_filename) for source_filename in to_scan]
+    results = [
+        _scan_content(content, source_filename) if content is not None else None
+        for source_filename, content in zip(to_scan, contents)
+    ]
+
+    new_scans = {}
+    for source_filename, result in zip(to_scan, results):
+        if result is not None:
+            new_scans[source_filename] = (stats[source_filename], result)
+    _source_scans.update(new_scans)
+    if new_scans:
+        _save_indexed_scans(new_scans)
+
+
+def _get_scan(source_filename):
+    """Return the scan of a single Ada source file, see _scan_statements."""
+    scan_sources([source_filename])
+    scan = _source_scans.get(source_filename)
+    if scan is None:
+        # The file could not be scanned. Scan it directly, which raises the error:
+        return _scan_source_file(source_filename)
+    return scan[1]
+
+
+def get_source_dependencies(source_filename):
+    """
+    Simple function which reads the "with" dependencies from
+    an ada program and then returns them in a list.
+    """
     # Make sure the file is Ada source code:
     assert source_filename.endswith(".ads") or source_filename.endswith(".adb"), (
         "Cannot get dependencies for '"
@@ -142,75 +395,7 @@ def get_source_dependencies(source_filename):
         + "' because it is not an Ada source file."
     )
 
-    with open(source_filename, "r") as f:
-        content = f.read()
-
-        # Split the file into statements and remove comments:
-        statements = _source_statements(content)
-
-        # Find all with statements
-        r = re.compile(r"^\s*with\s+.*$", re.IGNORECASE)
-        with_statements = list(filter(r.match, statements))
-        r = re.compile(r"^\s*limited\s+with\s+.*$", re.IGNORECASE)
-        with_statements.extend(list(filter(r.match, statements)))
-        r = re.compile(r"^\s*private\s+with\s+.*", re.IGNORECASE)
-        with_statements.extend(list(filter(r.match, statements)))
-        r = re.compile(r"^\s*limited\s+with\s+.*$", re.IGNORECASE)
-        with_statements.extend(list(filter(r.match, statements)))
-        r = re.compile(r"^\s*private\s+limited\s+with\s+.*$", re.IGNORECASE)
-        with_statements.extend(list(filter(r.match, statements)))
-
-        # Filter things out that are not regular with statements:
-        # sys.stderr.write(str(with_statements) + "\n") # For debugging
-        r = re.compile(r".*is\s+new\s+.*", re.IGNORECASE)
-        with_statements = [item for item in with_statements if not r.match(item)]
-        r = re.compile(r".*with\s+package\s+.*", re.IGNORECASE)
-        with_statements = [item for item in with_statements if not r.match(item)]
-        r = re.compile(r".*with\s+function\s+.*", re.IGNORECASE)
-        with_statements = [item for item in with_statements if not r.match(item)]
-        r = re.compile(r".*with\s+procedure\s+.*", re.IGNORECASE)
-        with_statements = [item for item in with_statements if not r.match(item)]
-        r = re.compile(r".*with\s+.*=>", re.IGNORECASE)
-        with_statements = [item for item in with_statements if not r.match(item)]
-
-        # Remove the "with":
-        includes = [
-            remove_prefix(x.strip(), "private").strip() for x in with_statements
-        ]
-        includes = [remove_prefix(x.strip(), "limited").strip() for x in includes]
-        includes = [remove_prefix(x.strip(), "with").strip() for x in includes]
-
-        # Account for commas:
-        includes = list(chain.from_iterable([x.split(",") for x in includes]))
-        includes = [x.strip() for x in includes]
-
-        # If package has a parent package, that is an implicit include. Match the
-        # package name right after the "package" keyword instead of requiring the
-        # trailing "is" on the same line -- an aspect specification (e.g.
-        # "with SPARK_Mode => On") or a line break can separate the name from its
-        # "is", and private child packages carry a leading "private" keyword.
-        # Matching statements rather than raw text keeps a declaration that
-        # follows another on the same line (after a semicolon) in scope, and
-        # keeps commented-out text out of it.
-        r = re.compile(
-            r"^\s*(?:private\s+)?package\s+(?:body\s+)?([A-Za-z][\w.]*)",
-            re.IGNORECASE,
-        )
-        packages = [match.group(1) for match in map(r.match, statements) if match]
-        parents = []
-        for package in packages:
-            split_package = package.split(".")
-            if len(split_package) > 1:
-                parents.append(".".join(split_package[:-1]))
-
-        # Print the results:
-        includes.extend(parents)
-        includes = list(dict.fromkeys(includes))
-        # Any include that is not a single word is probably in a "generic" statement and we
-        # should filter it out. This also drops the empty strings left behind by trailing
-        # separators.
-        includes = [x for x in includes if len(x.split()) == 1]
-        return includes
+    return list(_get_scan(source_filename)[0])
 
 
 def should_depend_on_adb(spec_file):
@@ -269,33 +454,5 @@ def should_depend_on_adb(spec_file):
         + "' is not a specification file."
     )
 
-    with open(spec_file, "r") as f:
-        content = f.read()
-
-        # Split the file into statements and remove comments:
-        statements = _source_statements(content)
-
-        # See if any statement begins a generic unit. The keyword can stand alone
-        # ahead of the formal part, or introduce the unit directly when there are
-        # no formals ("generic package G is ...").
-        r = re.compile(r"^\s*generic\b", re.IGNORECASE)
-        statements_with_generic = list(filter(r.match, statements))
-        if statements_with_generic:
-            return True
-
-        # See if any statement specifies inlining. The aspect may be given without
-        # an argument ("with Inline", equivalent to "=> True"), with one and any
-        # spacing ("with Inline=>True"), or alongside other aspects. Matching the
-        # aspect name loosely errs toward depending on the body, which is the safe
-        # direction: a missed dependency means a stale object under -gnatn.
-        r = re.compile(r"^.*\bwith\b.*\binline.*$", re.IGNORECASE)
-        statements_with_inline_aspect = list(filter(r.match, statements))
-        if statements_with_inline_aspect:
-            return True
-
-        r = re.compile(r"^.*pragma\s+inline.*$", re.IGNORECASE)
-        lines_with_inline_pragma = list(filter(r.match, statements))
-        if lines_with_inline_pragma:
-            return True
-
-    return False
+    # Scanning the statements detects any generic unit or inlining:
+    return _get_scan(spec_file)[1]
@@ -66,6 +66,63 @@ def recurse_through_repo(directory, ignore=["build", "alire"]):
         yield root, dirnames, filenames
 
 
+def recurse_through_repo_indexed(directory, index, new_index, ignore=["build", "alire"]):
+    """
+    This generator behaves like recurse_through_repo above, except that it
+    uses a directory index to avoid listing directories that have not changed.
+    The index is a dictionary that maps a directory to a tuple of the form:
+
+    (mtime_ns, dirnames, filenames, symlinked_dirnames)
+
+    If a directory's modification time matches the one in the index, the
+    cached listing is used instead of reading the directory from disk. Every
+    directory visited is recorded in new_index, which can be saved and
+    passed in as the index for a future search.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return
+
+    entry = index.get(directory)
+    if entry and entry[0] == mtime:
+        _, dirnames, filenames, linked_dirnames = entry
+    else:
+        dirnames = []
+        filenames = []
+        linked_dirnames = []
+        try:
+            with os.scandir(directory) as entries:
+                for dir_entry in entries:
+                    try:
+                        is_dir = dir_entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirnames.append(dir_entry.name)
+                        # Like os.walk, do not follow symbolic links to directories:
+                        if dir_entry.is_symlink():
+                            linked_dirnames.append(dir_entry.name)
+                    else:
+                        filenames.append(dir_entry.name)
+        except OSError:
+            return
+    new_index[directory] = (mtime, dirnames, filenames, linked_dirnames)
+
+    # Don't traverse into hidden directories, build directories, or linked directories:
+    walk_dirnames = [
+        d
+        for d in dirnames
+        if not d[0] == "." and not d[0] == "_" and d not in ignore
+    ]
+    yield directory, walk_dirnames, filenames
+    for d in walk_dirnames:
+        if d not in linked_dirnames:
+            yield from recurse_through_repo_indexed(
+                os.path.join(directory, d), index, new_index, ignore
+            )
+
+
 def get_files_in_dir(directory):
     """Return a list of all the files found in a directory."""
     files = []
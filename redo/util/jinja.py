@@ -1,30 +1,93 @@
 import os
+import hashlib
 
+# Jinja environments for this process, keyed by (template_path, extensions, is_latex).
+# Reusing an environment keeps Jinja's in-memory cache of compiled templates, so each
+# template is only lexed and compiled once per process (Jinja still checks the template
+# file on disk and recompiles it if it has changed).
+_environments = {}
 
-def render(dictionary, template_file, template_path=None, extensions=[]):
-    """Public function for redering using Jinja templates."""
-    def _render(env):
-        return env.get_template(template_file).render(dictionary)
 
-    if template_path is None:
-        template_path = os.environ["TEMPLATEPATH"]
-    from jinja2 import FileSystemLoader
+def _get_bytecode_cache(key):
+    """
+    Return an on-disk bytecode cache for the environment with the given key, so
+    that compiled templates are also shared between separate redo processes. Each
+    environment gets its own cache directory, since Jinja only keys its bytecode
+    cache on the template name and source, not on the environment options that
+    the template was compiled with.
+    """
+    tempdir = os.environ.get("ADAMANT_TMP_DIR")
+    if not tempdir or "ADAMANT_DISABLE_TEMPLATE_CACHE" in os.environ:
+        return None
+    from jinja2 import FileSystemBytecodeCache
+
+    cache_dir = (
+        tempdir
+        + os.sep
+        + "template_cache"
+        + os.sep
+        + hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+    )
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(cache_dir)
 
-    loader = FileSystemLoader(template_path)
 
-    # Special handling for latex files, since the syntax conflicts:
-    if template_file.endswith(".tex"):
-        from latex.jinja2 import make_env
+def _get_environment(template_path, extensions, is_latex):
+    """Return the Jinja environment for a template path, creating it on first use."""
+    key = (template_path, tuple(extensions), is_latex)
+    env = _environments.get(key)
+    if env is None:
+        from jinja2 import FileSystemLoader
 
-        return _render(make_env(loader=loader, trim_blocks=True, extensions=extensions))
-    else:
-        from jinja2 import Environment, select_autoescape
+        loader = FileSystemLoader(template_path)
+        bytecode_cache = _get_bytecode_cache(key)
+
+        # Special handling for latex files, since the syntax conflicts:
+        if is_latex:
+            from latex.jinja2 import make_env
+
+            env = make_env(
+                loader=loader,
+                trim_blocks=True,
+                extensions=extensions,
+                bytecode_cache=bytecode_cache,
+            )
+        else:
+            from jinja2 import Environment, select_autoescape
 
-        return _render(
-            Environment(
+            env = Environment(
                 loader=loader,
                 trim_blocks=True,
                 extensions=extensions,
                 autoescape=select_autoescape(["html", "htm", "xml"]),
+                bytecode_cache=bytecode_cache,
             )
-        )
+        _environments[key] = env
+    return env
+
+
+def clear_template_cache():
+    """
+    Remove the on-disk compiled template cache. Returns the name of the
+    directory removed, or None if there was nothing to remove.
+    """
+    import shutil
+
+    tempdir = os.environ.get("ADAMANT_TMP_DIR")
+    if tempdir:
+        cache_dir = tempdir + os.sep + "template_cache"
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return cache_dir
+    return None
+
+
+def render(dictionary, template_file, template_path=None, extensions=[]):
+    """Public function for redering using Jinja templates."""
+    if template_path is None:
+        template_path = os.environ["TEMPLATEPATH"]
+    env = _get_environment(template_path, extensions, template_file.endswith(".tex"))
+    return env.get_template(template_file).render(dictionary)
@@ -0,0 +1,200 @@
+"""
+Parallel job scheduling for the "redo *_all" rules, ie. test_all,
+coverage_all, style_all, prove_all and analyze_all.
+
+Each of these rules finds a list of directories and runs a redo target
+in each of them, ie. "redo <directory>/test". Rather than running these
+jobs one after another, the scheduler runs them across a number of
+worker threads, each of which waits on its own redo subprocess.
+
+Each job is isolated in its own build system session, by running it with
+its own ADAMANT_SESSION_ID, so that jobs running at the same time do not
+share (and recreate) the same session databases. Each session can start
+its own pre-generation server, so each job is given its share of the CPUs
+in PREGEN_WORKERS, which limits the size of its worker pool (see
+pregenerate.py). Before the jobs are started, the build system is set up
+once in this process, which fills the caches shared between sessions (the
+directory index, the database snapshot and the model cache, see
+persistent_target_cache.py), so that the jobs do not all start by
+searching the build roots at the same time.
+
+Jobs are started longest first, using the duration of each job recorded
+on earlier runs, so that a long job does not end up running alone at the
+end. Jobs that have not been run before are started first. The result of
+each job is reported as soon as it finishes, and the results are returned
+in the original order of the jobs, so that the final summary does not
+depend on the order that the jobs finished in.
+
+The number of workers is set by REDO_ALL_JOBS, and defaults to the number
+of CPUs. Set REDO_ALL_JOBS=1 to run the jobs one at a time, in order.
+
+run_all() runs the jobs of a "redo *_all" rule and reports their results,
+and redo_job() and save_logs() hold the parts the jobs of each rule share.
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from shutil import copytree
+
+
+def get_num_workers():
+    """Return the number of jobs to run at the same time."""
+    try:
+        num_workers = int(os.environ.get("REDO_ALL_JOBS", ""))
+    except ValueError:
+        num_workers = multiprocessing.cpu_count()
+    return max(1, num_workers)
+
+
+def _load_durations(durations_file):
+    """Load the job durations recorded on earlier runs, if any."""
+    import yaml
+
+    try:
+        with open(durations_file, "r") as f:
+            durations = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return {}
+    return durations if isinstance(durations, dict) else {}
+
+
+def _save_durations(durations_file, durations):
+    """Save the job durations for the next run."""
+    import yaml
+
+    temp_file = durations_file + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
+            yaml.safe_dump(durations, f, default_flow_style=False)
+        os.replace(temp_file, durations_file)
+    except OSError:
+        pass
+
+
+class job_scheduler(object):
+    def __init__(self, durations_file, num_workers=None):
+        """
+        Create a scheduler that records the duration of each job in
+        durations_file, a yaml file mapping each job to its duration in
+        seconds.
+        """
+        self.durations_file = durations_file
+        self.num_workers = num_workers if num_workers else get_num_workers()
+
+    def _job_environment(self, base_env, number):
+        """Return the environment to run a job in, with its own session."""
+        env = base_env.copy()
+        env.pop("ADAMANT_SETUP", None)
+        session_id = os.environ.get("ADAMANT_SESSION_ID") or os.environ.get(
+            "REDO_SESSION", str(os.getpid())
+        )
+        env["ADAMANT_SESSION_ID"] = session_id + "_" + str(number + 1)
+        # Each session can start its own pre-generation server, so share the
+        # CPUs between the jobs running at the same time, see pregenerate.py:
+        if "PREGEN_WORKERS" not in env:
+            env["PREGEN_WORKERS"] = str(max(1, multiprocessing.cpu_count() // self.num_workers))
+        return env
+
+    def run(self, redo_1, redo_2, redo_3, jobs, run_job, job_done):
+        """
+        Run run_job(job, env) for each job in jobs, where job is a directory
+        and env is the environment that the job must run redo with, see
+        redo.redo(). As each job finishes, job_done(number, job, result) is
+        called from this thread, where number is the index of the job in jobs
+        and result is what run_job returned. An exception raised by run_job
+        stops the remaining jobs from being started, and is raised from here.
+        Returns the results in the order of jobs.
+        """
+        import database.setup
+
+        # The jobs are run with the environment from before the build system
+        # is set up here, as they would be if they were run one at a time:
+        base_env = os.environ.copy()
+        durations = _load_durations(self.durations_file)
+        order = list(range(len(jobs)))
+        did_setup = False
+        if self.num_workers > 1 and len(jobs) > 1:
+            order.sort(key=lambda number: -durations.get(jobs[number], float("inf")))
+
+            # Set up the build system once, to fill the caches shared by
+            # the sessions of each job:
+            did_setup = database.setup.setup(redo_1, redo_2, redo_3)
+
+        def timed_job(number):
+            start_time = time.time()
+            result = run_job(jobs[number], self._job_environment(base_env, number))
+            return result, time.time() - start_time
+
+        results = [None] * len(jobs)
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                futures = {executor.submit(timed_job, number): number for number in order}
+                try:
+                    for future in as_completed(futures):
+                        number = futures[future]
+                        results[number], duration = future.result()
+                        durations[jobs[number]] = round(duration, 1)
+                        job_done(number, jobs[number], results[number])
+                except BaseException:
+                    # Do not start any more jobs if a job failed with an
+                    # error it did not handle, or we were interrupted:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            if did_setup:
+                database.setup.cleanup(redo_1, redo_2, redo_3)
+            _save_durations(self.durations_file, durations)
+        return results
+
+
+def redo_job(job, directory, target, log_dir, env):
+    """
+    Run "redo <job>/<target>" with the environment env, saving its output
+    to a log file in log_dir named after the path of job relative to
+    directory.
+    """
+    from util import redo
+
+    log_file = os.path.join(log_dir, os.path.relpath(job, directory).replace(os.sep, "_") + ".log")
+    redo.redo([os.path.join(job, target), "1>&2", "2>" + log_file], env=env)
+
+
+def save_logs(log_dir, save_dir):
+    """
+    Save off the logs of a job for inspection, ignoring any errors. This is
+    especially useful on a remote CI server.
+    """
+    try:
+        copytree(log_dir, save_dir)
+    except BaseException:
+        pass
+
+
+def run_all(redo_1, redo_2, redo_3, directory, jobs, run_job, result_string, summary_file, durations_file, width=80):
+    """
+    Run the jobs of a "redo *_all" rule with a job_scheduler, see run(). A
+    numbered line with the path of each job relative to directory and its
+    result, as returned by result_string(result), is printed to stderr as
+    the job finishes, and then written to summary_file in the order of jobs.
+    Returns the results in the order of jobs.
+    """
+    num_jobs = "%02d" % len(jobs)
+
+    def result_line(number, job, result):
+        rel_job = os.path.relpath(job, directory)
+        return "{0:{1}}   ".format(
+            (("%02d" % (number + 1)) + "/" + num_jobs + " " + rel_job)[:width], width
+        ) + " " + result_string(result) + "\n"
+
+    results = job_scheduler(durations_file).run(
+        redo_1, redo_2, redo_3, jobs, run_job,
+        lambda number, job, result: sys.stderr.write(result_line(number, job, result))
+    )
+
+    # Write the results to the summary file in order:
+    for number, (job, result) in enumerate(zip(jobs, results)):
+        summary_file.write(result_line(number, job, result))
+    return results
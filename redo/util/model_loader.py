@@ -11,6 +11,47 @@ from models.exceptions import ModelException
 # model if it contains commands. This loading of models within
 # models allows us to write more expressive templates.
 
+# Loading a single model can look up thousands of other models by name,
+# so the model database records and the model classes are memoized for
+# this process, mapping a lowercase model name to its record and a model
+# type to its class. The unit test models of each model name are memoized
+# in the same way. The memos are cleared whenever the generation of the
+# model database changes, ie. when the database is recreated by a new
+# build system setup or sandbox, or when generated models are added to it.
+_model_dicts = {}
+_model_classes = {}
+_unit_test_paths = {}
+_generation = None
+
+
+def _check_generation():
+    """Clear the memos if the model database has changed since they were filled."""
+    global _generation
+    generation = database.model_database.get_generation()
+    if generation != _generation:
+        _model_dicts.clear()
+        _model_classes.clear()
+        _unit_test_paths.clear()
+        _generation = generation
+
+
+def _get_model_dict(model_name):
+    """
+    Return the model database record for a model name, a dictionary mapping
+    model types to model files, fetching it from the database only if it
+    is not already memoized.
+    """
+    _check_generation()
+    key = model_name.lower()
+    try:
+        return _model_dicts[key]
+    except KeyError:
+        pass
+    with database.model_database.model_database() as db:
+        model_dict = db.get_model_dict(key)
+    _model_dicts[key] = model_dict
+    return model_dict
+
 
 def _get_model_file_paths(model_name, model_types=[]):
     """
@@ -19,8 +60,7 @@ def _get_model_file_paths(model_name, model_types=[]):
     name and same model type:
     """
     # Fetch the record from the model database:
-    with database.model_database.model_database() as db:
-        model_dict = db.get_model_dict(model_name)
+    model_dict = _get_model_dict(model_name)
     # Grab the model files out of the record:
     model_files = []
     if model_dict:
@@ -68,6 +108,25 @@ def get_model_file_path(model_name, model_types=[]):
     return None
 
 
+def get_unit_test_file_paths(model_name):
+    """
+    Given a model name, return the unit test model files (*.tests.yaml) with that
+    model name that were found while searching the build roots for the build path,
+    along with the list of build roots that were searched. Unit test models are
+    usually not in the build path, so they cannot be found with the functions above.
+    """
+    _check_generation()
+    key = model_name.lower()
+    try:
+        return _unit_test_paths[key]
+    except KeyError:
+        pass
+    with database.model_database.model_database() as db:
+        roots, unit_test_files = db.get_unit_test_paths(key)
+    _unit_test_paths[key] = (roots, unit_test_files)
+    return roots, unit_test_files
+
+
 def _get_model_class(model_filename):
     (
         model_name,
@@ -75,6 +134,13 @@ def _get_model_class(model_filename):
         specific_name,
     ) = database.model_database.split_model_file_name(model_filename)
 
+    # Return the memoized class if this model type has been loaded before:
+    _check_generation()
+    try:
+        return _model_classes[model_type]
+    except KeyError:
+        pass
+
     # Import the model module:
     module_name = "models." + model_type
     try:
@@ -90,8 +156,10 @@ def _get_model_class(model_filename):
             + '".'
         )
 
-    # Return an instance of the module's class
-    return getattr(module, model_type)
+    # Return the module's class:
+    model_class = getattr(module, model_type)
+    _model_classes[model_type] = model_class
+    return model_class
 
 
 def load_model(model_filename, *args, **kwargs):
@@ -141,26 +209,33 @@ def try_load_models_by_name(model_name, model_types=[], *args, **kwargs):
     return to_return
 
 
+def get_project_configuration_filename():
+    """
+    Return the path to the adamant configuration file (*.configuration.yaml) in use, which
+    is set by the ADAMANT_CONFIGURATION_YAML environment variable, or is the default
+    configuration file if the variable is not set. The file may not exist.
+    """
+    config_file = os.environ.get("ADAMANT_CONFIGURATION_YAML")
+    if config_file:
+        return os.path.realpath(config_file)
+
+    # Use the default configuration file, if the environment variable is not set:
+    base_dir = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    )
+    return base_dir + os.sep + "conf" + os.sep + "adamant.configuration.yaml"
+
+
 def load_project_configuration():
     """Helper to load the default adamant configuration file (*.configuration.yaml)"""
-    # Load the configuration file from the environment variable:
-    config_file = None
-    if "ADAMANT_CONFIGURATION_YAML" in os.environ:
-        config_file = os.environ["ADAMANT_CONFIGURATION_YAML"]
-        if config_file:
-            if not os.path.isfile(config_file):
-                raise ModelException(
-                    "Could not find Adamant configuration file in location: "
-                    + config_file
-                )
-            config_file = os.path.realpath(config_file)
-
-    # Set the default configuration file, if the environment variable is not set:
-    if not config_file:
-        base_dir = os.path.dirname(
-            os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    # Make sure the configuration file from the environment variable exists:
+    config_file = os.environ.get("ADAMANT_CONFIGURATION_YAML")
+    if config_file and not os.path.isfile(config_file):
+        raise ModelException(
+            "Could not find Adamant configuration file in location: "
+            + config_file
         )
-        config_file = base_dir + os.sep + "conf" + os.sep + "adamant.configuration.yaml"
+    config_file = get_project_configuration_filename()
 
     # Make sure the configuration file exists:
     if not os.path.isfile(config_file):
@@ -8,14 +8,27 @@ that by running generators directly in a multiprocessing pool, writing
 output files to disk, and registering them with redo-done so redo knows
 they are up-to-date.
 
-Generation is parallelized across all available CPU cores.  Each worker
-process creates its own generator instances and in-memory model cache.
-The shared on-disk model_cache.db supports concurrent readers (READ_ONLY
-requires no lock) and serializes the occasional cache-miss write via file
-locks, so no additional synchronization is needed here.
-
-Each worker registers its generated file with redo-done immediately after
-writing it.  Redo's database handles concurrent writes safely.
+Generation is parallelized across all available CPU cores, or the number
+of workers set by PREGEN_WORKERS.  Work is
+grouped by input model, and each group is generated by a single worker,
+so a model that feeds many templates (ie. an assembly) is loaded once
+and then rendered by each of its generators, instead of being loaded
+again for every output file.  Groups are handed out largest first, by
+estimated cost, so that one big model does not end up running alone at
+the end of the build.
+
+Each worker creates its own generator instances.  The shared on-disk
+model_cache.db supports concurrent readers (READ_ONLY requires no lock)
+and serializes the occasional cache-miss write via file locks, so no
+additional synchronization is needed here.
+
+Workers return the files they generated along with their dependencies,
+and all of them are registered with redo-done in a single batch by the
+calling process.
+
+The workers are normally provided by a persistent server for the redo
+session, which keeps them warm across calls, see pregenerate_server.py.
+If the server is unavailable, a local multiprocessing pool is used.
 """
 import io
 import multiprocessing
@@ -23,32 +36,64 @@ import os
 import sys
 
 
-# Worker - runs a child process via multiprocessing.Pool
-def _generate_one(work_item):
+def _share_model(generator, input_filename, models):
+    """
+    Make sure a generator uses the model already loaded for this group, if
+    there is one. The first generator for a model class loads the model and
+    saves it in models, and later generators are given that same object, so
+    a model is only loaded and deserialized once per group. Methods that
+    generators call on their model (ie. load_unit_tests) only ever add to it,
+    and are guarded so they do their work once.
+    """
+    if not isinstance(getattr(generator, "_model_obj", None), dict) or not hasattr(
+        generator, "model_cls"
+    ):
+        return
+
+    key = (generator.model_cls, getattr(generator, "ignore_cache", False))
+    if key in models:
+        if models[key] is not None:
+            generator._model_obj[input_filename] = models[key]
+    else:
+        try:
+            models[key] = generator.model_object(input_filename)
+        except Exception:
+            # The model could not be loaded. Let the generator load the model
+            # itself, and report any error from there.
+            models[key] = None
+
+
+# Worker - runs in a child process, called by _generate_group
+def _generate_one(work_item, input_filename, models):
     """
     Generate a single source file in a worker process.
 
     Returns (source_path, dep_list) on success, or None on failure.
     Failures are logged to stderr and the caller falls back to the
-    normal redo-ifchange path for that file.
+    normal redo-ifchange path for that file. Raises redo_unavailable if
+    the generator needs to call redo from a process that cannot.
     """
-    source, module_name, class_name, file_name, input_filename = work_item
+    source, module_name, class_name, file_name = work_item
 
     try:
         from util import meta
         from util import filesystem
+        from util import redo
 
         # Each worker creates its own generator instance. The generator's
         # model_object() method caches the deserialized model in-memory, so
         # the second call (generate after depends_on) is essentially free.
         module = meta.import_module_from_filename(file_name, module_name)
         generator = getattr(module, class_name)()
+        _share_model(generator, input_filename, models)
 
         filesystem.safe_makedir(os.path.dirname(source))
 
         # Resolve dependencies first, matching build_via_generator.py order.
         try:
             dependencies = generator.depends_on(input_filename)
+        except redo.redo_unavailable:
+            raise
         except Exception:
             dependencies = None
         if dependencies and isinstance(dependencies, str):
@@ -73,26 +118,136 @@ def _generate_one(work_item):
         if dependencies:
             all_deps.extend(dependencies)
 
+        return (source, all_deps)
+
+    except Exception as e:
+        # Generation failed. Clean up any partial output and let
+        # redo handle this target through its normal .do script path.
+        _remove_output(source)
         from util import redo
-        redo.redo_done(source, all_deps)
+        if isinstance(e, redo.redo_unavailable):
+            # The generator needs to call redo, which this process cannot
+            # do. Let the caller generate it locally instead.
+            raise
+        return None
 
-        return source
 
+def _remove_output(source):
+    """Remove a (possibly partial) generated output file, ignoring errors."""
+    try:
+        if os.path.exists(source):
+            os.remove(source)
     except Exception:
-        # Generation failed. Clean up any partial output and let
-        # redo handle this target through its normal .do script path.
+        pass
+
+
+# Worker - runs in a child process via multiprocessing.Pool
+def _generate_group(group):
+    """
+    Generate all of the source files produced from a single input model
+    in a worker process.
+
+    Returns the list of (source_path, dep_list) for each successfully
+    generated source file, to be registered with redo-done, and the list
+    of work items that could not be generated because they need to call
+    redo from a process that cannot (see pregenerate_server.py).
+    """
+    input_filename, work_items = group
+
+    # Models shared by the generators in this group:
+    models = {}
+    registrations = []
+    local_work_items = []
+    for work_item in work_items:
         try:
-            if os.path.exists(source):
-                os.remove(source)
+            registration = _generate_one(work_item, input_filename, models)
         except Exception:
-            pass
-        return None
+            local_work_items.append(work_item)
+            continue
+        if registration is not None:
+            registrations.append(registration)
+    return registrations, local_work_items
+
+
+def get_num_workers():
+    """
+    Return the number of worker processes to generate with. This is set by
+    PREGEN_WORKERS, and defaults to the number of CPUs. The "redo *_all"
+    rules set it for each of the jobs they run at the same time, so that
+    together they do not start many more workers than there are CPUs, see
+    job_scheduler.py.
+    """
+    try:
+        num_workers = int(os.environ.get("PREGEN_WORKERS", ""))
+    except ValueError:
+        num_workers = multiprocessing.cpu_count()
+    return max(1, num_workers)
+
+
+def _generate_groups_locally(group_list):
+    """
+    Generate groups in a local multiprocessing pool. Returns the list of
+    registrations for each group.
+    """
+    num_workers = min(get_num_workers(), len(group_list))
+    if num_workers > 1:
+        with multiprocessing.Pool(processes=num_workers) as pool:
+            results = list(pool.imap_unordered(_generate_group, group_list, chunksize=1))
+    else:
+        results = [_generate_group(group) for group in group_list]
+    return [registrations for registrations, _ in results]
+
+
+def _register(registrations):
+    """
+    Register generated files with redo-done in a single batch. Returns the
+    list of registered source paths.
+    """
+    if not registrations:
+        return []
+
+    from util import redo
+    try:
+        redo.redo_done_many(registrations)
+    except redo.redo_done_failed as e:
+        # Registration failed partway through. Keep the files redo already
+        # recorded, and remove the rest so redo builds them through the normal
+        # .do script path.
+        registered = set(e.registered)
+        for source, _ in registrations:
+            if source not in registered:
+                _remove_output(source)
+        return [source for source, _ in registrations if source in registered]
+    except BaseException:
+        # Registration failed before redo recorded anything, so redo does not
+        # know about these files. Remove them and let redo build them through
+        # the normal .do script path.
+        for source, _ in registrations:
+            _remove_output(source)
+        return []
+
+    return [source for source, _ in registrations]
+
+
+def _estimate_group_cost(group):
+    """
+    Estimate the relative cost of generating a group. Every output costs a
+    render, and the model must be loaded once, which scales roughly with the
+    size of the input model file.
+    """
+    input_filename, work_items = group
+    try:
+        load_cost = os.path.getsize(input_filename) / 1024.0
+    except OSError:
+        load_cost = 0.0
+    return len(work_items) + load_cost
 
 
 def _pregenerate_codegen_targets(source_files):
     """
-    Identify generator targets among *source_files*, run their generators
-    in parallel, and register each result with redo-done.
+    Identify generator targets among *source_files*, group them by input
+    model, run their generators in parallel, and register each result with
+    redo-done.
 
     Returns the list of successfully pre-generated file paths.  The caller
     should exclude these from its redo-ifchange call since redo-done has
@@ -107,7 +262,7 @@ def _pregenerate_codegen_targets(source_files):
     # Step 1: Build work list
     # Query the generator database to figure out which source files are
     # produced by a code generator and can be pre-generated in-process.
-    work_items = []
+    groups = {}
     try:
         with generator_database(mode=DATABASE_MODE.READ_ONLY) as db:
             for source in source_files:
@@ -131,8 +286,8 @@ def _pregenerate_codegen_targets(source_files):
                 if not os.path.isfile(input_filename):
                     continue
 
-                work_items.append((
-                    source, module_name, class_name, file_name, input_filename
+                groups.setdefault(input_filename, []).append((
+                    source, module_name, class_name, file_name
                 ))
     except Exception:
         # If we can't even open the generator database for some reason.
@@ -140,23 +295,37 @@ def _pregenerate_codegen_targets(source_files):
         # redo-ifchange path.
         return []
 
-    if not work_items:
+    if not groups:
         return []
 
-    # Step 2: Generate outputs in parallel and register with redo-done
-    # Each worker process loads its own generator and model objects. The
-    # on-disk model_cache.db is safe for concurrent reads, occasional
+    # Step 2: Generate outputs in parallel
+    # Each group of outputs for a single input model is generated by one
+    # worker, which loads the model once for all of them. Groups are sorted
+    # by estimated cost, most expensive first, and handed out one at a time
+    # to whichever worker is free, which keeps the workers evenly loaded.
+    # The on-disk model_cache.db is safe for concurrent reads, occasional
     # cache-miss writes are serialized by filelock inside the DB layer.
-    num_workers = multiprocessing.cpu_count()
-    if num_workers > 1 and len(work_items) > 1:
-        with multiprocessing.Pool(processes=num_workers) as pool:
-            results = pool.map(_generate_one, work_items)
+    group_list = sorted(groups.items(), key=_estimate_group_cost, reverse=True)
+
+    # Use the session's persistent pre-generation server if possible, since
+    # its workers are already warm. Any outputs the server could not generate
+    # because their generators need to call redo are generated locally:
+    from util import pregenerate_server
+    results = pregenerate_server.generate(group_list)
+    if results is None:
+        results = _generate_groups_locally(group_list)
     else:
-        results = [_generate_one(item) for item in work_items]
-
-    # Collect and return results
-    pregenerated = [r for r in results if r is not None]
-    return pregenerated
+        local_groups = [
+            (input_filename, local_work_items)
+            for (input_filename, _), (_, local_work_items) in zip(group_list, results)
+            if local_work_items
+        ]
+        results = [registrations for registrations, _ in results]
+        if local_groups:
+            results.extend(_generate_groups_locally(local_groups))
+
+    # Step 3: Register all of the generated outputs with redo-done
+    return _register([registration for registrations in results for registration in registrations])
 
 
 def pregenerate_and_redo_done(source_files):
@@ -0,0 +1,349 @@
+"""
+Persistent code pre-generation server.
+
+pregenerate_and_redo_done is called many times during a build, from many
+separate redo subprocesses, and each call would otherwise fork a new
+multiprocessing pool whose workers re-import the generators, models, jinja
+and ruamel, and recompile every template, before generating anything.
+
+Instead, the first call in a redo session starts a server process for the
+session, listening on a Unix socket in SESSION_TMP_DIR. The server keeps a
+pool of worker processes alive for the whole session, so their imports,
+compiled templates, compiled schemas and file hash memos stay warm across
+calls and across redo subprocesses. Generator instances, and the models
+they load, are still created per group (see pregenerate.py) so that nothing
+stale is carried over between calls. Models come from the model cache,
+which validates them against the files on disk.
+
+Workers run outside of any redo job, so they cannot call redo themselves.
+Any output whose generator tries to is handed back to the client, which
+generates it locally. The client registers the generated files with
+redo-done.
+
+If a python module or schema used by a worker changes on disk during the
+session, the server refuses the request and shuts down, and the client
+falls back to generating locally. The server also shuts down after being
+idle for a while, or once the session directory is removed.
+
+If the server is unavailable for any reason, or does not respond to a
+request in time, generate() returns None and the caller falls back to
+generating in a local multiprocessing pool. Set DISABLE_PREGEN_SERVER to
+always generate locally.
+"""
+import io
+import multiprocessing
+import os
+import pickle
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds the server waits without any requests before shutting itself down:
+_IDLE_TIMEOUT = 60
+
+# Seconds a client waits for a newly started server to accept connections:
+_START_TIMEOUT = 10
+
+# Seconds a client waits on the server to respond to a request, without
+# receiving anything, before it gives up and generates locally:
+_RESPONSE_TIMEOUT = 300
+
+
+def get_socket_path():
+    """
+    Return the server socket path for the current redo session, or None
+    if there is no session directory or the path is too long for a Unix
+    socket.
+    """
+    session_dir = os.environ.get("SESSION_TMP_DIR")
+    if not session_dir:
+        return None
+    socket_path = session_dir + os.sep + "pregenerate.sock"
+    # Unix socket paths are limited to around 100 bytes, depending on the OS:
+    if len(socket_path.encode()) >= 100:
+        return None
+    return socket_path
+
+
+#################################################
+# Message framing:
+#################################################
+
+def _send(sock, obj):
+    """Send a length prefixed pickled object over a socket."""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack("!Q", len(data)) + data)
+
+
+def _recv_exactly(sock, length):
+    """Receive exactly length bytes from a socket."""
+    chunks = []
+    while length:
+        chunk = sock.recv(min(length, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Pre-generation server connection closed.")
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    """Receive a length prefixed pickled object from a socket."""
+    (length,) = struct.unpack("!Q", _recv_exactly(sock, 8))
+    return pickle.loads(_recv_exactly(sock, length))
+
+
+#################################################
+# Client:
+#################################################
+
+def _connect(socket_path):
+    """Connect to the server, returning the socket, or None if it is not running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def _start_server(socket_path):
+    """
+    Start a server for this session in the background, and wait for it to
+    accept connections. Returns a connected socket, or None if the server
+    could not be started.
+    """
+    # The server must not inherit any of redo's file descriptors, otherwise
+    # redo would wait on the server before finishing the current target.
+    with open(os.path.dirname(socket_path) + os.sep + "pregenerate_server.log", "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "util.pregenerate_server", socket_path],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            close_fds=True,
+            start_new_session=True,
+        )
+
+    deadline = time.time() + _START_TIMEOUT
+    while time.time() < deadline:
+        sock = _connect(socket_path)
+        if sock is not None:
+            return sock
+        # If our server exited, then either another redo process started a
+        # server for this session first, or ours failed to start:
+        if process.poll() is not None:
+            return _connect(socket_path)
+        time.sleep(0.02)
+    return None
+
+
+def generate(group_list):
+    """
+    Generate groups of outputs, as formed by pregenerate.py, on the session's
+    pre-generation server, starting the server if needed. Returns the result of
+    pregenerate._generate_group for each group, in order, or None if the server
+    is unavailable.
+    """
+    if os.environ.get("DISABLE_PREGEN_SERVER"):
+        return None
+    socket_path = get_socket_path()
+    if socket_path is None:
+        return None
+
+    try:
+        sock = _connect(socket_path)
+        if sock is None:
+            sock = _start_server(socket_path)
+            if sock is None:
+                return None
+        with sock:
+            sock.settimeout(_RESPONSE_TIMEOUT)
+            _send(sock, {"env": dict(os.environ), "cwd": os.getcwd(), "groups": group_list})
+            response = _recv(sock)
+    except socket.timeout:
+        # The server is stuck. Remove its socket, so that later requests in
+        # this session do not wait on it too. A new server cannot start while
+        # the stuck one holds the session's lock, so they generate locally.
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+        return None
+    except Exception:
+        return None
+
+    # The server refused the request:
+    if response is None:
+        return None
+
+    results = []
+    for result, stderr_text in response:
+        if stderr_text:
+            sys.stderr.write(stderr_text)
+        results.append(result)
+    return results
+
+
+#################################################
+# Server:
+#################################################
+
+# Modification times of the files this worker process has loaded, recorded
+# the first time each one is checked:
+_loaded_file_mtimes = {}
+
+
+def _is_stale():
+    """
+    Return True if any python module or schema loaded by this worker process
+    has changed on disk since it was loaded.
+    """
+    filenames = [getattr(module, "__file__", None) for module in list(sys.modules.values())]
+    schema_validator = sys.modules.get("models.schema_validator")
+    if schema_validator:
+        filenames.extend(schema_validator._compiled_schemas)
+
+    for filename in filenames:
+        if not filename:
+            continue
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            continue
+        if _loaded_file_mtimes.setdefault(filename, mtime) != mtime:
+            return True
+    return False
+
+
+# Worker - runs in a server pool process
+def _serve_group(task):
+    """
+    Generate a group of outputs in the environment of the client that
+    requested it. Returns the result of pregenerate._generate_group and anything
+    written to stderr, or None if this worker is stale.
+    """
+    env, cwd, group = task
+    if _is_stale():
+        return None
+
+    # Run in the client's environment:
+    if os.environ != env:
+        os.environ.clear()
+        os.environ.update(env)
+    os.chdir(cwd)
+
+    from util import pregenerate
+    from util import redo
+
+    # This process is not part of a redo job:
+    redo.set_unavailable("generating in the pre-generation server")
+
+    old_stderr = sys.stderr
+    sys.stderr = captured = io.StringIO()
+    try:
+        result = pregenerate._generate_group(group)
+    finally:
+        sys.stderr = old_stderr
+    return (result, captured.getvalue())
+
+
+class _server(object):
+    """Serves pre-generation requests for a single redo session."""
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.lock = threading.Lock()
+        self.active = 0
+        self.last_request = time.time()
+        self.stop = False
+        # Create the pool before starting any threads, so that workers are
+        # forked from a single threaded process:
+        from util import pregenerate
+
+        self.pool = multiprocessing.Pool(processes=pregenerate.get_num_workers())
+
+    def _handle(self, conn):
+        try:
+            with conn:
+                request = _recv(conn)
+                tasks = [(request["env"], request["cwd"], group) for group in request["groups"]]
+                results = self.pool.map(_serve_group, tasks, chunksize=1)
+                if any(result is None for result in results):
+                    # A worker is stale. Refuse the request and shut down. A new
+                    # server is started on the next request.
+                    self._shutdown()
+                    results = None
+                _send(conn, results)
+        except Exception as e:
+            sys.stderr.write("Pre-generation request failed: " + str(e) + "\n")
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.last_request = time.time()
+
+    def _shutdown(self):
+        with self.lock:
+            if not self.stop:
+                self.stop = True
+                # Remove the socket so that no new clients connect:
+                try:
+                    os.remove(self.socket_path)
+                except OSError:
+                    pass
+
+    def _is_idle(self):
+        with self.lock:
+            return self.active == 0 and time.time() - self.last_request > _IDLE_TIMEOUT
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(64)
+        listener.settimeout(1.0)
+
+        handlers = []
+        with listener:
+            while not self.stop:
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    if self._is_idle() or not os.path.isdir(os.path.dirname(self.socket_path)):
+                        self._shutdown()
+                    continue
+                conn.settimeout(None)
+                with self.lock:
+                    self.active += 1
+                handler = threading.Thread(target=self._handle, args=(conn,), daemon=True)
+                handler.start()
+                handlers.append(handler)
+                handlers = [h for h in handlers if h.is_alive()]
+
+        # Finish any requests in progress, then stop the workers:
+        for handler in handlers:
+            handler.join()
+        self._shutdown()
+        self.pool.terminate()
+
+
+def serve(socket_path):
+    """Run a pre-generation server on the given socket until it shuts down."""
+    import fcntl
+
+    # Only one server may run per session. If another server holds the
+    # lock, then just exit and let the client connect to that one.
+    with open(socket_path + ".lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        _server(socket_path).serve()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
@@ -10,6 +10,39 @@ import os
 # list exceeds this, it is split into chunks to avoid OS limits.
 _MAX_ARGS = 1000
 
+# Set in processes that run outside of any redo job, such as the pre-generation
+# server workers, where calling redo would corrupt the redo database. Holds the
+# reason redo is unavailable, which is reported if redo is called anyway.
+_unavailable_reason = None
+
+
+class redo_unavailable(Exception):
+    """Raised when redo is called from a process that cannot call redo."""
+    pass
+
+
+class redo_done_failed(Exception):
+    """
+    Raised when redo_done_many fails partway through. The registered member
+    holds the targets that redo-done had already recorded before the failure.
+    """
+
+    def __init__(self, message, registered):
+        super(redo_done_failed, self).__init__(message)
+        self.registered = registered
+
+
+def set_unavailable(reason):
+    """Make any further redo calls from this process raise redo_unavailable."""
+    global _unavailable_reason
+    _unavailable_reason = reason
+
+
+def __check_available(command):
+    """Raise redo_unavailable if this process cannot call redo."""
+    if _unavailable_reason:
+        raise redo_unavailable("Cannot call " + command + " while " + _unavailable_reason + ".")
+
 
 def __form_call_args(command, args):
     """Form call args."""
@@ -26,15 +59,17 @@ def __divide_chunks(things, num):
         yield things[i:i + num]
 
 
-def __invoke_redo_subprocess(command, args=None, prefix_args=None):
+def __invoke_redo_subprocess(command, args=None, prefix_args=None, env=None):
     """Private function which invokes a redo-like command.
 
     When the argument list exceeds _MAX_ARGS, it is split into chunks and
     each chunk is invoked separately. If prefix_args is provided, those
     arguments are prepended to EVERY chunk (not just the first). This is
     critical for commands like redo-done where the first argument (the
-    target) must appear in every invocation.
+    target) must appear in every invocation. If env is provided, the
+    command is run with that environment instead of this process's.
     """
+    __check_available(command)
     if args is None:
         args = []
     if isinstance(args, str):
@@ -52,15 +87,18 @@ def __invoke_redo_subprocess(command, args=None, prefix_args=None):
         chunk_size = max(1, _MAX_ARGS - len(prefix_args))
         for chunk in __divide_chunks(args, chunk_size):
             call_str = __form_call_args(command, prefix_args + chunk)
-            shell.run_command(call_str)
+            shell.run_command(call_str, env=env)
     else:
         call_str = __form_call_args(command, all_args)
-        shell.run_command(call_str)
+        shell.run_command(call_str, env=env)
 
 
-def redo(args):
-    """Call redo with a list of targets."""
-    __invoke_redo_subprocess("redo", args)
+def redo(args, env=None):
+    """
+    Call redo with a list of targets, optionally with a different
+    environment, see job_scheduler.py.
+    """
+    __invoke_redo_subprocess("redo", args, env=env)
 
 
 def redo_ifchange(args):
@@ -68,6 +106,21 @@ def redo_ifchange(args):
     __invoke_redo_subprocess("redo-ifchange", args)
 
 
+def try_redo_ifchange(args):
+    """
+    Call redo-ifchange with a list of targets, and return True if it
+    succeeded or False if it failed, rather than aborting on failure.
+    """
+    __check_available("redo-ifchange")
+    if isinstance(args, str):
+        args = [args]
+    for chunk in __divide_chunks(args, _MAX_ARGS):
+        call_str = __form_call_args("redo-ifchange", chunk)
+        if shell.try_run_command(call_str) != 0:
+            return False
+    return True
+
+
 def redo_ifcreate(args):
     """Call redo-ifcreate with a list of targets."""
     __invoke_redo_subprocess("redo-ifcreate", args)
@@ -90,12 +143,74 @@ def redo_done(target, deps=None):
     __invoke_redo_subprocess("redo-done", deps, prefix_args=[target])
 
 
+def redo_done_many(registrations):
+    """Call redo-done to register many pre-built targets with their dependencies.
+
+    registrations is a list of (target, deps) tuples. redo-done only accepts a
+    single target per invocation, so rather than spawning a shell for each
+    target, the invocations are chained together into as few shell commands as
+    possible, each holding at most _MAX_ARGS arguments. As with redo_done, the
+    target is repeated in every invocation if its deps need to be chunked.
+
+    If an invocation fails, redo_done_failed is raised listing the targets
+    that redo-done recorded with all of their deps before the failure, so the
+    caller can tell them apart from the rest.
+    """
+    __check_available("redo-done")
+    calls = []
+    for target, deps in registrations:
+        if deps is None:
+            deps = []
+        chunk_size = max(1, _MAX_ARGS - 1)
+        chunks = list(__divide_chunks(deps, chunk_size)) if deps else [[]]
+        for index, chunk in enumerate(chunks):
+            is_last = index == len(chunks) - 1
+            call_str = __form_call_args("redo-done", [target] + chunk)
+            calls.append((target, is_last, len(chunk) + 1, call_str))
+
+    # Targets in the order redo-done recorded all of their deps (dicts keep
+    # insertion order). A target is only registered once the invocation
+    # holding its last chunk of deps succeeds:
+    registered = {}
+
+    def run_batch(batch):
+        if shell.try_run_command(" && ".join(call_str for _, _, _, call_str in batch)) == 0:
+            registered.update((target, None) for target, is_last, _, _ in batch if is_last)
+            return
+        # The chain stops at the first failing invocation, but the ones before
+        # it were recorded. redo-done may record a target again, so run the
+        # invocations one at a time to find out exactly where it fails.
+        for target, is_last, _, call_str in batch:
+            status = shell.try_run_command(call_str)
+            if status != 0:
+                raise redo_done_failed(
+                    "redo-done failed with status " + str(status) + " for " + target + ".",
+                    list(registered)
+                )
+            if is_last:
+                registered[target] = None
+
+    batch = []
+    batch_args = 0
+    for call in calls:
+        _, _, num_args, _ = call
+        if batch and batch_args + num_args > _MAX_ARGS:
+            run_batch(batch)
+            batch = []
+            batch_args = 0
+        batch.append(call)
+        batch_args += num_args
+    if batch:
+        run_batch(batch)
+
+
 def redo_ood(args):
     """
     Call redo-ood with a list of targets. This call returns the
     targets that are out of date as a list.
     """
     if args:
+        __check_available("redo-ood")
         call_str = __form_call_args("redo-ood", args)
         (
             status,
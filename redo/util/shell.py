@@ -6,16 +6,18 @@ from util import error
 # programs via the commandline shell from python.
 
 
-def try_run_command(command_string, debug=True):
+def try_run_command(command_string, debug=True, env=None):
     """
     Try to run a command, and return the resulting
-    return code.
+    return code. The command is run with the environment
+    env if it is given, otherwise with this process's
+    environment.
     """
     if debug:
         debug_module.debug_print(command_string)
     # close_fds must be "False" otherwise the file descriptors used by redo
     # are closed. This causes lots of terrible things to happen.
-    process = subprocess.Popen(command_string, shell=True, close_fds=False)
+    process = subprocess.Popen(command_string, shell=True, close_fds=False, env=env)
     process.communicate()
     return process.returncode
 
@@ -42,12 +44,12 @@ def try_run_command_capture_output(command_string, debug=True):
     return process.returncode, stdout, stderr
 
 
-def run_command(command_string, debug=True):
+def run_command(command_string, debug=True, env=None):
     """
     Run a command. If the return code is not 0,
     abort execution of the program.
     """
-    status = try_run_command(command_string, debug)
+    status = try_run_command(command_string, debug, env)
     if status != 0:
         error.abort(status)
 